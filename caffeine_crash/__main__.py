@@ -0,0 +1,136 @@
+"""Command line entry point for everything in the package.
+
+    python -m caffeine_crash                          # the TUI (same as: tui)
+    python -m caffeine_crash tui --speed max --record runs/a
+    python -m caffeine_crash run --days 3650 --seed 7 --save market.ckpt
+    python -m caffeine_crash batch --runs 2000 --days 3650
+
+Each command imports only what it uses. Headless commands never load
+textual, rich or plotext, so they (and any worker processes that import
+their modules) start in the time it takes to import numpy; the UI stack
+costs several times that and is paid only by `tui` and `view`. The
+`startup/` benchmark cases measure both.
+"""
+import argparse
+import importlib
+import sys
+import time
+from typing import List, Optional
+
+# Commands handled by another module's main(): name -> (module, help)
+FORWARDED = {
+    "batch": ("caffeine_crash.batch", "many headless runs on a process pool"),
+    "sweep": ("caffeine_crash.sweep", "parameter sweeps over seeds"),
+    "calibrate": ("caffeine_crash.calibrate", "fit parameters to observed series"),
+    "until": ("caffeine_crash.fastforward", "fast-forward runs until a condition holds"),
+    "serve": ("caffeine_crash.server", "stream a headless run to viewers"),
+    "view": ("caffeine_crash.ui.viewer", "watch a streamed run (TUI)"),
+    "bench": ("caffeine_crash.benchmarks.__main__", "benchmark suite"),
+}
+
+
+def parse_speed(text: str) -> Optional[float]:
+    # Wrapped so that building the parser does not import the engine
+    from .simulation.runner import parse_speed
+    return parse_speed(text)
+
+
+def tui(args: argparse.Namespace) -> int:
+    from .ui.app import NammaMarketApp
+
+    app = NammaMarketApp(trace_path=args.trace, speed=args.speed, serve_port=args.serve,
+                         record_path=args.record, replay_path=args.replay)
+    app.run()
+    return 0
+
+
+def run(args: argparse.Namespace) -> int:
+    # Not batch.ENGINES: batch pulls in the process pool, which one run never needs
+    from .simulation.engine import MarketEngine
+    from .simulation.vectorized import VectorizedMarketEngine
+    from .simulation.checkpoint import load_checkpoint, save_checkpoint
+    from .simulation.export import TraceWriter
+    from .simulation.recording import Recorder
+
+    if args.resume:
+        sim = load_checkpoint(args.resume)
+    else:
+        engine_cls = VectorizedMarketEngine if args.engine == "vectorized" else MarketEngine
+        sim = engine_cls(seed=args.seed, capture_events=False)
+    recorders = []
+    if args.trace:
+        recorders.append(TraceWriter(args.trace))
+    if args.record:
+        recorders.append(Recorder(args.record, sim))
+    sim.recorders.extend(recorders)
+
+    start = time.perf_counter()
+    try:
+        for _ in range(args.days):
+            sim.step()
+    finally:
+        for recorder in recorders:
+            recorder.close()
+    elapsed = time.perf_counter() - start
+
+    state = sim.state
+    rate = f" ({args.days / elapsed:,.0f} days/s)" if args.days and elapsed > 0 else ""
+    print(f"Day {sim.day} ({state.date:%Y-%m-%d}) after {args.days} days in {elapsed:.2f}s{rate}")
+    print(f"  {state.season.value}, {state.weather}, mood {state.market_mood}")
+    print(f"  rent ₹{state.rent:.0f}/day, avg techie cash ₹{state.avg_techie_cash:,.0f}")
+    for res, price in state.prices.items():
+        print(f"  {res.value:<22} {price:10.2f}")
+    if args.save:
+        save_checkpoint(sim, args.save)
+        print(f"Saved to {args.save}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m caffeine_crash",
+        description="Caffeine Crash market simulation.",
+        epilog="also: " + ", ".join(f"{name} ({text})" for name, (_, text) in FORWARDED.items())
+               + "; run `python -m caffeine_crash COMMAND -h` for their options",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    p = commands.add_parser("tui", help="the terminal UI (default)")
+    p.add_argument("--trace", metavar="DIR", help="stream a columnar trace of the run to DIR")
+    p.add_argument("--speed", type=parse_speed, default="realtime",
+                   help="'realtime' (2 days/s, the default), 'max', or days per second")
+    p.add_argument("--record", metavar="DIR", help="record the run to DIR for replay")
+    p.add_argument("--replay", metavar="DIR", help="replay a recording instead of simulating")
+    p.add_argument("--serve", type=int, metavar="PORT",
+                   help="also stream the run to viewers (python -m caffeine_crash view) on PORT")
+    p.set_defaults(handler=tui)
+
+    p = commands.add_parser("run", help="one headless run; prints where it ended")
+    p.add_argument("--days", type=int, default=3650, help="default: 10 years")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--engine", choices=["object", "vectorized"], default="object")
+    p.add_argument("--resume", metavar="CKPT", help="continue from a checkpoint instead of a fresh engine")
+    p.add_argument("--save", metavar="CKPT", help="checkpoint the engine when the run ends")
+    p.add_argument("--trace", metavar="DIR", help="stream a columnar trace of the run to DIR")
+    p.add_argument("--record", metavar="DIR", help="record the run to DIR for replay")
+    p.set_defaults(handler=run)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in FORWARDED:
+        # Imported, not run as __main__, so worker processes pickle its
+        # functions by their real module and never re-import this one's caller
+        module = importlib.import_module(FORWARDED[argv[0]][0])
+        sys.argv = [f"python -m caffeine_crash {argv[0]}", *argv[1:]]
+        return module.main() or 0
+    # No command (or only TUI flags) starts the TUI, like main.py
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["tui", *argv]
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Headless Monte Carlo runner: many independent simulations on a process pool.
+
+    python -m caffeine_crash.batch --runs 2000 --days 3650
+    python -m caffeine_crash.batch --runs 500 --engine vectorized --out runs.npz
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from .simulation.engine import MarketEngine
+from .simulation.export import TraceWriter
+from .simulation.models import Resource, MOODS
+from .simulation.params import MarketParams
+from .simulation.vectorized import VectorizedMarketEngine
+
+ENGINES = {
+    "object": MarketEngine,
+    "vectorized": VectorizedMarketEngine,
+}
+
+# Column order of RunSummary.price_history
+PRICED_RESOURCES = [res for res in Resource if res != Resource.INR]
+
+
+@dataclass
+class RunSummary:
+    """The compact result a worker sends back for one run."""
+    seed: int
+    rent_history: np.ndarray     # (days + 1,) float32
+    price_history: np.ndarray    # (days + 1, len(PRICED_RESOURCES)) float32
+    mood_counts: np.ndarray      # (len(MOODS),) int32, days spent in each mood
+    first_panic_day: int         # -1 if the run never panicked
+
+
+def run_simulation(seed: int, days: int, engine: str = "object",
+                   trace_dir: Optional[str] = None, params: Optional[MarketParams] = None) -> RunSummary:
+    """Run one simulation to completion inside a worker process.
+
+    Weather and shocks come from the seed's own streams, so runs that share
+    a seed share the environment whatever their params.
+    """
+    sim = ENGINES[engine](seed=seed, history_window=days + 1, capture_events=False, params=params)
+    trace = None
+    if trace_dir:
+        trace = TraceWriter(os.path.join(trace_dir, f"seed-{seed}"))
+        sim.recorders.append(trace)
+    mood_index = {mood: i for i, mood in enumerate(MOODS)}
+    mood_counts = np.zeros(len(MOODS), dtype=np.int32)
+    first_panic_day = -1
+
+    for day in range(1, days + 1):
+        sim.step()
+        mood_counts[mood_index[sim.state.market_mood]] += 1
+        if first_panic_day < 0 and sim.state.market_mood == "Panic":
+            first_panic_day = day
+    if trace is not None:
+        trace.close()
+
+    history = sim.state.history
+    return RunSummary(
+        seed=seed,
+        rent_history=sim.state.rent_history.last().astype(np.float32),
+        price_history=np.column_stack([history[res].last() for res in PRICED_RESOURCES]).astype(np.float32),
+        mood_counts=mood_counts,
+        first_panic_day=first_panic_day,
+    )
+
+
+def _run_chunk(seeds: List[int], days: int, engine: str, trace_dir: Optional[str]) -> List[RunSummary]:
+    return [run_simulation(seed, days, engine, trace_dir) for seed in seeds]
+
+
+def run_batch(runs: int, days: int, base_seed: int = 0, engine: str = "object",
+              workers: Optional[int] = None, trace_dir: Optional[str] = None) -> List[RunSummary]:
+    """Run `runs` simulations with seeds base_seed, base_seed + 1, ... in parallel."""
+    workers = workers or os.cpu_count() or 1
+    seeds = list(range(base_seed, base_seed + runs))
+    # A few chunks per worker keeps the pool busy without per-run IPC overhead
+    chunk = max(1, runs // (workers * 4))
+    chunks = [seeds[i:i + chunk] for i in range(0, runs, chunk)]
+
+    results: List[RunSummary] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        n = len(chunks)
+        for summaries in pool.map(_run_chunk, chunks, [days] * n, [engine] * n, [trace_dir] * n):
+            results.extend(summaries)
+    return results
+
+
+def save_summaries(path: str, summaries: List[RunSummary]):
+    np.savez_compressed(
+        path,
+        seeds=np.array([s.seed for s in summaries], dtype=np.int64),
+        rent_history=np.stack([s.rent_history for s in summaries]),
+        price_history=np.stack([s.price_history for s in summaries]),
+        mood_counts=np.stack([s.mood_counts for s in summaries]),
+        first_panic_day=np.array([s.first_panic_day for s in summaries], dtype=np.int32),
+        resources=np.array([res.value for res in PRICED_RESOURCES]),
+        moods=np.array(MOODS),
+    )
+
+
+def print_report(summaries: List[RunSummary], days: int, elapsed: float):
+    first_panic = np.array([s.first_panic_day for s in summaries])
+    panicked = first_panic >= 0
+    mood_days = np.sum([s.mood_counts for s in summaries], axis=0)
+
+    print(f"{len(summaries)} runs x {days} days in {elapsed:.2f}s "
+          f"({len(summaries) / elapsed:.1f} runs/s)")
+    print(f"Runs that hit Panic: {panicked.mean():.1%}")
+    if panicked.any():
+        print(f"First Panic day: median {np.median(first_panic[panicked]):.0f}, "
+              f"p10 {np.percentile(first_panic[panicked], 10):.0f}, "
+              f"p90 {np.percentile(first_panic[panicked], 90):.0f}")
+    total = mood_days.sum()
+    for mood, count in zip(MOODS, mood_days):
+        print(f"  {mood:<11} {count / total:6.1%} of days")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many headless Caffeine Crash simulations.")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=3650, help="days per run (default: 10 years)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="object")
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--out", help="save every run's summary arrays to this .npz")
+    parser.add_argument("--trace-dir", help="also stream a full daily trace of each run to TRACE_DIR/seed-N")
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    start = time.perf_counter()
+    summaries = run_batch(args.runs, args.days, args.seed, args.engine, args.workers, args.trace_dir)
+    elapsed = time.perf_counter() - start
+
+    print_report(summaries, args.days, elapsed)
+    if args.out:
+        save_summaries(args.out, summaries)
+        print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
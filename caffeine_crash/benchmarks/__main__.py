@@ -0,0 +1,144 @@
+"""Run the benchmark suite, save results as JSON and flag regressions.
+
+    python -m caffeine_crash.benchmarks                      # run everything
+    python -m caffeine_crash.benchmarks agents_step          # only matching cases
+    python -m caffeine_crash.benchmarks --save-baseline      # record this machine's baseline
+    python -m caffeine_crash.benchmarks --threshold 1.2      # fail if >20% slower than baseline
+
+Exits with status 1 when any case is slower than the baseline by more than
+the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .suite import Case, cases_matching
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+MIN_CALL_TIME = 0.2  # seconds per repeat, calls are batched until they take this long
+
+
+def time_case(case: Case, repeats: int) -> Dict[str, float]:
+    fn = case.setup()
+    fn()  # warm-up
+
+    # Calibrate how many calls make one measurable repeat
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_CALL_TIME or calls >= 1_000_000:
+            break
+        calls *= 2 if elapsed == 0 else max(2, int(MIN_CALL_TIME / elapsed) + 1)
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        samples.append((time.perf_counter() - start) / (calls * case.ops))
+
+    median = statistics.median(samples)
+    return {
+        "unit": case.unit,
+        "seconds_per_op": median,
+        "min_seconds_per_op": min(samples),
+        "ops_per_second": 1.0 / median,
+        "repeats": repeats,
+    }
+
+
+def machine_info() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": str(os.cpu_count()),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> bool:
+    """Print the ratio to the baseline for every case; True if nothing regressed."""
+    ok = True
+    print()
+    print(f"{'case':<32} {'baseline':>12} {'now':>12} {'ratio':>7}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["seconds_per_op"]
+        now = result["seconds_per_op"]
+        ratio = now / before
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{name:<32} {before:>12.3e} {now:>12.3e} {ratio:>6.2f}x{flag}")
+    return ok
+
+
+def load_baseline(path: str) -> Optional[Dict[str, dict]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Caffeine Crash benchmark suite.")
+    parser.add_argument("patterns", nargs="*", help="only run cases whose name contains one of these")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--out", default="bench_results.json", help="where to write this run's results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline too")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio that counts as a regression (default 1.25)")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args()
+
+    cases = cases_matching(args.patterns)
+    if args.list:
+        for case in cases:
+            print(case.name)
+        return 0
+
+    results = {}
+    for case in cases:
+        result = time_case(case, args.repeats)
+        results[case.name] = result
+        print(f"{case.name:<32} {result['seconds_per_op'] * 1e6:>12.3f} us/{case.unit}"
+              f" {result['ops_per_second']:>14,.0f} {case.unit}s/s")
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    return 0 if compare(results, baseline, args.threshold) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
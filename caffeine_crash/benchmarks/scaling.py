@@ -0,0 +1,91 @@
+"""Agents/second of the object engine vs the vectorized engine.
+
+Run from the repository root:
+
+    python -m caffeine_crash.benchmarks.scaling
+    python -m caffeine_crash.benchmarks.scaling --sizes 16 1000 100000 1000000 --days 20
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from ..simulation.agents import Techie
+from ..simulation.engine import MarketEngine
+from ..simulation.models import Population
+from ..simulation.vectorized import VectorizedMarketEngine
+
+# The object engine gets painfully slow past this, so it is skipped above it
+OBJECT_ENGINE_LIMIT = 200_000
+
+
+def population_for(n_agents: int) -> Population:
+    base = Population()
+    return base.scaled(n_agents / base.total)
+
+
+def agents_per_second(engine_cls, population: Population, days: int, seed: int = 0) -> float:
+    engine = engine_cls(seed=seed, population=population)
+    engine.step()  # warm-up
+    start = time.perf_counter()
+    for _ in range(days):
+        engine.step()
+    elapsed = time.perf_counter() - start
+    return population.total * days / elapsed
+
+
+def bytes_per_agent(engine_cls, population: Population) -> float:
+    """Memory the engine allocates per agent, measured with tracemalloc."""
+    tracemalloc.start()
+    try:
+        engine = engine_cls(seed=0, population=population, capture_events=False)
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del engine
+    return allocated / population.total
+
+
+def check_parity(population: Population, days: int, seed: int = 0) -> bool:
+    """Both engines must agree on prices, mood and techie cash every day."""
+    obj = MarketEngine(seed=seed, population=population)
+    vec = VectorizedMarketEngine(seed=seed, population=population)
+    for _ in range(days):
+        obj.step()
+        vec.step()
+        if (obj.state.prices != vec.state.prices
+                or obj.state.avg_techie_cash != vec.state.avg_techie_cash
+                or obj.state.market_mood != vec.state.market_mood):
+            return False
+    techie_cash = [a.cash for a in obj.agents if isinstance(a, Techie)]
+    return bool(np.array_equal(techie_cash, vec.techies.cash))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    if not check_parity(population_for(1_000), days=365):
+        sys.exit("Parity over 365 days @ 1k agents: MISMATCH")
+    print("Parity over 365 days @ 1k agents: OK")
+    pop = population_for(100_000)
+    print(f"Memory @ 100k agents: object {bytes_per_agent(MarketEngine, pop):.0f} B/agent, "
+          f"vectorized {bytes_per_agent(VectorizedMarketEngine, pop):.0f} B/agent")
+    print()
+    print(f"{'agents':>10} {'object/s':>14} {'vectorized/s':>14} {'speedup':>8}")
+    for size in args.sizes:
+        pop = population_for(size)
+        vec = agents_per_second(VectorizedMarketEngine, pop, args.days)
+        if pop.total <= OBJECT_ENGINE_LIMIT:
+            obj = agents_per_second(MarketEngine, pop, args.days)
+            print(f"{pop.total:>10,} {obj:>14,.0f} {vec:>14,.0f} {vec / obj:>7.1f}x")
+        else:
+            print(f"{pop.total:>10,} {'-':>14} {vec:>14,.0f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Benchmark cases for the engine and UI hot paths.
+
+Each case is a function that does its setup and returns a zero-argument
+callable; the runner times that callable. `ops` says how many units of work
+one call performs, so results can be read as time per agent, per day, etc.
+"""
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Callable, List
+
+import numpy as np
+
+from ..simulation.agents import build_population
+from ..simulation.clearing import clear_book
+from ..simulation.engine import MarketEngine
+from ..simulation.ensemble import EnsembleEngine
+from ..simulation.models import MarketState, Resource
+from ..simulation.params import DEFAULT_PARAMS
+from ..simulation.pricing import rules_for
+from ..simulation.history import SeriesHistory
+from ..simulation.vectorized import VectorizedMarketEngine
+from .scaling import population_for
+
+# Directory holding the caffeine_crash package, for the startup cases' subprocesses
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+UI_MODULES = ("textual", "rich", "plotext")
+HEADLESS_MODULES = ("caffeine_crash.batch", "caffeine_crash.sweep", "caffeine_crash.fastforward",
+                    "caffeine_crash.server", "caffeine_crash.simulation.recording",
+                    "caffeine_crash.simulation.ensemble")
+
+
+@dataclass
+class Case:
+    name: str
+    unit: str                      # what one op is: "agent", "day", "chart", ...
+    ops: int                       # ops per call of the timed function
+    setup: Callable[[], Callable[[], None]]
+
+
+def _agents_step(engine_cls, n_agents: int):
+    def setup():
+        engine = engine_cls(seed=0, population=population_for(n_agents), capture_events=False)
+        engine.step()
+        return engine.run_agents
+    return setup
+
+
+def _population_build(n_agents: int):
+    def setup():
+        population = population_for(n_agents)
+        return lambda: build_population(population)
+    return setup
+
+
+def _update_prices():
+    engine = MarketEngine(seed=0, capture_events=False)
+    return engine.update_prices
+
+
+def _clearing(n_orders: int):
+    def setup():
+        rng = np.random.default_rng(0)
+        half = n_orders // 2
+        ids = np.arange(half)
+        bids = (100 * (1 + 0.1 * rng.random(half)), rng.integers(1, 10, half).astype(float), ids)
+        asks = (100 * (1 - 0.1 * rng.random(half)), rng.integers(1, 10, half).astype(float), ids)
+        return lambda: clear_book(Resource.RAGI, *bids, *asks)
+    return setup
+
+
+def _price_rules_batch(n_engines: int):
+    def setup():
+        rules = rules_for(DEFAULT_PARAMS)
+        rng = np.random.default_rng(0)
+        start = MarketState().prices
+        prices = np.tile([[start.get(res, 0.0) for res in Resource]], (n_engines, 1))
+        rent = rng.choice([2000.0, 2800.0, 3200.0], n_engines)
+        drought = rng.random(n_engines) < 0.1
+        gates = rules.gates(prices, rent, drought)
+        draws = np.where(gates, rng.random(gates.shape), np.nan)
+
+        def run():
+            rules.apply(prices, rent, drought, draws, lambda key, options, rows: options[1])
+        return run
+    return setup
+
+
+def _ensemble_step(members: int):
+    def setup():
+        ensemble = EnsembleEngine.spawn(members, seed=0)
+        ensemble.step()
+        return ensemble.step
+    return setup
+
+
+def _chart_build(length: int):
+    def setup():
+        from ..ui.plotting import build_chart
+        history = SeriesHistory(window=max(length, 1))
+        for value in np.cumsum(np.random.default_rng(0).normal(size=length)) + 100:
+            history.append(value)
+        data = history.last()
+        return lambda: build_chart("Bench", "red", data, 60, 15)
+    return setup
+
+
+def _end_to_end(days: int):
+    def setup():
+        engine = MarketEngine(seed=0)
+
+        def run():
+            for _ in range(days):
+                engine.step()
+        return run
+    return setup
+
+
+def _python(*args: str) -> List[str]:
+    return [sys.executable, *args]
+
+
+def _startup(command: List[str], check_headless: bool = False):
+    """Time a fresh interpreter running `command`, end to end."""
+    def setup():
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            filter(None, [PACKAGE_ROOT, os.environ.get("PYTHONPATH")])))
+        if check_headless:
+            # Headless startup is only fast while nothing pulls in the UI stack
+            probe = (f"import sys, importlib; [importlib.import_module(m) for m in {HEADLESS_MODULES!r}]; "
+                     f"print(','.join(m for m in {UI_MODULES!r} if m in sys.modules))")
+            loaded = subprocess.run(_python("-c", probe), env=env, capture_output=True,
+                                    text=True, check=True).stdout.strip()
+            if loaded:
+                raise RuntimeError(f"Headless modules import the UI stack: {loaded}")
+        return lambda: subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+    return setup
+
+
+def all_cases() -> List[Case]:
+    cases = []
+    for n in (16, 1_000, 100_000):
+        cases.append(Case(f"agents_step/object/{n}", "agent", population_for(n).total,
+                          _agents_step(MarketEngine, n)))
+        cases.append(Case(f"agents_step/vectorized/{n}", "agent", population_for(n).total,
+                          _agents_step(VectorizedMarketEngine, n)))
+    cases.append(Case("population_build/100000", "agent", population_for(100_000).total,
+                      _population_build(100_000)))
+    cases.append(Case("update_prices", "day", 1, _update_prices))
+    cases.append(Case("price_rules/batch/10000", "engine-day", 10_000, _price_rules_batch(10_000)))
+    cases.append(Case("ensemble/step/10000", "member-day", 10_000, _ensemble_step(10_000)))
+    for n in (1_000, 200_000):
+        cases.append(Case(f"clearing/{n}", "order", n, _clearing(n)))
+    for length in (100, 1_000, 3_650):
+        cases.append(Case(f"chart_build/{length}", "chart", 1, _chart_build(length)))
+    cases.append(Case("end_to_end/object/16", "day", 100, _end_to_end(100)))
+    cases.append(Case("startup/python", "start", 1, _startup(_python("-c", "pass"))))
+    cases.append(Case("startup/headless_run", "start", 1,
+                      _startup(_python("-m", "caffeine_crash", "run", "--days", "1"), check_headless=True)))
+    cases.append(Case("startup/ui_import", "start", 1,
+                      _startup(_python("-c", "import caffeine_crash.ui.app"))))
+    return cases
+
+
+def cases_matching(patterns: List[str]) -> List[Case]:
+    cases = all_cases()
+    if not patterns:
+        return cases
+    return [case for case in cases if any(p in case.name for p in patterns)]
@@ -0,0 +1,514 @@
+"""Fit MarketParams so that simulated rent and prices track observed series.
+
+    python -m caffeine_crash.calibrate observed.csv --fit rent_hike_prob=0.005:0.05 --fit volatility=0.005:0.05
+    python -m caffeine_crash.calibrate observed.csv --fit idli_markup=1.1:2.0 --fit salary=1500:6000 \\
+        --engine clearing --seeds 32 --generations 40 --out fitted.json
+
+The CSV has a `day` (or `date`, YYYY-MM-DD) column and one column per
+observed series: `rent`, `techie_cash`, or a Resource by name (IDLI_SET) or
+label ("Idli Set"). Blank cells are days without an observation.
+
+A run's loss is the squared error on the observed days, each series scaled
+by its mean absolute target (so rent in the thousands and idli in the tens
+weigh the same) and the series averaged. A candidate's objective is that
+loss averaged over --seeds seeds; CMA-ES minimises it inside the --fit box.
+Every candidate faces the same weather and shocks on a given seed, so
+their losses differ by the parameters, not by luck.
+
+Every generation's candidates x seeds share one process pool. Seeds are
+raced: each candidate first runs --race of them, and one whose mean is
+already --prune times the best objective so far is dropped there. A single
+run also stops as soon as its loss alone puts the candidate past that line.
+Losses are memoised per point in memory and per (params, seed, targets) on
+disk under --cache, so repeated points and re-runs cost nothing.
+
+Only the clearing engine lets agents set prices; with the others, salary
+and savings_target are visible in techie_cash alone.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch import ENGINES
+from .simulation.clearing import ClearingMarketEngine
+from .simulation.models import MarketState, Resource
+from .simulation.params import MarketParams, DEFAULT_PARAMS
+from .sweep import DEFAULT_CACHE, _coerce, _parse_range, code_version
+
+CALIBRATION_ENGINES = dict(ENGINES, clearing=ClearingMarketEngine)
+DEFAULT_PRUNE = 2.0
+GRID = 10_000        # points are snapped to 1/GRID of each range, so near-repeats memoise
+LOSS_FILE = "calibration-losses.tsv"
+
+
+@dataclass(frozen=True)
+class Targets:
+    """Observed series on a set of days."""
+    names: Tuple[str, ...]   # "rent", "techie_cash" or Resource names
+    days: np.ndarray         # (T,) ascending day numbers
+    values: np.ndarray       # (T, len(names)), NaN where not observed
+
+    @property
+    def horizon(self) -> int:
+        return int(self.days[-1])
+
+    def digest(self) -> str:
+        digest = hashlib.sha256(",".join(self.names).encode())
+        digest.update(self.days.astype("<i8").tobytes())
+        digest.update(self.values.astype("<f8").tobytes())
+        return digest.hexdigest()[:16]
+
+
+def _series_name(column: str) -> str:
+    text = column.strip()
+    if text.lower() in ("rent", "techie_cash"):
+        return text.lower()
+    for res in Resource:
+        if res != Resource.INR and text.upper().replace(" ", "_") in (res.name, res.value.upper().replace(" ", "_")):
+            return res.name
+    raise ValueError(f"Unknown series {column!r}: expected rent, techie_cash or a priced Resource")
+
+
+def load_targets(path: str) -> Targets:
+    """Targets from a CSV with a day or date column and one column per series."""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        raise ValueError(f"{path} has no rows")
+    columns = list(rows[0])
+    if "day" in columns:
+        days = [int(row["day"]) for row in rows]
+    elif "date" in columns:
+        start = MarketState().date
+        days = [(datetime.fromisoformat(row["date"]) - start).days for row in rows]
+    else:
+        raise ValueError(f"{path} needs a 'day' or 'date' column")
+    series = [c for c in columns if c not in ("day", "date")]
+    if not series:
+        raise ValueError(f"{path} has no series columns")
+    values = np.array([[float(row[c]) if row[c] not in ("", None) else np.nan for c in series] for row in rows])
+
+    days = np.array(days, dtype=np.int64)
+    order = np.argsort(days, kind="stable")
+    days, values = days[order], values[order]
+    if days[0] < 1 or np.any(np.diff(days) == 0):
+        raise ValueError(f"{path}: days must be distinct and on or after day 1")
+    if np.any(np.all(np.isnan(values), axis=0)):
+        raise ValueError(f"{path} has a series with no observations")
+    return Targets(tuple(_series_name(c) for c in series), days, values)
+
+
+def _getter(name: str) -> Callable[[MarketState], float]:
+    if name == "rent":
+        return lambda state: state.rent
+    if name == "techie_cash":
+        return lambda state: state.avg_techie_cash
+    res = Resource[name]
+    return lambda state: state.prices[res]
+
+
+def run_loss(params: MarketParams, seed: int, targets: Targets, engine: str = "object",
+             give_up: float = math.inf) -> Tuple[float, bool]:
+    """Loss of one run against `targets`, and whether the run went the distance.
+
+    The loss only grows day by day, so once it passes `give_up` the run
+    stops and returns what it has, a lower bound on the full loss.
+    """
+    sim = CALIBRATION_ENGINES[engine](seed=seed, capture_events=False, params=params)
+    getters = [_getter(name) for name in targets.names]
+    observed = ~np.isnan(targets.values)
+    scale = np.nanmean(np.abs(targets.values), axis=0)
+    scale[scale == 0] = 1.0
+    weight = 1.0 / (scale ** 2 * observed.sum(axis=0) * len(getters))
+    rows = [[(getters[k], float(values[k]), float(weight[k])) for k in np.flatnonzero(seen)]
+            for values, seen in zip(targets.values, observed)]
+
+    loss = 0.0
+    for day, row in zip(targets.days.tolist(), rows):
+        while sim.day < day:
+            sim.step()
+        state = sim.state
+        for get, target, w in row:
+            error = get(state) - target
+            loss += error * error * w
+        if loss > give_up:
+            return loss, False
+    return loss, True
+
+
+def _loss_tasks(tasks: List[Tuple[int, MarketParams, int]], targets: Targets, engine: str,
+                give_up: float) -> List[Tuple[int, int, float, bool]]:
+    return [(i, seed, *run_loss(params, seed, targets, engine, give_up)) for i, params, seed in tasks]
+
+
+def _loss_version() -> str:
+    """code_version() plus this file, which defines the loss."""
+    with open(__file__, "rb") as f:
+        return hashlib.sha256(code_version().encode() + f.read()).hexdigest()[:16]
+
+
+class LossCache:
+    """Complete-run losses, one line per (params, seed, targets, code version).
+
+    Loaded once and appended to as runs finish, under the sweep cache root.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE, version: Optional[str] = None):
+        self.path = os.path.join(root, LOSS_FILE)
+        self.version = version or _loss_version()
+        self.losses: Dict[str, float] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    # A torn last line from an interrupted run has no newline yet
+                    if line.endswith("\n"):
+                        key, _, loss = line[:-1].partition("\t")
+                        self.losses[key] = float(loss)
+
+    def key(self, params: MarketParams, seed: int, targets: Targets, engine: str) -> str:
+        # Object and vectorized engines agree, as in sweep; the clearing engine does not
+        family = "clearing" if engine == "clearing" else "walk"
+        raw = f"{params.hash()}:{seed}:{targets.digest()}:{family}:{self.version}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+    def get(self, key: str) -> Optional[float]:
+        return self.losses.get(key)
+
+    def put_many(self, entries: List[Tuple[str, float]]):
+        if not entries:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.writelines(f"{key}\t{loss!r}\n" for key, loss in entries)
+        self.losses.update(entries)
+
+
+@dataclass(frozen=True)
+class Bounds:
+    """The box being searched; CMA-ES works in its unit cube."""
+    names: Tuple[str, ...]
+    low: np.ndarray
+    high: np.ndarray
+
+    @classmethod
+    def from_ranges(cls, ranges: Dict[str, Tuple[float, float]]) -> "Bounds":
+        for name, (low, high) in ranges.items():
+            _coerce(name, low)
+            if not high > low:
+                raise ValueError(f"{name}: empty range {low}:{high}")
+        names = tuple(ranges)
+        return cls(names, np.array([ranges[n][0] for n in names], dtype=float),
+                   np.array([ranges[n][1] for n in names], dtype=float))
+
+    def point(self, unit: np.ndarray) -> Dict[str, float]:
+        unit = np.round(np.clip(unit, 0.0, 1.0) * GRID) / GRID
+        values = self.low + unit * (self.high - self.low)
+        return {name: _coerce(name, v) for name, v in zip(self.names, values.tolist())}
+
+    def unit(self, point: Dict[str, float]) -> np.ndarray:
+        values = np.array([point[name] for name in self.names], dtype=float)
+        return np.clip((values - self.low) / (self.high - self.low), 0.0, 1.0)
+
+
+class CMAES:
+    """(mu/mu_w, lambda) CMA-ES with the standard default settings (Hansen's tutorial)."""
+
+    def __init__(self, x0: np.ndarray, sigma: float, popsize: Optional[int] = None, seed: int = 0):
+        n = self.n = len(x0)
+        self.rng = np.random.default_rng(seed)
+        self.mean = np.array(x0, dtype=float)
+        self.sigma = sigma
+        self.popsize = popsize or 4 + int(3 * math.log(n))
+        self.mu = self.popsize // 2
+        weights = math.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1.0 / np.sum(self.weights ** 2)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, math.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.C = np.eye(n)
+        self.generation = 0
+
+    def _eigen(self) -> Tuple[np.ndarray, np.ndarray]:
+        self.C = (self.C + self.C.T) / 2
+        d2, B = np.linalg.eigh(self.C)
+        return B, np.sqrt(np.maximum(d2, 1e-20))
+
+    def ask(self) -> np.ndarray:
+        B, D = self._eigen()
+        z = self.rng.standard_normal((self.popsize, self.n))
+        return self.mean + self.sigma * (z * D) @ B.T
+
+    def tell(self, xs: np.ndarray, losses: Sequence[float]):
+        """Update from the candidates as evaluated (after any repair) and their losses."""
+        B, D = self._eigen()
+        order = np.argsort(losses, kind="stable")[:self.mu]
+        ys = (np.asarray(xs)[order] - self.mean) / self.sigma
+        step = self.weights @ ys
+        self.mean = self.mean + self.sigma * step
+        self.generation += 1
+
+        inv_sqrt_c = B @ np.diag(1 / D) @ B.T
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c @ step
+        ps_norm = np.linalg.norm(self.ps) / math.sqrt(1 - (1 - self.cs) ** (2 * self.generation))
+        hsig = float(ps_norm / self.chi_n < 1.4 + 2 / (self.n + 1))
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(self.cc * (2 - self.cc) * self.mueff) * step
+        rank_one = np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C
+        rank_mu = (ys * self.weights[:, None]).T @ ys
+        self.C = (1 - self.c1 - self.cmu) * self.C + self.c1 * rank_one + self.cmu * rank_mu
+        self.sigma *= math.exp((self.cs / self.damps) * (np.linalg.norm(self.ps) / self.chi_n - 1))
+
+    @property
+    def spread(self) -> float:
+        """Largest standard deviation of the search distribution, in unit-cube terms."""
+        return self.sigma * math.sqrt(float(np.max(np.diag(self.C))))
+
+
+@dataclass
+class Evaluation:
+    point: Dict[str, float]
+    loss: float      # mean over the seeds run (over all of them unless pruned)
+    seeds: int       # seeds actually run
+    pruned: bool
+
+
+@dataclass
+class EvaluatorStats:
+    runs: int = 0          # simulated, including runs that gave up
+    cached_runs: int = 0   # answered by the LossCache
+    memo_hits: int = 0     # whole points answered from memory
+    pruned: int = 0        # candidates dropped before their last seed
+
+
+class Evaluator:
+    """The seed-averaged objective, evaluated a generation at a time on a process pool."""
+
+    def __init__(self, targets: Targets, seeds: Sequence[int], engine: str = "object",
+                 base: MarketParams = DEFAULT_PARAMS,
+                 workers: Optional[int] = None, cache: Optional[LossCache] = None,
+                 race: Optional[int] = None, prune: float = DEFAULT_PRUNE):
+        self.targets = targets
+        self.seeds = list(seeds)
+        self.engine = engine
+        self.base = base
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        self.race = min(race or max(1, len(self.seeds) // 4), len(self.seeds))
+        self.prune = prune
+        self.best = math.inf
+        self.memo: Dict[tuple, Evaluation] = {}
+        self.stats = EvaluatorStats()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self) -> "Evaluator":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _cutoff(self) -> float:
+        return self.prune * self.best
+
+    def _run(self, params: List[MarketParams], seeds: Sequence[int]) -> List[List[Tuple[float, bool]]]:
+        """(loss, complete) of every candidate on every seed, from the cache or the pool."""
+        results: List[List[Optional[Tuple[float, bool]]]] = [[None] * len(seeds) for _ in params]
+        keys = {}
+        todo = []
+        for i, p in enumerate(params):
+            for j, seed in enumerate(seeds):
+                if self.cache:
+                    key = keys[i, j] = self.cache.key(p, seed, self.targets, self.engine)
+                    loss = self.cache.get(key)
+                    if loss is not None:
+                        results[i][j] = (loss, True)
+                        self.stats.cached_runs += 1
+                        continue
+                todo.append((i * len(seeds) + j, p, seed))
+
+        if todo:
+            # One run alone past this bound puts its candidate's mean past the cutoff
+            give_up = self._cutoff() * len(self.seeds)
+            chunk = max(1, len(todo) // (self.workers * 4))
+            futures = [self.pool.submit(_loss_tasks, todo[k:k + chunk], self.targets, self.engine, give_up)
+                       for k in range(0, len(todo), chunk)]
+            # Cache each chunk as it lands, so an interrupted calibration keeps its progress
+            for future in as_completed(futures):
+                finished = []
+                for index, _, loss, complete in future.result():
+                    i, j = divmod(index, len(seeds))
+                    results[i][j] = (loss, complete)
+                    # A run that gave up has only a lower bound, which is not worth keeping
+                    if complete and self.cache:
+                        finished.append((keys[i, j], loss))
+                if self.cache:
+                    self.cache.put_many(finished)
+            self.stats.runs += len(todo)
+        return results
+
+    def evaluate(self, points: List[Dict[str, float]]) -> List[Evaluation]:
+        """Objective at every point: race the first seeds, finish the survivors."""
+        keys = [tuple(point[name] for name in sorted(point)) for point in points]
+        new: Dict[tuple, Dict[str, float]] = {}
+        for key, point in zip(keys, points):
+            if key in self.memo:
+                self.stats.memo_hits += 1
+            else:
+                new.setdefault(key, point)
+
+        if new:
+            order = list(new)
+            params = [self.base.replace(**new[key]) for key in order]
+            losses: List[List[float]] = [[] for _ in order]
+            alive = list(range(len(order)))
+            stages = [self.seeds[:self.race], self.seeds[self.race:]]
+            for stage, seeds in enumerate(stages):
+                if not seeds or not alive:
+                    continue
+                results = self._run([params[i] for i in alive], seeds)
+                survivors = []
+                for i, runs in zip(alive, results):
+                    losses[i].extend(loss for loss, _ in runs)
+                    gave_up = not all(complete for _, complete in runs)
+                    last_stage = stage == len(stages) - 1 or not stages[-1]
+                    if gave_up or (not last_stage and np.mean(losses[i]) > self._cutoff()):
+                        self.memo[order[i]] = Evaluation(new[order[i]], float(np.mean(losses[i])),
+                                                         len(losses[i]), pruned=True)
+                        self.stats.pruned += 1
+                    else:
+                        survivors.append(i)
+                alive = survivors
+            for i in alive:
+                evaluation = self.memo[order[i]] = Evaluation(new[order[i]], float(np.mean(losses[i])),
+                                                              len(losses[i]), pruned=False)
+                self.best = min(self.best, evaluation.loss)
+        return [self.memo[key] for key in keys]
+
+
+@dataclass
+class Generation:
+    number: int
+    best_loss: float          # best objective found so far
+    best_point: Dict[str, float]
+    spread: float             # CMA-ES search width, in unit-cube terms
+    elapsed: float
+
+
+@dataclass
+class Calibration:
+    point: Dict[str, float]   # the fitted parameters
+    loss: float
+    start_loss: float         # objective at the base parameters (clipped into the box)
+    params: MarketParams
+    generations: List[Generation] = field(default_factory=list)
+    stats: EvaluatorStats = field(default_factory=EvaluatorStats)
+
+
+def calibrate(targets: Targets, bounds: Bounds, seeds: Sequence[int], engine: str = "object",
+              base: MarketParams = DEFAULT_PARAMS, generations: int = 30,
+              popsize: Optional[int] = None, sigma: float = 0.3, seed: int = 0, tol: float = 1e-3,
+              workers: Optional[int] = None, cache: Optional[LossCache] = None, race: Optional[int] = None,
+              prune: float = DEFAULT_PRUNE,
+              progress: Optional[Callable[[Generation, EvaluatorStats], None]] = None) -> Calibration:
+    """Minimise the seed-averaged loss over `bounds`, starting from `base`.
+
+    Stops after `generations`, or once the search has narrowed to `tol` of
+    every range.
+    """
+    start = time.perf_counter()
+    with Evaluator(targets, seeds, engine, base, workers, cache, race, prune) as evaluator:
+        x0 = bounds.unit({name: getattr(base, name) for name in bounds.names})
+        first = evaluator.evaluate([bounds.point(x0)])[0]
+        best = first
+        es = CMAES(x0, sigma, popsize, seed)
+        log = []
+        for number in range(1, generations + 1):
+            points = [bounds.point(x) for x in es.ask()]
+            evaluations = evaluator.evaluate(points)
+            # Tell CMA-ES where it really looked: clipped into the box and snapped to the grid
+            es.tell(np.array([bounds.unit(p) for p in points]), [e.loss for e in evaluations])
+            for evaluation in evaluations:
+                if not evaluation.pruned and evaluation.loss < best.loss:
+                    best = evaluation
+            log.append(Generation(number, best.loss, best.point, es.spread, time.perf_counter() - start))
+            if progress:
+                progress(log[-1], evaluator.stats)
+            if es.spread < tol:
+                break
+        stats = evaluator.stats
+    return Calibration(best.point, best.loss, first.loss, base.replace(**best.point), log, stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit MarketParams to observed series with CMA-ES.")
+    parser.add_argument("targets", help="CSV with a day or date column and one column per series")
+    parser.add_argument("--fit", action="append", default=[], metavar="NAME=LOW:HIGH",
+                        help="parameter to fit and its bounds, repeat for more")
+    parser.add_argument("--seeds", type=int, default=16, help="seeds averaged per candidate")
+    parser.add_argument("--seed", type=int, default=0, help="first seed (also seeds CMA-ES)")
+    parser.add_argument("--engine", choices=sorted(CALIBRATION_ENGINES), default="object")
+    parser.add_argument("--generations", type=int, default=30)
+    parser.add_argument("--popsize", type=int, default=None, help="candidates per generation (default: 4 + 3 ln n)")
+    parser.add_argument("--sigma", type=float, default=0.3, help="initial step, as a fraction of each range")
+    parser.add_argument("--race", type=int, default=None, help="seeds run before pruning (default: a quarter)")
+    parser.add_argument("--prune", type=float, default=DEFAULT_PRUNE,
+                        help="drop candidates whose partial loss exceeds this times the best")
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help=f"cache directory (default {DEFAULT_CACHE})")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--out", help="write the fitted parameters to this JSON file")
+    args = parser.parse_args()
+
+    if not args.fit:
+        parser.error("give at least one --fit NAME=LOW:HIGH")
+    try:
+        targets = load_targets(args.targets)
+        bounds = Bounds.from_ranges(dict(map(_parse_range, args.fit)))
+    except ValueError as e:
+        parser.error(str(e))
+    cache = None if args.no_cache else LossCache(args.cache)
+    seeds = range(args.seed, args.seed + args.seeds)
+
+    names = list(bounds.names)
+    print(f"Fitting {', '.join(names)} to {', '.join(targets.names)} "
+          f"({len(targets.days)} days, up to day {targets.horizon}) over {len(seeds)} seeds")
+    print(f"{'gen':>4}{'best loss':>12}{'spread':>9}{'runs':>7}{'cached':>8}{'pruned':>8}{'time':>8}"
+          + "".join(f"{n:>16}" for n in names))
+
+    def progress(gen: Generation, stats: EvaluatorStats):
+        print(f"{gen.number:>4}{gen.best_loss:>12.5g}{gen.spread:>9.4f}{stats.runs:>7}{stats.cached_runs:>8}"
+              f"{stats.pruned:>8}{gen.elapsed:>7.1f}s" + "".join(f"{gen.best_point[n]:>16g}" for n in names))
+
+    result = calibrate(targets, bounds, seeds, args.engine, generations=args.generations,
+                       popsize=args.popsize, sigma=args.sigma, seed=args.seed, workers=args.workers,
+                       cache=cache, race=args.race, prune=args.prune, progress=progress)
+
+    print(f"\nLoss {result.start_loss:.5g} at the defaults -> {result.loss:.5g}")
+    for name in names:
+        print(f"  {name:<20} {getattr(DEFAULT_PARAMS, name):>12g} -> {result.point[name]:g}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"params": result.params.diff(), "loss": result.loss, "targets": args.targets,
+                       "seeds": len(seeds), "engine": args.engine}, f, indent=1)
+        print(f"\nSaved to {args.out} (load with MarketParams.from_dict(json.load(f)['params']))")
+
+
+if __name__ == "__main__":
+    main()
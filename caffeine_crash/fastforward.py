@@ -0,0 +1,113 @@
+"""First-hit times across many seeds, with fast-forwarded engines.
+
+    python -m caffeine_crash.fastforward --until mood=Panic --runs 2000
+    python -m caffeine_crash.fastforward --until "rent>3000" --runs 5000 --out first_hits.csv
+    python -m caffeine_crash.fastforward --days 3650 --seed 7
+
+Each run stops as soon as its condition holds. With --runs 1 (the default)
+the final snapshot of that run is printed instead of a summary.
+"""
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .batch import ENGINES
+from .simulation.fastforward import FastForwardResult, parse_condition, run_until
+
+
+def first_hit(seed: int, until: Optional[str], max_days: Optional[int], engine: str = "object") -> FastForwardResult:
+    """Fast-forward one fresh engine; `until` is a parse_condition() string."""
+    sim = ENGINES[engine](seed=seed, capture_events=False)
+    return run_until(sim, parse_condition(until) if until else None, max_days)
+
+
+def _run_chunk(seeds: List[int], until: str, max_days: int, engine: str) -> List[Tuple[int, Optional[int]]]:
+    return [(seed, first_hit(seed, until, max_days, engine).hit_day) for seed in seeds]
+
+
+def scan_seeds(seeds: List[int], until: str, max_days: int, engine: str = "object",
+               workers: Optional[int] = None) -> List[Tuple[int, Optional[int]]]:
+    """(seed, first day `until` held or None) for every seed, in parallel."""
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, len(seeds) // (workers * 4))
+    chunks = [seeds[i:i + chunk] for i in range(0, len(seeds), chunk)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        n = len(chunks)
+        for hits in pool.map(_run_chunk, chunks, [until] * n, [max_days] * n, [engine] * n):
+            results.extend(hits)
+    return results
+
+
+def print_snapshot(result: FastForwardResult):
+    snap = result.snapshot
+    if result.hit_day is not None:
+        print(f"Condition held on day {result.hit_day} ({snap.date:%Y-%m-%d})")
+    else:
+        print(f"Stopped after {result.days_run} days ({snap.date:%Y-%m-%d})")
+    print(f"  {snap.season.value}, {snap.weather}, rent ₹{snap.rent:.0f}/day")
+    if result.agents_skipped:
+        print("  (agents were not simulated: the condition only reads prices and rent)")
+    else:
+        print(f"  mood {snap.market_mood}, avg techie cash ₹{snap.avg_techie_cash:,.0f}")
+    for res, price in snap.prices.items():
+        print(f"  {res.value:<22} {price:10.2f}")
+
+
+def print_report(hits: List[Tuple[int, Optional[int]]], until: str, max_days: int, elapsed: float):
+    days = np.array([day for _, day in hits if day is not None])
+    print(f"{len(hits)} runs in {elapsed:.2f}s ({len(hits) / elapsed:.1f} runs/s)")
+    print(f"Runs where {until} within {max_days} days: {len(days) / len(hits):.1%}")
+    if len(days):
+        print(f"First hit day: median {np.median(days):.0f}, "
+              f"p10 {np.percentile(days, 10):.0f}, p90 {np.percentile(days, 90):.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast-forward simulations until a condition holds.")
+    parser.add_argument("--until", help="stop condition: mood=Panic, rent>3000, ARTISAN_COFFEE>450, ...")
+    parser.add_argument("--days", type=int, default=None,
+                        help="advance this many days, or give up after them with --until (default: 10 years)")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="object")
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--out", help="write seed,hit_day rows to this CSV")
+    args = parser.parse_args()
+
+    if args.until:
+        try:
+            parse_condition(args.until)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.days is None:
+        parser.error("give --until, --days or both")
+    elif args.runs > 1:
+        parser.error("--runs needs an --until condition")
+    max_days = args.days if args.days is not None else 3650
+
+    start = time.perf_counter()
+    if args.runs == 1:
+        result = first_hit(args.seed, args.until, max_days, args.engine)
+        print_snapshot(result)
+        hits = [(args.seed, result.hit_day)]
+    else:
+        seeds = list(range(args.seed, args.seed + args.runs))
+        hits = scan_seeds(seeds, args.until, max_days, args.engine, args.workers)
+        print_report(hits, args.until, max_days, time.perf_counter() - start)
+
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["seed", "hit_day"])
+            writer.writerows((seed, "" if day is None else day) for seed, day in hits)
+        print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
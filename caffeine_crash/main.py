@@ -1,5 +1,10 @@
-from caffeine_crash.ui.app import NammaMarketApp
+"""The TUI, as a script: `python caffeine_crash/main.py [--speed max] ...`.
+
+Same as `python -m caffeine_crash tui`, which also has the headless commands.
+"""
+import sys
+
+from caffeine_crash.__main__ import main
 
 if __name__ == "__main__":
-    app = NammaMarketApp()
-    app.run()
+    sys.exit(main(["tui", *sys.argv[1:]]))
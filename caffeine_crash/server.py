@@ -0,0 +1,168 @@
+"""Stream a running simulation to any number of local viewers.
+
+    python -m caffeine_crash.server --speed 30
+    python -m caffeine_crash.ui.viewer            # in as many other terminals as you like
+
+One SimulationRunner steps the engine; the server polls its latest Snapshot
+and sends each viewer a compact binary delta (simulation/delta.py) of what
+changed since the last frame that viewer received. Viewers never get a
+backlog: a slow viewer is simply sent a bigger delta, covering every day it
+missed, once its socket drains. A viewer that stops reading altogether is
+dropped after SLOW_CLIENT_TIMEOUT.
+"""
+import argparse
+import asyncio
+from typing import Dict, Optional, Set, Tuple
+
+from .batch import ENGINES
+from .simulation.delta import STREAM_MAGIC, encode_frame
+from .simulation.runner import SimulationRunner, Snapshot, parse_speed, REALTIME
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+PUBLISH_INTERVAL = 0.05       # viewers get at most 20 frames per second
+SLOW_CLIENT_TIMEOUT = 10.0    # seconds a viewer may leave its socket full
+WRITE_BUFFER_HIGH = 64 * 1024
+
+
+class StateStreamServer:
+    """Publishes `runner`'s snapshots as deltas to every connected viewer.
+
+    Works inside any running asyncio loop (the TUI's included): call
+    `await start()`, and `await stop()` when done.
+    """
+
+    def __init__(self, runner: SimulationRunner, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.runner = runner
+        self.host = host
+        self.port = port
+        self.latest: Snapshot = runner.snapshot
+        self._changed = asyncio.Event()
+        # Frames to self.latest, keyed by id() of the snapshot a viewer last
+        # saw (not its day: a replay can seek back or pause on a day). The
+        # snapshot is kept with its frame so the id cannot be reused. Viewers
+        # that are up to date all share one encoding.
+        self._frames: Dict[int, Tuple[Optional[Snapshot], bytes]] = {}
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+        self._server: Optional[asyncio.Server] = None
+        self._publisher: Optional[asyncio.Task] = None
+
+    @property
+    def viewers(self) -> int:
+        return len(self._writers)
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_viewer, self.host, self.port)
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._publisher = asyncio.create_task(self._publish())
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+        # Closing the sockets ends the handlers even where wait_for() swallows
+        # the cancellation (it can when the drain it wraps has just finished)
+        for writer in list(self._writers):
+            writer.close()
+        tasks = list(self._handlers)
+        if self._publisher is not None:
+            tasks.append(self._publisher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def _publish(self):
+        while True:
+            snapshot = self.runner.snapshot
+            if snapshot is not self.latest:
+                self.latest = snapshot
+                self._frames.clear()
+                # Wake every waiting viewer; they wait on the next event from now on
+                changed, self._changed = self._changed, asyncio.Event()
+                changed.set()
+            await asyncio.sleep(PUBLISH_INTERVAL)
+
+    def _frame(self, sent: Optional[Snapshot]) -> bytes:
+        cached = self._frames.get(id(sent))
+        if cached is None:
+            cached = self._frames[id(sent)] = (sent, encode_frame(self.latest, sent))
+        return cached[1]
+
+    async def _serve_viewer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        self._writers.add(writer)
+        sent: Optional[Snapshot] = None
+        # Viewers never send anything, so this only completes when they hang up
+        closed = asyncio.ensure_future(reader.read())
+        try:
+            writer.write(STREAM_MAGIC)
+            while not closed.done():
+                if sent is not self.latest:
+                    snapshot = self.latest
+                    writer.write(self._frame(sent))
+                    sent = snapshot
+                    # Backpressure: nothing more is queued until this viewer catches up
+                    await asyncio.wait_for(writer.drain(), SLOW_CLIENT_TIMEOUT)
+                else:
+                    waiter = asyncio.ensure_future(self._changed.wait())
+                    try:
+                        await asyncio.wait((waiter, closed), return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        waiter.cancel()
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        except asyncio.CancelledError:
+            # Only stop() cancels handlers; returning normally keeps asyncio's
+            # stream callback from logging the cancellation as an error
+            pass
+        finally:
+            closed.cancel()
+            self._handlers.discard(handler)
+            self._writers.discard(writer)
+            writer.close()
+
+
+async def serve(runner: SimulationRunner, host: str, port: int):
+    server = StateStreamServer(runner, host, port)
+    await server.start()
+    print(f"Streaming on {host}:{server.port} (Ctrl+C to stop)")
+    try:
+        viewers = 0
+        while True:
+            await asyncio.sleep(1.0)
+            if server.viewers != viewers:
+                viewers = server.viewers
+                print(f"  day {server.latest.day}: {viewers} viewer(s)", flush=True)
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a simulation to local viewers.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="object")
+    parser.add_argument("--speed", type=parse_speed, default=REALTIME,
+                        help="'realtime' (2 days/s, the default), 'max', or days per second")
+    args = parser.parse_args()
+
+    # Viewers get no activity log, so skip capturing one
+    engine = ENGINES[args.engine](seed=args.seed, capture_events=False)
+    runner = SimulationRunner(engine, args.speed)
+    runner.start()
+    try:
+        asyncio.run(serve(runner, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,118 +1,234 @@
-import random
+import gc
 from abc import ABC, abstractmethod
-from typing import Dict
-from .models import Resource, Region, MarketState
+from typing import Dict, List, Optional, Tuple
+from .models import Resource, Region, MarketState, Population, RESOURCE_INDEX
+from .events import EventLog, EventCode
+from .params import MarketParams, DEFAULT_PARAMS
+
+N_RESOURCES = len(Resource)
+RAGI = RESOURCE_INDEX[Resource.RAGI]
+RICE = RESOURCE_INDEX[Resource.RICE]
+COMMERCIAL_COFFEE = RESOURCE_INDEX[Resource.COMMERCIAL_COFFEE]
+ARTISAN_COFFEE = RESOURCE_INDEX[Resource.ARTISAN_COFFEE]
+IDLI_SET = RESOURCE_INDEX[Resource.IDLI_SET]
+
+# Today's prices indexed by RESOURCE_INDEX (0.0 for unpriced INR)
+PriceVector = Tuple[float, ...]
+
+
+def price_vector(prices: Dict[Resource, float]) -> PriceVector:
+    """Resolve the price dict once per day, so agents index a tuple instead."""
+    return tuple(prices.get(res, 0.0) for res in Resource)
+
+
+def inventory_list(inventory: Dict[Resource, float]) -> List[float]:
+    """Dense inventory list indexed by RESOURCE_INDEX."""
+    items = [0] * N_RESOURCES
+    for res, amount in inventory.items():
+        items[RESOURCE_INDEX[res]] = amount
+    return items
+
 
 class Agent(ABC):
+    # No per-agent __dict__: a million agents stay small
+    __slots__ = ("name", "region", "inventory", "cash", "agent_id")
+
     def __init__(self, name: str, region: Region, inventory: Dict[Resource, float], cash: float = 1000.0):
         self.name = name
         self.region = region
-        self.inventory = inventory
+        self.inventory = inventory_list(inventory) # indexed by RESOURCE_INDEX
         self.cash = cash
-    
+        self.agent_id = -1 # Position in the engine's agent list, set when the population is built
+
     @abstractmethod
-    def act(self, market_state: MarketState) -> str:
-        """Perform daily actions: produce, consume, trade."""
+    def act(self, market_state: MarketState, events: Optional[EventLog] = None,
+            prices: Optional[PriceVector] = None):
+        """Perform daily actions: produce, consume, trade.
+
+        `prices` is today's price_vector(); the engine resolves it once for
+        everyone (it is derived from `market_state` when not given).
+        What happened is reported to `events` (if given) as a compact event.
+        """
         pass
 
+    def holding(self, res: Resource) -> float:
+        return self.inventory[RESOURCE_INDEX[res]]
+
+    @classmethod
+    def bulk(cls, names: List[str], template: "Agent", first_id: int = 0) -> List["Agent"]:
+        """Copies of `template` with their own names, inventories and ids from `first_id`.
+
+        Skips __init__ and copies slots directly, which is several times
+        faster than constructing each agent for large populations.
+        """
+        new = object.__new__
+        slots = [slot for klass in cls.__mro__ for slot in getattr(klass, "__slots__", ())
+                 if slot not in ("name", "inventory", "agent_id")]
+        shared = [(slot, getattr(template, slot)) for slot in slots]
+        inventory = template.inventory
+        agents = []
+        append = agents.append
+        for agent_id, name in enumerate(names, first_id):
+            agent = new(cls)
+            for slot, value in shared:
+                setattr(agent, slot, value)
+            agent.name = name
+            agent.inventory = inventory.copy()
+            agent.agent_id = agent_id
+            append(agent)
+        return agents
+
 class Farmer(Agent):
-    def __init__(self, name: str, region: Region, crop: Resource):
-        super().__init__(name, region, {crop: 0, Resource.RAGI: 10}, cash=500.0)
+    __slots__ = ("crop", "crop_index", "params")
+
+    def __init__(self, name: str, region: Region, crop: Resource, params: MarketParams = DEFAULT_PARAMS):
+        super().__init__(name, region, {crop: 0, Resource.RAGI: 10}, cash=params.farmer_cash)
         self.crop = crop
+        self.crop_index = RESOURCE_INDEX[crop]
+        self.params = params
 
-    def act(self, market_state: MarketState) -> str:
+    def act(self, market_state: MarketState, events: Optional[EventLog] = None,
+            prices: Optional[PriceVector] = None):
+        if prices is None:
+            prices = price_vector(market_state.prices)
+        p = self.params
+        inventory = self.inventory
+        crop = self.crop_index
         # Production Logic
-        yield_amt = 10 if market_state.weather == "Sunny" else 5
+        yield_amt = p.yield_sunny if market_state.weather == "Sunny" else p.yield_normal
         if market_state.weather == "Drought":
-            yield_amt = 1
-        
-        self.inventory[self.crop] = self.inventory.get(self.crop, 0) + yield_amt
-        
+            yield_amt = p.yield_drought
+
+        inventory[crop] += yield_amt
+
         # Consumption (Eat Ragi)
-        if self.inventory.get(Resource.RAGI, 0) > 0:
-            self.inventory[Resource.RAGI] -= 1
+        if inventory[RAGI] > 0:
+            inventory[RAGI] -= 1
         else:
             # Buy Ragi if hungry
-            cost = market_state.prices[Resource.RAGI]
+            cost = prices[RAGI]
             if self.cash >= cost:
                 self.cash -= cost
-                self.inventory[Resource.RAGI] = self.inventory.get(Resource.RAGI, 0) + 1
-        
+                inventory[RAGI] += 1
+
         # Sell excess crop
-        to_sell = max(0, self.inventory[self.crop] - 2) 
+        to_sell = max(0, inventory[crop] - p.farmer_keep)
         if to_sell > 0:
-            revenue = to_sell * market_state.prices[self.crop]
+            revenue = to_sell * prices[crop]
             self.cash += revenue
-            self.inventory[self.crop] -= to_sell
-            return f"{self.name} harvested {yield_amt} {self.crop.value}."
-            
-        return f"{self.name} harvested {yield_amt} {self.crop.value}."
+            inventory[crop] -= to_sell
+
+        if events is not None:
+            events.emit(self.agent_id, EventCode.HARVESTED, yield_amt)
 
 class DarshiniOwner(Agent):
-    def __init__(self, name: str):
-        super().__init__(name, Region.BENGALURU, {Resource.IDLI_SET: 0, Resource.RICE: 10, Resource.COMMERCIAL_COFFEE: 5}, cash=2000.0)
+    __slots__ = ("params",)
 
-    def act(self, market_state: MarketState) -> str:
+    def __init__(self, name: str, params: MarketParams = DEFAULT_PARAMS):
+        super().__init__(name, Region.BENGALURU, {Resource.IDLI_SET: 0, Resource.RICE: 10, Resource.COMMERCIAL_COFFEE: 5}, cash=params.darshini_cash)
+        self.params = params
+
+    def act(self, market_state: MarketState, events: Optional[EventLog] = None,
+            prices: Optional[PriceVector] = None):
+        if prices is None:
+            prices = price_vector(market_state.prices)
+        p = self.params
+        inventory = self.inventory
         # Production: 1 Rice + 0.2 Coffee -> 5 Idli Sets
-        if self.inventory[Resource.RICE] < 5:
-            cost = market_state.prices[Resource.RICE] * 10
+        if inventory[RICE] < p.rice_restock_below:
+            cost = prices[RICE] * p.rice_lot
             if self.cash >= cost:
                 self.cash -= cost
-                self.inventory[Resource.RICE] += 10
-        
-        if self.inventory[Resource.COMMERCIAL_COFFEE] < 2:
-            cost = market_state.prices[Resource.COMMERCIAL_COFFEE] * 5
+                inventory[RICE] += p.rice_lot
+
+        if inventory[COMMERCIAL_COFFEE] < p.beans_restock_below:
+            cost = prices[COMMERCIAL_COFFEE] * p.beans_lot
             if self.cash >= cost:
                 self.cash -= cost
-                self.inventory[Resource.COMMERCIAL_COFFEE] += 5
+                inventory[COMMERCIAL_COFFEE] += p.beans_lot
 
         produced = 0
-        if self.inventory[Resource.RICE] >= 1 and self.inventory[Resource.COMMERCIAL_COFFEE] >= 0.2:
-            self.inventory[Resource.RICE] -= 1
-            self.inventory[Resource.COMMERCIAL_COFFEE] -= 0.2
-            produced = 5
-            self.inventory[Resource.IDLI_SET] += produced
+        if inventory[RICE] >= 1 and inventory[COMMERCIAL_COFFEE] >= 0.2:
+            inventory[RICE] -= 1
+            inventory[COMMERCIAL_COFFEE] -= 0.2
+            produced = p.idli_per_batch
+            inventory[IDLI_SET] += produced
 
-        return f"{self.name} cooked {produced} Idli Sets."
+        if events is not None:
+            events.emit(self.agent_id, EventCode.COOKED, produced)
 
 class Techie(Agent):
-    def __init__(self, name: str):
+    __slots__ = ("savings_target", "salary", "saving")
+
+    def __init__(self, name: str, params: MarketParams = DEFAULT_PARAMS):
         # Starts with 'Safety Net' amount to simulate an established techie
-        super().__init__(name, Region.BENGALURU, {Resource.CODE: 0, Resource.IDLI_SET: 0, Resource.ARTISAN_COFFEE: 0}, cash=40000.0)
-        self.savings_target = 50000.0 # The "Sleep well at night" number
-    
-    def act(self, market_state: MarketState) -> str:
+        super().__init__(name, Region.BENGALURU, {Resource.CODE: 0, Resource.IDLI_SET: 0, Resource.ARTISAN_COFFEE: 0}, cash=params.techie_cash)
+        self.savings_target = params.savings_target # The "Sleep well at night" number
+        self.salary = params.salary
+        self.saving = False # In SAVING MODE today (skipped the coffee)
+
+    def act(self, market_state: MarketState, events: Optional[EventLog] = None,
+            prices: Optional[PriceVector] = None):
+        if prices is None:
+            prices = price_vector(market_state.prices)
         # 1. Earn Salary (Fixed High Income)
-        salary = 3000 
+        salary = self.salary
         self.cash += salary
-        
+
         # 2. PAY RENT (First Priority, Inelastic)
         rent = market_state.rent
         self.cash -= rent
-        
+
         # 3. SURVIVAL: Buy Idli Set
-        idli_price = market_state.prices[Resource.IDLI_SET]
+        idli_price = prices[IDLI_SET]
         bought_food = False
         if self.cash >= idli_price:
             self.cash -= idli_price
-            self.inventory[Resource.IDLI_SET] += 1
+            self.inventory[IDLI_SET] += 1
             bought_food = True
-        
+
         # 4. LUXURY: Artisan Coffee (The "Good Life" Indicator)
         # ONLY bought if cash > Savings Target
-        coffee_price = market_state.prices[Resource.ARTISAN_COFFEE]
+        coffee_price = prices[ARTISAN_COFFEE]
         bought_coffee = False
-        
-        if bought_food and self.cash > self.savings_target: 
+
+        if bought_food and self.cash > self.savings_target:
             if self.cash >= coffee_price:
                 self.cash -= coffee_price
-                self.inventory[Resource.ARTISAN_COFFEE] += 1
+                self.inventory[ARTISAN_COFFEE] += 1
                 bought_coffee = True
-                
-        action_log = f"{self.name}: Paid Rent ₹{rent:.0f}. Ate Idli."
-        if bought_coffee:
-            action_log += " Sipped Artisan Coffee ☕."
-        else:
-            action_log += " SAVING MODE (No Coffee)."
-            
-        return action_log
+
+        self.saving = not bought_coffee
+        if events is not None:
+            events.emit(self.agent_id, EventCode.SIPPED_COFFEE if bought_coffee else EventCode.SAVING_MODE, rent)
+
+
+def build_population(population: Population, params: MarketParams = DEFAULT_PARAMS) -> List[Agent]:
+    """Every agent of `population` in engine order (Raithas, Paddy growers,
+    Planters, Devs, Darshinis), with agent ids set to their positions.
+
+    Each kind is cloned from one template with Agent.bulk, and the garbage
+    collector is paused meanwhile (it would otherwise rescan the growing
+    list over and over), so a million agents take well under a second.
+    """
+    kinds = [
+        # (count, name prefix, template)
+        (population.farmers, "Raitha", lambda: Farmer("", Region.MANDYA, Resource.RAGI, params)),
+        (population.rice_farmers, "Paddy", lambda: Farmer("", Region.MANDYA, Resource.RICE, params)),
+        (population.planters, "Planter", lambda: Farmer("", Region.COORG, Resource.COMMERCIAL_COFFEE, params)),
+        (population.techies, "Dev", lambda: Techie("", params)),
+        (population.darshinis, "Darshini", lambda: DarshiniOwner("", params)),
+    ]
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        agents: List[Agent] = []
+        for count, prefix, make_template in kinds:
+            if count:
+                template = make_template()
+                names = [f"{prefix}-{i}" for i in range(count)]
+                agents.extend(type(template).bulk(names, template, first_id=len(agents)))
+        return agents
+    finally:
+        if was_enabled:
+            gc.enable()
@@ -0,0 +1,144 @@
+"""Population statistics per agent kind: cash mean, spread and quantiles.
+
+    stats = engine.population_stats()
+    stats["techie"].p50            # median techie cash
+    stats["techie"].saving_share   # share of techies in SAVING MODE today
+
+Engines hand over one cash column per kind and every statistic is
+computed from it with NumPy, so there is no per-metric Python scan. For
+the vectorized engines the column is a view of their agent block. The
+object engine still builds it (and the techies' saving flags) with one
+pass over its agent objects per kind, so its cost grows with the
+population. The statistics are recomputed from scratch, at most once per
+day, rather than updated as agents act. Quantiles come from a
+QuantileSketch, which is small, mergeable (shards, ensembles) and
+accurate to 1% of the value.
+"""
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+# Per-kind id ranges, in engine order (see Population.kind_slices)
+AGENT_KINDS = ("farmer", "paddy", "planter", "techie", "darshini")
+DEFAULT_ACCURACY = 0.01
+_TINY = 1e-9   # closer to zero than this counts as zero
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch over log-spaced buckets (DDSketch-style).
+
+    Every quantile is within `accuracy` of the true value, relatively.
+    Memory grows with the log of the value range, not with the count, and
+    two sketches merge by adding their buckets.
+    """
+
+    def __init__(self, accuracy: float = DEFAULT_ACCURACY):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}   # bucket key -> count
+        self.negative: Dict[int, int] = {}   # same, for -value
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        self.count += len(values)
+        self.zeros += int(np.count_nonzero(np.abs(values) <= _TINY))
+        self._add_to(self.positive, values[values > _TINY])
+        self._add_to(self.negative, -values[values < -_TINY])
+
+    def _add_to(self, store: Dict[int, int], values: np.ndarray):
+        if len(values) == 0:
+            return
+        keys = np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+        low = int(keys.min())
+        counts = np.bincount(keys - low)
+        for offset in np.flatnonzero(counts).tolist():
+            key = low + offset
+            store[key] = store.get(key, 0) + int(counts[offset])
+
+    def merge(self, other: "QuantileSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, n in theirs.items():
+                mine[key] = mine.get(key, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        # Midpoint of bucket (gamma^(key-1), gamma^key], within `accuracy` of anything in it
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return float("nan")
+        rank = q * (self.count - 1)
+        seen = 0
+        # Most negative first, then zeros, then positives upwards
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+
+@dataclass(frozen=True)
+class KindStats:
+    """Cash distribution of one kind of agent on one day."""
+    kind: str
+    count: int
+    mean: float
+    std: float
+    p10: float
+    p50: float
+    p90: float
+    saving_share: Optional[float] = None   # techies only: share in SAVING MODE
+
+    @property
+    def variance(self) -> float:
+        return self.std ** 2
+
+    @classmethod
+    def from_cash(cls, kind: str, cash: np.ndarray, saving: Optional[np.ndarray] = None) -> "KindStats":
+        if len(cash) == 0:
+            nan = float("nan")
+            return cls(kind, 0, nan, nan, nan, nan, nan, None)
+        sketch = QuantileSketch()
+        sketch.add(cash)
+        return cls(
+            kind=kind,
+            count=len(cash),
+            mean=float(cash.mean()),
+            std=float(cash.std()),
+            p10=sketch.quantile(0.1),
+            p50=sketch.quantile(0.5),
+            p90=sketch.quantile(0.9),
+            saving_share=float(np.count_nonzero(saving)) / len(saving) if saving is not None else None,
+        )
+
+
+@dataclass(frozen=True)
+class PopulationStats:
+    """KindStats for every kind present, as of `day`."""
+    day: int
+    kinds: Dict[str, KindStats]
+
+    def __getitem__(self, kind: str) -> KindStats:
+        return self.kinds[kind]
+
+    def __contains__(self, kind: str) -> bool:
+        return kind in self.kinds
+
+    def __iter__(self) -> Iterator[KindStats]:
+        return iter(self.kinds.values())
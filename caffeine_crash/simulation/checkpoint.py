@@ -0,0 +1,230 @@
+"""Versioned binary checkpoints of a running MarketEngine.
+
+File layout (all integers little-endian):
+
+    8 bytes   magic b"CCRASHCK"
+    4 bytes   format version (uint32)
+    4 bytes   header length in bytes (uint32)
+    header    UTF-8 JSON: engine kind and settings, scalar market state,
+              random stream roots, ring-buffer positions, event counts and
+              an index of the arrays
+    padding   to a 64-byte boundary
+    arrays    raw C-order column arrays, each starting on a 64-byte boundary
+
+Arrays are memory-mapped copy-on-write on load, so restoring a large
+VectorizedMarketEngine only touches the pages the next steps actually
+read. MarketEngine has to rebuild its Python agents from the columns, so
+its restores take time in proportion to the population (seconds at a
+million agents).
+"""
+import json
+import struct
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .engine import MarketEngine
+from .environment import EnvironmentSchedule
+from .history import SeriesHistory
+from .models import Population, Resource, Season
+from .params import MarketParams
+from .streams import RandomStreams
+from .vectorized import VectorizedMarketEngine
+
+MAGIC = b"CCRASHCK"
+FORMAT_VERSION = 3          # 2: NumPy random streams instead of random.Random state
+                            # 3: one environment stream, a row of draws per day
+ALIGN = 64
+_PREFIX = struct.Struct("<8sII")
+
+ENGINE_KINDS = {
+    "object": MarketEngine,
+    "vectorized": VectorizedMarketEngine,
+}
+
+
+class CheckpointError(ValueError):
+    """The file is not a checkpoint this version can read."""
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _engine_kind(engine: MarketEngine) -> str:
+    for kind, cls in ENGINE_KINDS.items():
+        if type(engine) is cls:
+            return kind
+    raise CheckpointError(f"Cannot checkpoint engines of type {type(engine).__name__}")
+
+
+def _dump_series(prefix: str, series: SeriesHistory, arrays: Dict[str, np.ndarray]) -> dict:
+    arrays[f"{prefix}.daily"] = series.daily.data
+    meta = {"version": series.version, "daily": [series.daily.head, series.daily.size]}
+    for name, rollup in series.rollups.items():
+        buckets = rollup.buckets
+        arrays[f"{prefix}.{name}"] = buckets.data
+        meta[name] = [buckets.head, buckets.size, rollup.count, rollup.low, rollup.total, rollup.high]
+    return meta
+
+
+def _load_series(prefix: str, meta: dict, arrays: Dict[str, np.ndarray]) -> SeriesHistory:
+    daily = arrays[f"{prefix}.daily"]
+    series = SeriesHistory(window=len(daily))
+    series.version = meta["version"]
+    series.daily.data = daily
+    series.daily.head, series.daily.size = meta["daily"]
+    for name, rollup in series.rollups.items():
+        buckets = rollup.buckets
+        buckets.data = arrays[f"{prefix}.{name}"]
+        buckets.capacity = len(buckets.data)
+        buckets.head, buckets.size, rollup.count, rollup.low, rollup.total, rollup.high = meta[name]
+    return series
+
+
+def _dump_environment(environment: Optional[EnvironmentSchedule]) -> Optional[dict]:
+    # Blocks are pure functions of these, so they are regenerated rather than stored
+    if environment is None:
+        return None
+    return {"streams": environment.streams.to_dict(),
+            "start": environment.start.isoformat(), "block_days": environment.block_days}
+
+
+def _load_environment(meta: Optional[dict]) -> Optional[EnvironmentSchedule]:
+    if meta is None:
+        return None
+    return EnvironmentSchedule(start=datetime.fromisoformat(meta["start"]), block_days=meta["block_days"],
+                               streams=RandomStreams.from_dict(meta["streams"]))
+
+
+def save_checkpoint(engine: MarketEngine, path: str):
+    """Write everything needed to continue `engine` bit-for-bit to `path`."""
+    state = engine.state
+    arrays: Dict[str, np.ndarray] = dict(engine.agent_columns())
+
+    events = None
+    if engine.events is not None:
+        events = {"emitted": engine.events.emitted}
+        for name, column in engine.events.columns().items():
+            arrays[f"events.{name}"] = column
+
+    history = {"rent": _dump_series("history.rent", state.rent_history, arrays)}
+    for res, series in state.history.items():
+        history[res.name] = _dump_series(f"history.{res.name}", series, arrays)
+
+    header = {
+        "engine": _engine_kind(engine),
+        "seed": engine.seed,
+        "population": vars(engine.population),
+        "params": engine.params.to_dict(),
+        "environment": _dump_environment(engine.environment),
+        "capture_events": engine.events is not None,
+        "events": events,
+        "day": engine.day,
+        # Every draw is a pure function of the streams and the day, so their roots are all the state
+        "streams": engine.streams.to_dict(),
+        "state": {
+            "date": state.date.isoformat(),
+            "season": state.season.name,
+            "weather": state.weather,
+            "headline": state.headline,
+            "market_mood": state.market_mood,
+            "avg_techie_cash": state.avg_techie_cash,
+            "rent": state.rent,
+            "prices": {res.name: price for res, price in state.prices.items()},
+            "history_window": state.history_window,
+        },
+        "history": history,
+        "arrays": {},
+    }
+
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        header["arrays"][name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _align(offset + array.nbytes)
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data_start = _align(_PREFIX.size + len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + header["arrays"][name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+
+
+def read_checkpoint(path: str, mmap: bool = True) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """The header and the arrays of a checkpoint, without building an engine."""
+    with open(path, "rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise CheckpointError(f"{path} is too short to be a checkpoint")
+        magic, version, header_len = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise CheckpointError(f"{path} is not a Caffeine Crash checkpoint")
+        if version != FORMAT_VERSION:
+            raise CheckpointError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        data_start = _align(_PREFIX.size + header_len)
+        if not mmap:
+            f.seek(0)
+            raw = bytearray(f.read())
+
+    if mmap:
+        # Copy-on-write: the engine may mutate its columns, the file stays intact
+        buffer = np.memmap(path, dtype=np.uint8, mode="c")
+    else:
+        buffer = np.frombuffer(raw, dtype=np.uint8)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        start = data_start + spec["offset"]
+        nbytes = dtype.itemsize * int(np.prod(shape))
+        arrays[name] = buffer[start:start + nbytes].view(dtype).reshape(shape)
+    return header, arrays
+
+
+def load_checkpoint(path: str, mmap: bool = True) -> MarketEngine:
+    """Rebuild the engine saved by save_checkpoint(); it continues exactly where it stopped."""
+    header, arrays = read_checkpoint(path, mmap=mmap)
+    saved = header["state"]
+
+    engine = ENGINE_KINDS[header["engine"]](
+        seed=header["seed"],
+        population=Population(**header["population"]),
+        history_window=saved["history_window"],
+        capture_events=header["capture_events"],
+        params=MarketParams.from_dict(header["params"]) if "params" in header else None,
+        environment=_load_environment(header.get("environment")),
+        streams=RandomStreams.from_dict(header["streams"]),
+    )
+    engine.load_agent_columns(arrays)
+
+    engine.day = header["day"]
+    if engine.events is not None:
+        engine.events.day = engine.day
+        engine.events.emitted = header["events"]["emitted"]
+        engine.events.load_columns({name: arrays[f"events.{name}"] for name in ("day", "agent", "code", "payload")})
+
+    state = engine.state
+    state.date = datetime.fromisoformat(saved["date"])
+    state.season = Season[saved["season"]]
+    state.weather = saved["weather"]
+    state.headline = saved["headline"]
+    state.market_mood = saved["market_mood"]
+    state.avg_techie_cash = saved["avg_techie_cash"]
+    state.rent = saved["rent"]
+    state.prices = {Resource[name]: price for name, price in saved["prices"].items()}
+    state.rent_history = _load_series("history.rent", header["history"]["rent"], arrays)
+    state.history = {
+        Resource[name]: _load_series(f"history.{name}", meta, arrays)
+        for name, meta in header["history"].items() if name != "rent"
+    }
+    return engine
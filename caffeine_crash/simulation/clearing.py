@@ -0,0 +1,476 @@
+"""Order-book market clearing: one double auction per Resource per day.
+
+Agents submit limit orders (price, quantity, agent id) to an OrderBook.
+clear_book() sorts bids by descending and asks by ascending price, finds the
+largest volume at which the marginal bid still pays at least the marginal
+ask, and fills orders in price priority at a single clearing price. That
+is O(N log N) in the number of orders, so a few hundred thousand orders
+clear in milliseconds.
+
+ClearingMarketEngine is a VectorizedMarketEngine whose grain, bean and idli
+prices come out of these auctions instead of the random walk. The random
+walk lives on as the wider market's reference price: it posts a ladder of
+bids and asks around it, so local gluts and shortages move the local price
+within a band instead of crashing it.
+
+    python -m caffeine_crash.simulation.clearing --agents 100000 --days 365
+"""
+import argparse
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from time import perf_counter_ns
+from typing import Dict, List
+
+import numpy as np
+
+from .models import Population, Resource, RESOURCE_INDEX
+from .events import EventCode
+from .vectorized import (
+    VectorizedMarketEngine, AgentBlock, N_RESOURCES,
+    RAGI, RICE, COMMERCIAL_COFFEE, ARTISAN_COFFEE, IDLI_SET,
+)
+
+# Resources priced by the order book; the rest keep their random walk
+CLEARED = (Resource.RAGI, Resource.RICE, Resource.COMMERCIAL_COFFEE, Resource.IDLI_SET)
+
+BID_MARKUP = 0.10        # buyers pay up to this much over the reference price
+ASK_DISCOUNT = 0.10      # sellers take down to this much under it
+WHOLESALE_LEVELS = 10    # price levels the wider market quotes on each side
+WHOLESALE_BAND = 0.10    # its furthest level is this far from the reference
+WHOLESALE_DEPTH = 0.2    # depth per level, as a share of the agents' larger side
+
+# Each kind's limit prices come from its own stream ("orders", index), so
+# resizing one kind never shifts another kind's draws
+ORDER_STREAMS = ("farmers", "techies", "darshinis")
+
+
+@dataclass
+class ClearingResult:
+    """Outcome of one auction. Fills line up with the ids in submission order."""
+    resource: Resource
+    price: float             # NaN when nothing traded
+    volume: float
+    n_bids: int
+    n_asks: int
+    bid_depth: float         # total quantity bid
+    ask_depth: float         # total quantity offered
+    best_bid: float          # NaN on an empty side
+    best_ask: float
+    latency_us: float
+    bid_ids: np.ndarray
+    bid_fills: np.ndarray
+    ask_ids: np.ndarray
+    ask_fills: np.ndarray
+
+    @property
+    def spread(self) -> float:
+        return self.best_ask - self.best_bid
+
+
+def _sorted_fills(quantity: np.ndarray, volume: float) -> np.ndarray:
+    """Fill orders (already in priority order) up to `volume` units."""
+    before = np.cumsum(quantity) - quantity
+    return np.clip(volume - before, 0.0, quantity)
+
+
+def clear_book(resource: Resource, bid_price: np.ndarray, bid_qty: np.ndarray, bid_ids: np.ndarray,
+               ask_price: np.ndarray, ask_qty: np.ndarray, ask_ids: np.ndarray) -> ClearingResult:
+    """Uniform-price double auction over one resource's bids and asks."""
+    start = perf_counter_ns()
+    bid_order = np.argsort(-bid_price, kind="stable")
+    ask_order = np.argsort(ask_price, kind="stable")
+    bp, bq = bid_price[bid_order], bid_qty[bid_order]
+    ap, aq = ask_price[ask_order], ask_qty[ask_order]
+    bid_cum, ask_cum = np.cumsum(bq), np.cumsum(aq)
+    bid_depth = float(bid_cum[-1]) if len(bid_cum) else 0.0
+    ask_depth = float(ask_cum[-1]) if len(ask_cum) else 0.0
+
+    # Supply and demand are step functions of volume, so they cross at one of
+    # the breakpoints. At each one, compare the prices of the orders that
+    # hold the last unit; the matching condition stays true up to the crossing.
+    price, volume = float("nan"), 0.0
+    if bid_depth > 0 and ask_depth > 0:
+        breaks = np.concatenate((bid_cum, ask_cum))
+        breaks = np.unique(breaks[(breaks > 0) & (breaks <= min(bid_depth, ask_depth))])
+        marginal_bid = bp[np.searchsorted(bid_cum, breaks)]
+        marginal_ask = ap[np.searchsorted(ask_cum, breaks)]
+        matched = np.count_nonzero(marginal_bid >= marginal_ask)
+        if matched:
+            volume = float(breaks[matched - 1])
+            price = float(marginal_bid[matched - 1] + marginal_ask[matched - 1]) / 2
+
+    bid_fills = np.empty_like(bid_qty)
+    bid_fills[bid_order] = _sorted_fills(bq, volume)
+    ask_fills = np.empty_like(ask_qty)
+    ask_fills[ask_order] = _sorted_fills(aq, volume)
+    return ClearingResult(
+        resource=resource,
+        price=price,
+        volume=volume,
+        n_bids=len(bp),
+        n_asks=len(ap),
+        bid_depth=bid_depth,
+        ask_depth=ask_depth,
+        best_bid=float(bp[0]) if len(bp) else float("nan"),
+        best_ask=float(ap[0]) if len(ap) else float("nan"),
+        latency_us=(perf_counter_ns() - start) / 1e3,
+        bid_ids=bid_ids,
+        bid_fills=bid_fills,
+        ask_ids=ask_ids,
+        ask_fills=ask_fills,
+    )
+
+
+class OrderBook:
+    """One day's limit orders for one resource, collected in batches."""
+
+    def __init__(self, resource: Resource):
+        self.resource = resource
+        self._bids: List[tuple] = []
+        self._asks: List[tuple] = []
+
+    def __len__(self) -> int:
+        return sum(len(ids) for _, _, ids in self._bids + self._asks)
+
+    def bid(self, prices, quantities, agent_ids):
+        self._bids.append(self._batch(prices, quantities, agent_ids))
+
+    def ask(self, prices, quantities, agent_ids):
+        self._asks.append(self._batch(prices, quantities, agent_ids))
+
+    def quantity(self, side: str) -> float:
+        orders = self._bids if side == "bid" else self._asks
+        return float(sum(q.sum() for _, q, _ in orders))
+
+    @staticmethod
+    def _batch(prices, quantities, agent_ids) -> tuple:
+        ids = np.asarray(agent_ids, dtype=np.int64)
+        n = len(ids)
+        return (np.broadcast_to(np.asarray(prices, dtype=np.float64), n),
+                np.broadcast_to(np.asarray(quantities, dtype=np.float64), n),
+                ids)
+
+    @staticmethod
+    def _join(batches: List[tuple]):
+        if not batches:
+            empty = np.zeros(0)
+            return empty, empty, np.zeros(0, dtype=np.int64)
+        return tuple(np.concatenate(column) for column in zip(*batches))
+
+    def clear(self) -> ClearingResult:
+        return clear_book(self.resource, *self._join(self._bids), *self._join(self._asks))
+
+
+class ClearingStats:
+    """Running latency and depth statistics per resource, like StepProfiler for auctions."""
+
+    FIELDS = ("latency_us", "orders", "volume", "bid_depth", "ask_depth", "spread")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.days = 0
+        self.totals: Dict[Resource, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.max_latency_us: Dict[Resource, float] = defaultdict(float)
+        self.no_trade_days: Dict[Resource, int] = defaultdict(int)
+
+    def record(self, results: List[ClearingResult]):
+        self.days += 1
+        for r in results:
+            totals = self.totals[r.resource]
+            totals["latency_us"] += r.latency_us
+            totals["orders"] += r.n_bids + r.n_asks
+            totals["volume"] += r.volume
+            totals["bid_depth"] += r.bid_depth
+            totals["ask_depth"] += r.ask_depth
+            if not np.isnan(r.spread):
+                totals["spread"] += r.spread
+            self.max_latency_us[r.resource] = max(self.max_latency_us[r.resource], r.latency_us)
+            if r.volume == 0:
+                self.no_trade_days[r.resource] += 1
+
+    def report(self) -> dict:
+        days = max(self.days, 1)
+        markets = {}
+        for res, totals in self.totals.items():
+            entry = {f"mean_{name}": totals[name] / days for name in self.FIELDS}
+            entry["max_latency_us"] = self.max_latency_us[res]
+            entry["no_trade_days"] = self.no_trade_days[res]
+            markets[res.value] = entry
+        latency = sum(t["latency_us"] for t in self.totals.values())
+        orders = sum(t["orders"] for t in self.totals.values())
+        return {
+            "days": self.days,
+            "clear_mean_us_per_day": latency / days,
+            "orders_per_second": orders / (latency / 1e6) if latency else 0.0,
+            "markets": markets,
+        }
+
+
+class _Uniforms:
+    """One kind's uniforms for the day, drawn in one call and handed out in order."""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        self.used = 0
+
+    def take(self, n: int) -> np.ndarray:
+        start, self.used = self.used, self.used + n
+        return self.values[start:self.used]
+
+
+class ClearingMarketEngine(VectorizedMarketEngine):
+    """Vectorized engine whose CLEARED prices are set by daily double auctions.
+
+    Each day farmers offer their surplus crop and bid for ragi when hungry,
+    darshinis bid for rice and beans and offer their idli sets, techies bid
+    for one idli set, and the wider market quotes a ladder around the
+    reference price. Orders fill at the clearing price; whatever did not fill
+    stays in inventory (or the agent goes without).
+    """
+
+    prices_follow_agents = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Limit prices come from per-kind streams, apart from the schedule
+        # that moves the reference prices
+        self.order_rngs = {kind: self.streams.generator("orders", i) for i, kind in enumerate(ORDER_STREAMS)}
+        self.reference: Dict[Resource, float] = {res: self.state.prices[res] for res in CLEARED}
+        self.clearing_stats = ClearingStats()
+        self.last_clearing: List[ClearingResult] = []
+
+    def update_prices(self):
+        # The random walk moves the wider market's reference, not the local price
+        prices = self.state.prices
+        local = {res: prices[res] for res in CLEARED}
+        prices.update(self.reference)
+        self.move_prices()
+        self.reference = {res: prices[res] for res in CLEARED}
+        prices.update(local)
+
+    def run_agents(self):
+        self.sold = np.zeros(N_RESOURCES, dtype=np.float64)
+        self.bought = np.zeros(N_RESOURCES, dtype=np.float64)
+        books = {res: OrderBook(res) for res in CLEARED}
+        profiler = self.profiler
+        for block, phase in ((self.farmers, self._farmers_orders),
+                             (self.techies, self._techies_orders),
+                             (self.darshinis, self._darshinis_orders)):
+            if profiler is None:
+                phase(books)
+            else:
+                profiler.time_agent_kind(block.kind, len(block), phase, books)
+        for book in books.values():
+            self._add_wholesale(book)
+
+        results = [book.clear() for book in books.values()]
+        for result in results:
+            self._settle(result)
+            if result.volume > 0:
+                self.state.prices[result.resource] = max(self.params.price_floor, result.price)
+            else:
+                self.state.prices[result.resource] = self.reference[result.resource]
+        self.last_clearing = results
+        self.clearing_stats.record(results)
+
+        self._darshinis_cook()
+        self._techies_treat()
+        self.record_prices()
+
+        techies = self.techies
+        if len(techies) > 0:
+            self.state.avg_techie_cash = float(np.cumsum(techies.cash)[-1]) / len(techies)
+
+    # --- Order submission ---
+
+    def _uniforms(self, kind: str, n: int) -> "_Uniforms":
+        return _Uniforms(self.order_rngs[kind].random(n))
+
+    def _limits(self, u: np.ndarray, res: Resource, side: str) -> np.ndarray:
+        if side == "bid":
+            return self.reference[res] * (1 + BID_MARKUP * u)
+        return self.reference[res] * (1 - ASK_DISCOUNT * u)
+
+    def _farmers_orders(self, books: Dict[Resource, OrderBook]):
+        b = self.farmers
+        if len(b) == 0:
+            return
+        inv, rows = b.inventory, np.arange(len(b))
+        crop = b.crop.astype(np.intp)
+        p = self.params
+
+        weather = self.state.weather
+        yield_amt = p.yield_sunny if weather == "Sunny" else p.yield_normal
+        if weather == "Drought":
+            yield_amt = p.yield_drought
+        inv[rows, crop] += yield_amt
+        # At most one bid and one offer each
+        u = self._uniforms("farmers", 2 * len(b))
+
+        # Eat Ragi, or bid for one if there is none
+        has_ragi = inv[:, RAGI] > 0
+        inv[has_ragi, RAGI] -= 1
+        hungry = np.flatnonzero(~has_ragi)
+        limit = self._limits(u.take(len(hungry)), Resource.RAGI, "bid")
+        affordable = b.cash[hungry] >= limit
+        books[Resource.RAGI].bid(limit[affordable], 1.0, b.first_id + hungry[affordable])
+
+        # Offer everything above the crop they hold back
+        to_sell = np.maximum(0, inv[rows, crop] - p.farmer_keep)
+        for res, res_index in ((Resource.RAGI, RAGI), (Resource.RICE, RICE),
+                               (Resource.COMMERCIAL_COFFEE, COMMERCIAL_COFFEE)):
+            sellers = np.flatnonzero((crop == res_index) & (to_sell > 0))
+            if len(sellers):
+                books[res].ask(self._limits(u.take(len(sellers)), res, "ask"), to_sell[sellers],
+                               b.first_id + sellers)
+
+        if self.events is not None:
+            self.events.emit_many(b.ids, EventCode.HARVESTED, yield_amt)
+
+    def _darshinis_orders(self, books: Dict[Resource, OrderBook]):
+        b = self.darshinis
+        if len(b) == 0:
+            return
+        cash, inv = b.cash, b.inventory
+        # At most two bids and one offer each
+        u = self._uniforms("darshinis", 3 * len(b))
+
+        # Restock 10 Rice when below 5 and 5 Beans when below 2, if the whole lot is affordable.
+        # Rice is bid for first and its lot reserved, so both bids filling never costs
+        # more than the cash at hand (fills are at or below the limit)
+        p = self.params
+        unreserved = cash.copy()
+        for res, res_index, threshold, lot in (
+                (Resource.RICE, RICE, p.rice_restock_below, p.rice_lot),
+                (Resource.COMMERCIAL_COFFEE, COMMERCIAL_COFFEE, p.beans_restock_below, p.beans_lot)):
+            low = np.flatnonzero(inv[:, res_index] < threshold)
+            limit = self._limits(u.take(len(low)), res, "bid")
+            affordable = unreserved[low] >= limit * lot
+            bidders = low[affordable]
+            unreserved[bidders] -= limit[affordable] * lot
+            books[res].bid(limit[affordable], lot, b.first_id + bidders)
+
+        # Offer yesterday's idli sets
+        stocked = np.flatnonzero(inv[:, IDLI_SET] > 0)
+        books[Resource.IDLI_SET].ask(self._limits(u.take(len(stocked)), Resource.IDLI_SET, "ask"),
+                                     inv[stocked, IDLI_SET], b.first_id + stocked)
+
+    def _techies_orders(self, books: Dict[Resource, OrderBook]):
+        b = self.techies
+        if len(b) == 0:
+            return
+        b.cash += self.params.salary
+        b.cash -= self.state.rent
+
+        # SURVIVAL: bid for one idli set, never more than the cash at hand
+        u = self.order_rngs["techies"].random(len(b))
+        limit = np.minimum(self._limits(u, Resource.IDLI_SET, "bid"), b.cash)
+        solvent = np.flatnonzero(limit > 0)
+        books[Resource.IDLI_SET].bid(limit[solvent], 1.0, b.first_id + solvent)
+
+    def _add_wholesale(self, book: OrderBook):
+        """The wider market's ladder of bids and asks around the reference price."""
+        depth = max(book.quantity("bid"), book.quantity("ask"), 1.0) * WHOLESALE_DEPTH
+        steps = WHOLESALE_BAND * np.arange(1, WHOLESALE_LEVELS + 1) / WHOLESALE_LEVELS
+        reference = self.reference[book.resource]
+        outside = np.full(WHOLESALE_LEVELS, -1)
+        book.bid(reference * (1 - steps), depth, outside)
+        book.ask(reference * (1 + steps), depth, outside)
+
+    # --- Settlement and what happens after trading ---
+
+    def _settle(self, result: ClearingResult):
+        if result.volume == 0:
+            return
+        res_index = RESOURCE_INDEX[result.resource]
+        for ids, fills, sign in ((result.bid_ids, result.bid_fills, 1),
+                                 (result.ask_ids, result.ask_fills, -1)):
+            mine = (ids >= 0) & (fills > 0)
+            ids, fills = ids[mine], fills[mine]
+            for block in self.blocks:
+                rows = ids - block.first_id
+                in_block = (rows >= 0) & (rows < len(block))
+                if not in_block.any():
+                    continue
+                rows, units = rows[in_block], fills[in_block]
+                block.cash[rows] -= sign * units * result.price
+                block.inventory[rows, res_index] += sign * units
+            flow = float(fills.sum())
+            if sign > 0:
+                self.bought[res_index] += flow
+            else:
+                self.sold[res_index] += flow
+
+    def _darshinis_cook(self):
+        b = self.darshinis
+        if len(b) == 0:
+            return
+        inv = b.inventory
+        # Production: 1 Rice + 0.2 Coffee -> 5 Idli Sets
+        cooks = (inv[:, RICE] >= 1) & (inv[:, COMMERCIAL_COFFEE] >= 0.2)
+        inv[cooks, RICE] -= 1
+        inv[cooks, COMMERCIAL_COFFEE] -= 0.2
+        inv[cooks, IDLI_SET] += self.params.idli_per_batch
+        if self.events is not None:
+            self.events.emit_many(b.ids, EventCode.COOKED, np.where(cooks, self.params.idli_per_batch, 0))
+
+    def _techies_treat(self):
+        b = self.techies
+        if len(b) == 0:
+            return
+        cash, inv = b.cash, b.inventory
+        fed = self._filled(Resource.IDLI_SET, b)
+        # LUXURY: Artisan Coffee from the cafes, only above the savings target
+        coffee_price = self.state.prices[Resource.ARTISAN_COFFEE]
+        sips = fed & (cash > self.params.savings_target) & (cash >= coffee_price)
+        self.saving = ~sips
+        cash[sips] -= coffee_price
+        inv[sips, ARTISAN_COFFEE] += 1
+        self.bought[ARTISAN_COFFEE] += np.count_nonzero(sips)
+        if self.events is not None:
+            codes = np.where(sips, EventCode.SIPPED_COFFEE, EventCode.SAVING_MODE)
+            self.events.emit_many(b.ids, codes, self.state.rent)
+
+    def _filled(self, res: Resource, block: AgentBlock) -> np.ndarray:
+        """Which rows of `block` bought some `res` in today's auction."""
+        got = np.zeros(len(block), dtype=bool)
+        for result in self.last_clearing:
+            if result.resource is res:
+                rows = result.bid_ids[result.bid_fills > 0] - block.first_id
+                got[rows[(rows >= 0) & (rows < len(block))]] = True
+        return got
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the order-book engine and report clearing statistics.")
+    parser.add_argument("--agents", type=int, default=16)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = ClearingMarketEngine(seed=args.seed, population=Population().scaled(args.agents / Population().total),
+                                  history_window=args.days + 1, capture_events=False)
+    start = time.perf_counter()
+    for _ in range(args.days):
+        engine.step()
+    elapsed = time.perf_counter() - start
+
+    report = engine.clearing_stats.report()
+    print(f"{engine.population.total:,} agents, {args.days} days in {elapsed:.2f}s; "
+          f"clearing {report['clear_mean_us_per_day'] / 1e3:.2f} ms/day, "
+          f"{report['orders_per_second']:,.0f} orders/s")
+    print(f"\n{'market':<14}{'price':>10}{'reference':>11}{'orders':>10}{'volume':>11}"
+          f"{'bid depth':>11}{'ask depth':>11}{'spread':>9}{'mean us':>9}{'max us':>9}")
+    for res in CLEARED:
+        m = report["markets"][res.value]
+        print(f"{res.value:<14}{engine.state.prices[res]:>10.2f}{engine.reference[res]:>11.2f}"
+              f"{m['mean_orders']:>10,.0f}{m['mean_volume']:>11,.0f}{m['mean_bid_depth']:>11,.0f}"
+              f"{m['mean_ask_depth']:>11,.0f}{m['mean_spread']:>9.2f}{m['mean_latency_us']:>9.0f}"
+              f"{m['max_latency_us']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
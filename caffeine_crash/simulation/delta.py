@@ -0,0 +1,163 @@
+"""Compact binary deltas between Snapshots, for streaming to live viewers.
+
+A stream starts with the 8-byte STREAM_MAGIC, then carries frames
+(all integers little-endian):
+
+    uint32   payload length
+    uint8    kind: KEYFRAME (every field) or DELTA (only what changed)
+    uint32   day
+    int32    date as a proleptic Gregorian ordinal
+    uint8    field mask, FIELD_* bits
+    ...      each field whose bit is set, in bit order:
+             SEASON   uint8 index into Season
+             WEATHER  uint8 index into WEATHERS
+             MOOD     uint8 index into MOODS
+             RENT     float64
+             CASH     float64 average techie cash
+             SPEED    float32 measured days per second
+             HEADLINE uint16 length + UTF-8
+             PRICES   uint8 Resource mask + one float64 per set bit
+
+A quiet day (three prices moved, nothing else) is about 40 bytes.
+"""
+import struct
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from .models import Resource, Season, WEATHERS, MOODS
+from .runner import Snapshot
+
+STREAM_MAGIC = b"CCSTRM\x00\x01"
+KEYFRAME, DELTA = 0, 1
+
+FIELD_SEASON = 1 << 0
+FIELD_WEATHER = 1 << 1
+FIELD_MOOD = 1 << 2
+FIELD_RENT = 1 << 3
+FIELD_CASH = 1 << 4
+FIELD_SPEED = 1 << 5
+FIELD_HEADLINE = 1 << 6
+FIELD_PRICES = 1 << 7
+
+RESOURCES = list(Resource)
+SEASONS = list(Season)
+_LENGTH = struct.Struct("<I")
+_HEADER = struct.Struct("<BIiB")
+_F64 = struct.Struct("<d")
+_F32 = struct.Struct("<f")
+_U16 = struct.Struct("<H")
+
+
+def encode_frame(snapshot: Snapshot, previous: Optional[Snapshot] = None) -> bytes:
+    """Length-prefixed frame taking a viewer from `previous` to `snapshot`.
+
+    Without `previous` this is a keyframe with every field.
+    """
+    key = previous is None
+    mask = 0
+    body = bytearray()
+
+    if key or snapshot.season != previous.season:
+        mask |= FIELD_SEASON
+        body.append(SEASONS.index(snapshot.season))
+    if key or snapshot.weather != previous.weather:
+        mask |= FIELD_WEATHER
+        body.append(WEATHERS.index(snapshot.weather))
+    if key or snapshot.market_mood != previous.market_mood:
+        mask |= FIELD_MOOD
+        body.append(MOODS.index(snapshot.market_mood))
+    if key or snapshot.rent != previous.rent:
+        mask |= FIELD_RENT
+        body += _F64.pack(snapshot.rent)
+    if key or snapshot.avg_techie_cash != previous.avg_techie_cash:
+        mask |= FIELD_CASH
+        body += _F64.pack(snapshot.avg_techie_cash)
+    if key or snapshot.days_per_second != previous.days_per_second:
+        mask |= FIELD_SPEED
+        body += _F32.pack(snapshot.days_per_second)
+    if key or snapshot.headline != previous.headline:
+        mask |= FIELD_HEADLINE
+        text = snapshot.headline.encode("utf-8")[:0xFFFF]
+        body += _U16.pack(len(text)) + text
+
+    price_mask = 0
+    prices = bytearray()
+    for i, res in enumerate(RESOURCES):
+        price = snapshot.prices.get(res)
+        if price is not None and (key or price != previous.prices.get(res)):
+            price_mask |= 1 << i
+            prices += _F64.pack(price)
+    if price_mask:
+        mask |= FIELD_PRICES
+        body.append(price_mask)
+        body += prices
+
+    header = _HEADER.pack(KEYFRAME if key else DELTA, snapshot.day, snapshot.date.toordinal(), mask)
+    return _LENGTH.pack(len(header) + len(body)) + header + body
+
+
+@dataclass
+class MarketView:
+    """A viewer's copy of the market, rebuilt from frames.
+
+    Field names follow Snapshot (and MarketState), so display code works
+    with any of them.
+    """
+    day: int = -1
+    date: datetime = datetime(1970, 1, 1)
+    season: Season = Season.WINTER
+    weather: str = WEATHERS[0]
+    market_mood: str = MOODS[0]
+    headline: str = ""
+    rent: float = 0.0
+    avg_techie_cash: float = 0.0
+    days_per_second: float = 0.0
+    prices: Dict[Resource, float] = field(default_factory=dict)
+    changed: int = 0   # field mask of the last applied frame
+
+    def apply(self, payload: bytes):
+        """Apply one frame's payload (without its length prefix)."""
+        kind, day, ordinal, mask = _HEADER.unpack_from(payload)
+        if kind == DELTA and self.day < 0:
+            raise ValueError("Delta frame before the first keyframe")
+        pos = _HEADER.size
+        self.day = day
+        self.date = datetime.fromordinal(ordinal)
+        self.changed = mask
+        if mask & FIELD_SEASON:
+            self.season = SEASONS[payload[pos]]
+            pos += 1
+        if mask & FIELD_WEATHER:
+            self.weather = WEATHERS[payload[pos]]
+            pos += 1
+        if mask & FIELD_MOOD:
+            self.market_mood = MOODS[payload[pos]]
+            pos += 1
+        if mask & FIELD_RENT:
+            self.rent, = _F64.unpack_from(payload, pos)
+            pos += 8
+        if mask & FIELD_CASH:
+            self.avg_techie_cash, = _F64.unpack_from(payload, pos)
+            pos += 8
+        if mask & FIELD_SPEED:
+            self.days_per_second, = _F32.unpack_from(payload, pos)
+            pos += 4
+        if mask & FIELD_HEADLINE:
+            n, = _U16.unpack_from(payload, pos)
+            pos += 2
+            self.headline = payload[pos:pos + n].decode("utf-8", errors="replace")
+            pos += n
+        if mask & FIELD_PRICES:
+            price_mask = payload[pos]
+            pos += 1
+            for i, res in enumerate(RESOURCES):
+                if price_mask & (1 << i):
+                    self.prices[res], = _F64.unpack_from(payload, pos)
+                    pos += 8
+
+
+async def read_frame(reader) -> bytes:
+    """Next frame payload from an asyncio StreamReader (IncompleteReadError at EOF)."""
+    length, = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return await reader.readexactly(length)
@@ -1,63 +1,143 @@
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import timedelta
-import random
-from .models import MarketState, Resource, Region, Season
-from .agents import Agent, Farmer, Techie, DarshiniOwner
+import numpy as np
+from .models import MarketState, Resource, Season, Population, RESOURCE_INDEX
+from .params import MarketParams, DEFAULT_PARAMS
+from .history import DAILY_WINDOW
+from .events import EventLog
+from .agents import Agent, Techie, build_population, price_vector
+from .environment import EnvironmentDay, EnvironmentSchedule
+from .streams import RandomStreams
+from .aggregates import KindStats, PopulationStats
+from .pricing import rules_for
+
+NAN = float("nan")
+
+# What step() runs after advancing the date, in order: (phase name, engine
+# method). The profiler and fast-forward run the same list, so a phase
+# added here shows up in all three.
+STEP_PHASES: Tuple[Tuple[str, str], ...] = (
+    ("weather", "update_season_and_weather"),
+    ("prices", "update_prices"),
+    ("agents", "run_agents"),
+    ("mood", "update_mood"),
+    ("recorders", "notify_recorders"),
+)
 
 class MarketEngine:
-    def __init__(self):
-        self.state = MarketState()
+    # Whether today's prices depend on what agents did (fastforward.py can
+    # skip agents entirely when they do not)
+    prices_follow_agents = False
+
+    def __init__(self, seed: Optional[int] = None, population: Optional[Population] = None,
+                 history_window: int = DAILY_WINDOW, capture_events: bool = True,
+                 params: Optional[MarketParams] = None,
+                 environment: Optional[EnvironmentSchedule] = None,
+                 streams: Optional[RandomStreams] = None):
+        self.seed = seed
+        # Every random number the engine uses comes from these (RandomStreams(seed) if not given)
+        self.streams = streams or RandomStreams(seed)
+        # Weather, rent hikes and price noise, drawn a block of days at a time;
+        # engines given the same schedule face the same environment
+        self.environment = environment or EnvironmentSchedule(streams=self.streams)
+        self._env_day: Optional[EnvironmentDay] = None
+        self.population = population or Population()
+        self.params = params or DEFAULT_PARAMS
+        # Compiled price rules, shared by every engine with these params
+        self.price_rules = rules_for(self.params)
+        # The schedule columns of the price rules' draws, in slot order
+        self._draw_layout = tuple((key, RESOURCE_INDEX[res] if key == "change" else None)
+                                  for key, res in self.price_rules.slots)
+        self.state = MarketState(history_window=history_window, rent=self.params.initial_rent,
+                                 avg_techie_cash=self.params.techie_cash)
+        self.day = 0
         self.agents: List[Agent] = self._init_agents()
-        self.logs: List[str] = []
+        # Agents come in kind order, so each kind is one contiguous id range
+        self.kind_slices: Dict[str, slice] = self.population.kind_slices()
+        self.techie_agents: List[Techie] = self.agents[self.kind_slices["techie"]]
+        self._population_stats: Optional[PopulationStats] = None
+        # Headless runs can skip event capture entirely
+        self.events: Optional[EventLog] = EventLog(self.describe_agent) if capture_events else None
+        # Objects with a record(engine) method, called once at the end of every step
+        self.recorders: List = []
+        # Optional StepProfiler; None means no instrumentation at all
+        self.profiler = None
+        # Off while fast-forwarding (see fastforward.py)
+        self.record_history = True
+        # STEP_PHASES bound to this engine
+        self.step_phases: List[Tuple[str, Callable[[], None]]] = [
+            (name, getattr(self, method)) for name, method in STEP_PHASES]
+
+    @property
+    def logs(self) -> List[str]:
+        """Recent agent activity as text, newest first."""
+        return self.recent_logs()
+
+    def recent_logs(self, n: int = 50) -> List[str]:
+        if self.events is None:
+            return []
+        return self.events.recent(n)
+
+    def describe_agent(self, agent_id: int) -> Tuple[str, Optional[Resource]]:
+        """(name, crop) of an agent, used to format its events."""
+        agent = self.agents[agent_id]
+        return agent.name, getattr(agent, "crop", None)
 
     def _init_agents(self) -> List[Agent]:
-        agents = []
-        # Mandya Farmers
-        for i in range(5):
-            agents.append(Farmer(f"Raitha-{i}", Region.MANDYA, Resource.RAGI))
-        
-        # Coorg Planters - Now producing COMMERCIAL_COFFEE
-        for i in range(3):
-            agents.append(Farmer(f"Planter-{i}", Region.COORG, Resource.COMMERCIAL_COFFEE))
-            
-        # Bengaluru Techies
-        for i in range(5):
-            agents.append(Techie(f"Dev-{i}"))
-            
-        # Darshinis
-        for i in range(3):
-            agents.append(DarshiniOwner(f"Darshini-{i}"))
-            
-        return agents
+        # Mandya Farmers and Paddy Growers, Coorg Planters (COMMERCIAL_COFFEE),
+        # Bengaluru Techies and Darshinis, built in bulk
+        return build_population(self.population, self.params)
+
+    def agent_columns(self) -> Dict[str, np.ndarray]:
+        """Agent cash and inventories as arrays in agent id order, plus today's
+        SAVING MODE flags (for checkpoints)."""
+        n = len(self.agents)
+        cash = np.fromiter((agent.cash for agent in self.agents), dtype=np.float64, count=n)
+        inventory = np.array([agent.inventory for agent in self.agents], dtype=np.float64).reshape(n, len(Resource))
+        return {"agents.cash": cash, "agents.inventory": inventory, "techies.saving": self.techie_saving()}
+
+    def load_agent_columns(self, columns: Dict[str, np.ndarray]):
+        """Inverse of agent_columns(), applied to freshly initialised agents."""
+        rows = columns["agents.inventory"].tolist()
+        for agent, cash, row in zip(self.agents, columns["agents.cash"].tolist(), rows):
+            agent.cash = cash
+            agent.inventory = row
+        for techie, saving in zip(self.techie_agents, columns["techies.saving"].tolist()):
+            techie.saving = saving
+
+    def kind_cash(self, kind: str) -> np.ndarray:
+        """Cash of every agent of `kind` (a key of kind_slices), in id order.
+
+        One Python pass over that kind's agents; the vectorized engine returns a view.
+        """
+        agents = self.agents[self.kind_slices[kind]]
+        return np.fromiter((agent.cash for agent in agents), dtype=np.float64, count=len(agents))
+
+    def techie_saving(self) -> np.ndarray:
+        """Which techies are in SAVING MODE today (skipped their coffee)."""
+        techies = self.techie_agents
+        return np.fromiter((techie.saving for techie in techies), dtype=bool, count=len(techies))
+
+    def population_stats(self) -> PopulationStats:
+        """Cash mean, spread and p10/p50/p90 per agent kind, computed at most once a day."""
+        stats = self._population_stats
+        if stats is None or stats.day != self.day:
+            kinds = {}
+            for kind, ids in self.kind_slices.items():
+                if ids.stop > ids.start:
+                    saving = self.techie_saving() if kind == "techie" else None
+                    kinds[kind] = KindStats.from_cash(kind, self.kind_cash(kind), saving)
+            stats = self._population_stats = PopulationStats(self.day, kinds)
+        return stats
 
     def update_season_and_weather(self):
-        month = self.state.date.month
-        
-        # Determine Season based on Month
-        new_season = Season.WINTER
-        if 3 <= month <= 5:
-            new_season = Season.SUMMER
-        elif 6 <= month <= 9:
-            new_season = Season.MONSOON
-        elif 10 <= month <= 12:
-            new_season = Season.POST_MONSOON
-        
+        env_day = self._env_day = self.environment.day(self.day)
+        new_season, new_weather = env_day.season, env_day.weather
+
         if new_season != self.state.season:
             self.state.season = new_season
             self.state.headline = f"SEASON CHANGE: {new_season.value} has arrived!"
 
-        # Determine Weather based on Season
-        weights = []
-        if self.state.season == Season.MONSOON:
-            weights = ["Rainy"] * 70 + ["Cloudy"] * 20 + ["Sunny"] * 10
-        elif self.state.season == Season.SUMMER:
-            weights = ["Sunny"] * 80 + ["Drought"] * 15 + ["Rainy"] * 5
-        elif self.state.season == Season.WINTER:
-            weights = ["Sunny"] * 60 + ["Cloudy"] * 30 + ["Rainy"] * 10
-        else: # Post-Monsoon
-            weights = ["Cloudy"] * 40 + ["Sunny"] * 40 + ["Rainy"] * 20
-        
-        new_weather = random.choice(weights)
         if new_weather != self.state.weather and new_weather == "Drought":
              self.state.headline = "ALERT: Severe drought conditions reported!"
         elif new_weather == "Rainy" and self.state.season != Season.MONSOON:
@@ -66,115 +146,107 @@ class MarketEngine:
         self.state.weather = new_weather
 
     def update_prices(self):
-        headlines = []
+        self.move_prices()
+        self.record_prices()
+
+    def move_prices(self):
+        """Apply today's rent shock and price moves to the market state."""
+        p = self.params
+        state = self.state
+        headline = None
+        if self._env_day is None:
+            # Called before the first step (the benchmarks do): use day 1's draws
+            self._env_day = self.environment.day(self._draw_day)
         
         # --- 1. RENT SHOCK LOGIC ---
         # 2% chance of a Rent Hike (Landlord Greed)
-        if random.random() < 0.02:
-            hike = random.choice([100, 200, 500])
-            self.state.rent += hike
-            headlines.append(f"RENT HIKE! Landlords demand ₹{self.state.rent:.0f}/day.")
-        
-        # --- 2. COST-PUSH INFLATION (Idli) ---
-        # Cost = 1.5 * RICE + 0.5 * Commercial_Coffee + 10
-        coffee_cost = self.state.prices[Resource.COMMERCIAL_COFFEE]
-        cost_basis = (self.state.prices[Resource.RICE] * 1.5) + (coffee_cost * 0.1) + 10
-        target_idli_price = cost_basis * 1.2
-        current_idli = self.state.prices[Resource.IDLI_SET]
-        self.state.prices[Resource.IDLI_SET] = current_idli + (target_idli_price - current_idli) * 0.2
-        
-        for res in Resource:
-            if res == Resource.INR or res == Resource.IDLI_SET:
-                continue
-            
-            volatility = 0.02
-            change = random.uniform(1 - volatility, 1 + volatility)
-            
-            # --- Specific Resource Logic ---
-            
-            # ARTISAN COFFEE (The Luxury Index)
-            if res == Resource.ARTISAN_COFFEE:
-                # 1. Cost-Push Factor: Linked to raw bean prices
-                raw_bean_price = self.state.prices[Resource.COMMERCIAL_COFFEE]
-                # If raw beans are expensive (> 260), cafes raise prices
-                if raw_bean_price > 260:
-                    change += 0.01
-                
-                # 2. Demand Factor: Rent Squeeze
-                # Instead of a crash, demand softens gently
-                if self.state.rent > 3000:
-                    change -= 0.015 # Recessionary drag
-                    if random.random() < 0.1: headlines.append("Cafes reporting lower footfall.")
-                elif self.state.rent > 2500:
-                    change -= 0.005 # Mild slowing
-                else:
-                    change += 0.005 # Healthy growth
-                
-                # Ensure it doesn't decouple completely from reality
-                if self.state.prices[res] > 500: change -= 0.02 # Ceiling correction
-            
-            # COMMERCIAL COFFEE (Raw Material)
-            if res == Resource.COMMERCIAL_COFFEE:
-                if self.state.weather == "Drought":
-                    change += 0.04
-                    if random.random() < 0.2: headlines.append("Coffee crop failure in Coorg!")
-
-            # RICE/RAGI
-            if (res == Resource.RAGI or res == Resource.RICE) and self.state.weather == "Drought":
-                change += 0.05
-                if random.random() < 0.2: headlines.append(f"{res.value} shortage due to drought.")
-
-            # CODE
-            if res == Resource.CODE:
-                # Slight upward bias to simulate industry growth
-                change += 0.001
-                
-                if random.random() < 0.05: 
-                    # Reduced volatility: +/- 5% instead of 10%
-                    shift = random.choice([-0.05, 0.05])
-                    change += shift
-
-            self.state.prices[res] *= change
-            if self.state.prices[res] < 5: self.state.prices[res] = 5
-            self.state.history[res].append(self.state.prices[res])
-        
-        # History for Idli
-        self.state.history[Resource.IDLI_SET].append(self.state.prices[Resource.IDLI_SET])
-        
-        # History for Rent
+        if self._chance("rent_hike") < p.rent_hike_prob:
+            hike = self._pick("rent_pick", p.rent_hikes)
+            state.rent += hike
+            headline = f"RENT HIKE! Landlords demand ₹{state.rent:.0f}/day."
+
+        # --- 2. PRICE RULES (cost-push, random walks, shocks; see pricing.py) ---
+        rules = self.price_rules
+        prices = [state.prices.get(res, 0.0) for res in Resource]
+        drought = state.weather == "Drought"
+        draws = self._price_draws(rules.gates_one(prices, state.rent, drought))
+        shown = rules.apply_one(prices, state.rent, drought, draws, self._pick)
+        for res in rules.moves:
+            state.prices[res] = prices[RESOURCE_INDEX[res]]
+
+        if headline is None and shown >= 0:
+            headline = rules.headlines[shown]
+        if headline is not None:
+            state.headline = headline
+
+    # Random draws of move_prices(): today's scheduled value for each purpose
+
+    @property
+    def _draw_day(self) -> int:
+        # Schedule days start at 1; day 0 is before the first step
+        return max(self.day, 1)
+
+    def _chance(self, key: str) -> float:
+        return getattr(self._env_day, key)
+
+    def _pick(self, key: str, options):
+        return options[int(getattr(self._env_day, key) * len(options))]
+
+    def _price_draws(self, gates: List[bool]) -> List[float]:
+        """The price rules' draws for today, NaN where a roll is not taken."""
+        draws = self.environment.draws(self._draw_layout, self._draw_day)
+        return [draw if gate else NAN for gate, draw in zip(gates, draws)]
+
+    def record_prices(self):
+        """Append today's prices and rent to the history."""
+        if not self.record_history:
+            return
+        for res, price in self.state.prices.items():
+            self.state.history[res].append(price)
         self.state.rent_history.append(self.state.rent)
-            
-        if headlines:
-            self.state.headline = headlines[0]
 
     def step(self):
+        if self.profiler is not None:
+            self.profiler.profile_step(self)
+            return
+        self.advance_date()
+        for _, phase in self.step_phases:
+            phase()
+
+    def advance_date(self):
+        self.day += 1
+        if self.events is not None:
+            self.events.day = self.day
         self.state.date += timedelta(days=1)
-        self.update_season_and_weather()
-        self.update_prices()
-        
-        daily_logs = []
-        total_techie_cash = 0
-        techie_count = 0
-        
-        for agent in self.agents:
-            log = agent.act(self.state)
-            daily_logs.append(log)
-            if isinstance(agent, Techie):
-                total_techie_cash += agent.cash
-                techie_count += 1
+
+    def notify_recorders(self):
+        for recorder in self.recorders:
+            recorder.record(self)
+
+    def run_agents(self):
+        """Let every agent act once and refresh the techie cash aggregate."""
+        # Every agent reads the same prices, so resolve them once
+        prices = price_vector(self.state.prices)
+        if self.profiler is None:
+            state, events = self.state, self.events
+            for agent in self.agents:
+                agent.act(state, events, prices)
+        else:
+            self.profiler.time_agents(self.agents, self.state, self.events, prices)
         
         # Update Aggregate Stats
-        if techie_count > 0:
-            self.state.avg_techie_cash = total_techie_cash / techie_count
-            
+        total_techie_cash = 0
+        for techie in self.techie_agents:
+            total_techie_cash += techie.cash
+        if self.techie_agents:
+            self.state.avg_techie_cash = total_techie_cash / len(self.techie_agents)
+
+    def update_mood(self):
         # Determine Mood based on savings vs rent
         savings_ratio = self.state.avg_techie_cash / self.state.rent
-        if savings_ratio < 5:
+        if savings_ratio < self.params.panic_ratio:
             self.state.market_mood = "Panic"
-        elif savings_ratio < 15:
+        elif savings_ratio < self.params.anxious_ratio:
             self.state.market_mood = "Anxious"
         else:
             self.state.market_mood = "Optimistic"
-        
-        self.logs = daily_logs + self.logs 
-        self.logs = self.logs[:50]
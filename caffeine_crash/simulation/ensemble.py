@@ -0,0 +1,429 @@
+"""Many markets stepped in lockstep, one ensemble member per row.
+
+    ensemble = EnsembleEngine(seeds=range(10_000))              # default params
+    ensemble = EnsembleEngine(seeds=seeds, params=variants)     # one MarketParams per member
+    ensemble = EnsembleEngine.spawn(10_000, seed=7)             # members spawned from one seed
+    for _ in range(365):
+        ensemble.step()
+    ensemble.prices[:, RESOURCE_INDEX[Resource.RAGI]]           # today's ragi price, per member
+    ensemble.view(42)                                           # one member, as a MarketView
+
+    python -m caffeine_crash.simulation.ensemble --members 10000 --days 365
+
+Every piece of market state (prices, rent, weather, mood, headline, agent
+cash and inventories) is an array with a leading member axis, and step()
+advances all of them with the same few dozen NumPy operations, so the cost
+of a day barely depends on how many members there are. Members share the
+population and the calendar (so seasons change together); seeds, params
+and everything that follows from them are per member.
+
+Member k reproduces MarketEngine(streams=ensemble.streams[k],
+params=ensemble.params[k]) bit for bit: it reads the same environment
+stream and does the same arithmetic in the same order (tests/test_parity.py
+holds them to it). There is no per-day history, event log or
+checkpointing; record what a dashboard needs from the arrays after each
+step.
+"""
+import argparse
+import time
+from dataclasses import dataclass, fields
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .environment import DEFAULT_START, DRAW_COLUMNS, N_DRAWS, SEASONS, draw_generator, weather_codes
+from .delta import MarketView
+from .models import MOODS, WEATHERS, MarketState, Population, Resource, Season, RESOURCE_INDEX, season_for_month
+from .params import DEFAULT_PARAMS, MarketParams
+from .pricing import PriceRules, Rule, compile_rules, default_rules
+from .streams import RandomStreams
+from .vectorized import (ARTISAN_COFFEE, COMMERCIAL_COFFEE, IDLI_SET, N_RESOURCES, RAGI, RICE)
+
+# Days of each member's schedule read per refill: more is fewer Python calls
+# per member, less is less memory (members * DEFAULT_CHUNK * N_DRAWS floats)
+DEFAULT_CHUNK = 32
+# Members turned day-major at a time; small enough to stay in cache
+TRANSPOSE_MEMBERS = 64
+
+SUNNY, DROUGHT, RAINY = (WEATHERS.index(w) for w in ("Sunny", "Drought", "Rainy"))
+OPTIMISTIC, ANXIOUS, PANIC = (MOODS.index(m) for m in ("Optimistic", "Anxious", "Panic"))
+# The resources MarketState has a price for, in its order
+PRICED = list(MarketState().prices)
+
+OPENING = "Market opens: Rents are stable."
+DROUGHT_ALERT = "ALERT: Severe drought conditions reported!"
+RAIN_SURPRISE = "Unexpected rains surprise citizens."
+RENT_HIKE = "RENT HIKE! Landlords demand ₹{rent:.0f}/day."
+
+
+class EnsembleSchedule:
+    """Every member's environment draws, read as one (N_DRAWS, members) array per day.
+
+    Each member's stream is pulled `chunk` rows (days) at a time, which holds
+    a month of draws per member rather than a year, and turned day-major a
+    few hundred members at a time, so each of a day's draws is one
+    contiguous row across members. Days must be read in order.
+    """
+
+    def __init__(self, streams: Sequence[RandomStreams], chunk: int = DEFAULT_CHUNK):
+        self._generators = [draw_generator(s) for s in streams]
+        self._rows = np.empty((chunk, N_DRAWS, len(self._generators)))
+        self._scratch = np.empty((min(len(self._generators), TRANSPOSE_MEMBERS), chunk, N_DRAWS))
+        self._first_day = 1 - chunk          # day of self._rows[0]
+
+    def draws(self, day: int) -> np.ndarray:
+        """(N_DRAWS, members) uniforms of `day`, rows in DRAW_COLUMNS order."""
+        i = day - self._first_day
+        if not 0 <= i < len(self._rows):
+            if i != len(self._rows):
+                raise ValueError(f"Ensemble schedules are read day by day, not day {day} after {self._first_day + i - 1}")
+            self._fill()
+            i = 0
+        return self._rows[i]
+
+    def _fill(self):
+        scratch = self._scratch
+        for first in range(0, len(self._generators), len(scratch)):
+            generators = self._generators[first:first + len(scratch)]
+            for rows, generator in zip(scratch, generators):
+                generator.random(out=rows)
+            self._rows[:, :, first:first + len(generators)] = scratch[:len(generators)].transpose(1, 2, 0)
+        self._first_day += len(self._rows)
+
+
+@dataclass
+class EnsembleBlock:
+    """All agents of one kind in every member: an AgentBlock with a member axis.
+
+    Columns are (members, n) but stored agent by agent (Fortran order), so
+    every operation runs along the long member axis, not the few agents.
+    """
+    kind: str
+    first_id: int
+    cash: np.ndarray        # (members, n) float64
+    inventory: np.ndarray   # (N_RESOURCES, members, n), one (members, n) slab per resource
+
+    @property
+    def n(self) -> int:
+        return self.cash.shape[1]
+
+    @classmethod
+    def create(cls, kind: str, first_id: int, members: int, n: int, cash, inventory: dict) -> "EnsembleBlock":
+        inv = np.zeros((N_RESOURCES, n, members), dtype=np.float64).transpose(0, 2, 1)
+        for res, amount in inventory.items():
+            inv[RESOURCE_INDEX[res]] = amount
+        cash = np.broadcast_to(np.reshape(cash, (-1, 1)), (members, n)).copy(order="F")
+        return cls(kind, first_id, cash, inv)
+
+
+@dataclass
+class _RuleGroup:
+    """Members sharing one set of compiled price rules (their params may differ elsewhere)."""
+    rules: PriceRules
+    rows: Optional[np.ndarray]     # None: every member
+    layout: np.ndarray             # DRAW_COLUMNS column of each price-rule slot
+    headlines: np.ndarray          # ensemble headline code of each rules.headlines entry
+
+
+class EnsembleEngine:
+    """K MarketEngines' state as arrays, advanced together by step()."""
+
+    def __init__(self, seeds: Optional[Iterable[Optional[int]]] = None,
+                 params: Union[None, MarketParams, Sequence[MarketParams]] = None,
+                 population: Optional[Population] = None,
+                 streams: Optional[Sequence[RandomStreams]] = None, chunk: int = DEFAULT_CHUNK):
+        if streams is None:
+            if seeds is None:
+                raise ValueError("EnsembleEngine needs seeds or streams, one per member")
+            streams = [RandomStreams(seed) for seed in seeds]
+        self.streams = list(streams)
+        self.seeds = [s.seed for s in self.streams]
+        K = self.members = len(self.streams)
+        if params is None or isinstance(params, MarketParams):
+            params = [params or DEFAULT_PARAMS] * K
+        self.params = list(params)
+        if len(self.params) != K:
+            raise ValueError(f"{len(self.params)} params for {K} members")
+        self.population = population or Population()
+        self.environment = EnsembleSchedule(self.streams, chunk=chunk)
+
+        self.day = 0
+        self.date = DEFAULT_START
+        self.season = MarketState().season
+        self.weather = np.full(K, WEATHERS.index(MarketState().weather), dtype=np.int8)
+        self.mood = np.full(K, MOODS.index(MarketState().market_mood), dtype=np.int8)
+        self.rent = self._param_array("initial_rent")
+        self.avg_techie_cash = self._param_array("techie_cash")
+        opening = MarketState().prices
+        # Resource by resource in memory, like the agent columns
+        self.prices = np.tile([opening.get(res, 0.0) for res in Resource], (K, 1)).copy(order="F")
+
+        # Headlines are codes into self.headlines; rent hikes also keep the
+        # rent they announced
+        self.headlines = [OPENING, *(f"SEASON CHANGE: {s.value} has arrived!" for s in SEASONS),
+                          DROUGHT_ALERT, RAIN_SURPRISE, RENT_HIKE]
+        self.headline = np.zeros(K, dtype=np.int16)
+        self.headline_rent = np.zeros(K)
+
+        self._p = {f.name: self._param_column(f.name) for f in fields(MarketParams) if f.name != "rent_hikes"}
+        hikes = [p.rent_hikes for p in self.params]
+        self._n_hikes = np.array([len(h) for h in hikes])
+        self._rent_hikes = np.zeros((K, self._n_hikes.max()))
+        for k, h in enumerate(hikes):
+            self._rent_hikes[k, :len(h)] = h
+        yields = np.stack([self._param_array(f"yield_{w}") for w in ("sunny", "normal", "normal", "drought")], axis=1)
+        self._yields = yields[0] if (yields == yields[0]).all() else yields   # by WEATHERS code
+        self._groups = self._group_rules()
+
+        pop = self.population
+        farmers = pop.farmers + pop.rice_farmers + pop.planters
+        # Same agent order (and ids) as MarketEngine; farmers, paddy growers
+        # and planters differ only in their crop
+        self.farmers = EnsembleBlock.create("farmer", 0, K, farmers, self._param_array("farmer_cash"),
+                                            {Resource.RAGI: 10})
+        self.crops = [(crop, cols) for crop, cols in (
+            (RAGI, slice(0, pop.farmers)),
+            (RICE, slice(pop.farmers, pop.farmers + pop.rice_farmers)),
+            (COMMERCIAL_COFFEE, slice(pop.farmers + pop.rice_farmers, farmers)),
+        ) if cols.stop > cols.start]
+        self.techies = EnsembleBlock.create("techie", farmers, K, pop.techies, self._param_array("techie_cash"), {})
+        self.darshinis = EnsembleBlock.create(
+            "darshini", farmers + pop.techies, K, pop.darshinis, self._param_array("darshini_cash"),
+            {Resource.RICE: 10, Resource.COMMERCIAL_COFFEE: 5},
+        )
+        self.saving = np.zeros((K, pop.techies), dtype=bool, order="F")
+
+    @classmethod
+    def spawn(cls, members: int, seed: Optional[int] = None, **kwargs) -> "EnsembleEngine":
+        """`members` members on independent streams spawned from one root seed."""
+        return cls(streams=RandomStreams(seed).spawn(members), **kwargs)
+
+    # --- Per-member parameters ---
+
+    def _param_array(self, name: str) -> np.ndarray:
+        return np.array([getattr(p, name) for p in self.params], dtype=np.float64)
+
+    def _param_column(self, name: str):
+        """A parameter as a scalar if every member shares it, else as a (K,) array."""
+        values = [getattr(p, name) for p in self.params]
+        return values[0] if values.count(values[0]) == len(values) else np.array(values, dtype=np.float64)
+
+    def _agent_param(self, name: str):
+        """The same, shaped to broadcast over (K, n) agent columns."""
+        value = self._p[name]
+        return value[:, None] if isinstance(value, np.ndarray) else value
+
+    def _group_rules(self) -> List[_RuleGroup]:
+        # By rule table, not by params: members that differ only in agent or
+        # rent parameters still move their prices in one pass
+        tables: Dict[Tuple[Rule, ...], List[int]] = {}
+        by_params: Dict[MarketParams, List[int]] = {}
+        for k, p in enumerate(self.params):
+            by_params.setdefault(p, []).append(k)
+        for p, members in by_params.items():
+            tables.setdefault(tuple(default_rules(p)), []).extend(members)
+        groups = []
+        for table, members in tables.items():
+            rules = compile_rules(table)
+            layout = np.array([DRAW_COLUMNS["change"].start + RESOURCE_INDEX[res] if key == "change"
+                               else DRAW_COLUMNS[key] for key, res in rules.slots], dtype=np.intp)
+            for text in rules.headlines:
+                if text not in self.headlines:
+                    self.headlines.append(text)
+            codes = np.array([self.headlines.index(text) for text in rules.headlines], dtype=np.int16)
+            rows = None if len(tables) == 1 else np.array(sorted(members))
+            groups.append(_RuleGroup(rules, rows, layout, codes))
+        return groups
+
+    # --- One day ---
+
+    def step(self):
+        self.day += 1
+        self.date += timedelta(days=1)
+        u = self.environment.draws(self.day)
+        self.update_season_and_weather(u)
+        self.move_prices(u)
+        self.run_agents()
+        self.update_mood()
+
+    def update_season_and_weather(self, u: np.ndarray):
+        season = season_for_month(self.date.month)
+        code = SEASONS.index(season)
+        if season != self.season:
+            self.season = season
+            self.headline[:] = 1 + code       # headlines[1:] start with the season changes
+        weather = weather_codes(code, u[DRAW_COLUMNS["weather"]])
+        self.headline[(weather == DROUGHT) & (self.weather != DROUGHT)] = self.headlines.index(DROUGHT_ALERT)
+        if season != Season.MONSOON:
+            self.headline[weather == RAINY] = self.headlines.index(RAIN_SURPRISE)
+        self.weather = weather
+
+    def move_prices(self, u: np.ndarray):
+        """Today's rent shocks and price moves, for every member."""
+        hiked = u[DRAW_COLUMNS["rent_hike"]] < self._p["rent_hike_prob"]
+        rows = np.flatnonzero(hiked)
+        if len(rows):
+            picks = (u[DRAW_COLUMNS["rent_pick"], rows] * self._n_hikes[rows]).astype(np.intp)
+            self.rent[rows] += self._rent_hikes[rows, picks]
+            self.headline[rows] = self.headlines.index(RENT_HIKE)
+            self.headline_rent[rows] = self.rent[rows]
+
+        drought = self.weather == DROUGHT
+        for group in self._groups:
+            everyone = group.rows is None
+            take = (lambda a: a) if everyone else (lambda a: a[group.rows])
+            prices, rent, dry = take(self.prices), take(self.rent), take(drought)
+            today = u if everyone else u[:, group.rows]
+
+            def pick(key: str, options: Tuple[float, ...], rows: np.ndarray) -> np.ndarray:
+                return np.asarray(options)[(today[DRAW_COLUMNS[key], rows] * len(options)).astype(np.intp)]
+
+            shown = group.rules.apply(prices, rent, dry, today[group.layout].T, pick, gated=False)
+            news = (shown >= 0) & ~take(hiked)
+            if everyone:
+                self.headline[news] = group.headlines[shown[news]]
+            else:
+                self.prices[group.rows] = prices
+                self.headline[group.rows[news]] = group.headlines[shown[news]]
+
+    def run_agents(self):
+        self._farmers_act()
+        self._techies_act()
+        self._darshinis_act()
+        cash = self.techies.cash
+        if self.techies.n > 0:
+            # Left to right, like MarketEngine's loop (see VectorizedMarketEngine)
+            total = cash[:, 0].copy()
+            for i in range(1, self.techies.n):
+                total += cash[:, i]
+            self.avg_techie_cash = total / self.techies.n
+
+    # Agents act on every member at once. A conditional update is written as
+    # `x -= amount * mask`: adding or subtracting 0.0 leaves a value as it is,
+    # and is much cheaper than masked assignment at these shapes.
+
+    def _farmers_act(self):
+        b = self.farmers
+        if b.n == 0:
+            return
+        cash, inv, prices = b.cash, b.inventory, self.prices
+
+        # Production Logic
+        yields = self._yields
+        yield_amt = (yields[self.weather] if yields.ndim == 1
+                     else yields[np.arange(self.members), self.weather])[:, None]
+        for crop, cols in self.crops:
+            inv[crop][:, cols] += yield_amt
+
+        # Consumption (Eat Ragi), otherwise buy Ragi if hungry
+        ragi = inv[RAGI]
+        has_ragi = ragi > 0
+        ragi -= has_ragi
+        cost = prices[:, RAGI, None]
+        buys = ~has_ragi & (cash >= cost)
+        cash -= cost * buys
+        ragi += buys
+
+        # Sell excess crop (to_sell is 0 for anyone not selling)
+        keep = self._agent_param("farmer_keep")
+        for crop, cols in self.crops:
+            held = inv[crop][:, cols]
+            to_sell = np.maximum(0, held - keep)
+            cash[:, cols] += to_sell * prices[:, crop, None]
+            held -= to_sell
+
+    def _darshinis_act(self):
+        b = self.darshinis
+        if b.n == 0:
+            return
+        cash, inv, prices = b.cash, b.inventory, self.prices
+        rice, beans, idli = inv[RICE], inv[COMMERCIAL_COFFEE], inv[IDLI_SET]
+
+        # Restock: 10 Rice when below 5, 5 Coffee when below 2
+        for stock, res, lot, below in ((rice, RICE, "rice_lot", "rice_restock_below"),
+                                       (beans, COMMERCIAL_COFFEE, "beans_lot", "beans_restock_below")):
+            lot = self._agent_param(lot)
+            cost = prices[:, res, None] * lot
+            restock = (stock < self._agent_param(below)) & (cash >= cost)
+            cash -= cost * restock
+            stock += lot * restock
+
+        # Production: 1 Rice + 0.2 Coffee -> 5 Idli Sets
+        cooks = (rice >= 1) & (beans >= 0.2)
+        rice -= cooks
+        beans -= 0.2 * cooks
+        idli += self._agent_param("idli_per_batch") * cooks
+
+    def _techies_act(self):
+        b = self.techies
+        if b.n == 0:
+            return
+        cash, inv, prices = b.cash, b.inventory, self.prices
+
+        # Salary in, rent out (inelastic)
+        cash += self._agent_param("salary")
+        cash -= self.rent[:, None]
+
+        # SURVIVAL: Idli Set
+        idli_price = prices[:, IDLI_SET, None]
+        fed = cash >= idli_price
+        cash -= idli_price * fed
+        inv[IDLI_SET] += fed
+
+        # LUXURY: Artisan Coffee, only above the savings target
+        coffee_price = prices[:, ARTISAN_COFFEE, None]
+        sips = fed & (cash > self._agent_param("savings_target")) & (cash >= coffee_price)
+        self.saving = ~sips
+        cash -= coffee_price * sips
+        inv[ARTISAN_COFFEE] += sips
+
+    def update_mood(self):
+        ratio = self.avg_techie_cash / self.rent
+        self.mood = np.where(ratio < self._p["panic_ratio"], PANIC,
+                             np.where(ratio < self._p["anxious_ratio"], ANXIOUS, OPTIMISTIC)).astype(np.int8)
+
+    # --- Reading members ---
+
+    def headline_of(self, k: int) -> str:
+        text = self.headlines[self.headline[k]]
+        return text.format(rent=self.headline_rent[k]) if text == RENT_HIKE else text
+
+    def view(self, k: int) -> MarketView:
+        """Member k as a MarketView, for the same display code as a streamed run."""
+        return MarketView(
+            day=self.day, date=self.date, season=self.season, weather=WEATHERS[self.weather[k]],
+            market_mood=MOODS[self.mood[k]], headline=self.headline_of(k), rent=float(self.rent[k]),
+            avg_techie_cash=float(self.avg_techie_cash[k]),
+            prices={res: float(self.prices[k, RESOURCE_INDEX[res]]) for res in PRICED},
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step an ensemble of markets in lockstep.")
+    parser.add_argument("--members", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0, help="root seed the members are spawned from")
+    args = parser.parse_args()
+
+    ensemble = EnsembleEngine.spawn(args.members, seed=args.seed)
+    start = time.perf_counter()
+    for _ in range(args.days):
+        ensemble.step()
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.members:,} members, {args.days} days in {elapsed:.2f}s "
+          f"({args.members * args.days / elapsed:,.0f} member-days/s, {elapsed / args.days * 1e3:.2f} ms/step)")
+    print(f"Day {ensemble.day} ({ensemble.date:%Y-%m-%d}), {ensemble.season.value}")
+    moods = np.bincount(ensemble.mood, minlength=len(MOODS))
+    print("  mood      " + ", ".join(f"{m} {n / args.members:.0%}" for m, n in zip(MOODS, moods) if n))
+    rows = [("rent", ensemble.rent), ("techie cash", ensemble.avg_techie_cash)]
+    rows += [(res.value, ensemble.prices[:, RESOURCE_INDEX[res]]) for res in PRICED]
+    print(f"  {'':<22}{'p10':>12}{'p50':>12}{'p90':>12}")
+    for name, values in rows:
+        p10, p50, p90 = np.percentile(values, [10, 50, 90])
+        print(f"  {name:<22}{p10:12,.2f}{p50:12,.2f}{p90:12,.2f}")
+
+
+if __name__ == "__main__":
+    main()
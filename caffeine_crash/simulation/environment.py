@@ -0,0 +1,193 @@
+"""Pre-generated environment paths: season, weather and price shocks.
+
+Every engine reads its weather, rent hikes and price noise from an
+EnvironmentSchedule, which generates them with NumPy a block of days at a
+time, on first use, and keeps only the last CACHED_BLOCKS of them; the
+engine just reads today's row. By default each engine builds its own from
+its seed; pass one in to share it:
+
+    env = EnvironmentSchedule(seed=7)
+    for params in variants:
+        engine = MarketEngine(seed=7, params=params, environment=env)
+
+The schedule stores raw draws (uniforms, weather codes), not outcomes, so
+it does not depend on MarketParams. Every policy variant run with the same
+seed sees exactly the same seasons, weather, rent-hike days and price
+noise.
+
+Each day's uniforms are one row of N_DRAWS, in DRAW_COLUMNS order, read
+from one PCG64 stream per schedule (see streams.py) that runs through the
+days in order. A block jumps straight to its first row (PCG64.advance), so
+any block can be generated on its own, in any order, in any process; and
+EnsembleEngine can pull thousands of members' streams a few rows at a
+time, without holding a year of any of them.
+"""
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .models import Resource, Season, WEATHERS, WEATHER_ODDS, season_for_month
+from .streams import RandomStreams
+
+DEFAULT_BLOCK_DAYS = 365
+DEFAULT_START = datetime(2025, 1, 1)
+# Blocks a schedule keeps cached: the one being read and the next; older ones are regenerated on demand
+CACHED_BLOCKS = 2
+
+SEASONS = list(Season)
+_MONTH_SEASON = np.array([SEASONS.index(season_for_month(m)) for m in range(1, 13)], dtype=np.int8)
+# Per season: cumulative odds and the WEATHERS code of each outcome
+_WEATHER_TABLES = {
+    SEASONS.index(season): (
+        np.cumsum([odds for _, odds in table]) / sum(odds for _, odds in table),
+        np.array([WEATHERS.index(weather) for weather, _ in table], dtype=np.int8),
+    )
+    for season, table in WEATHER_ODDS.items()
+}
+
+# Each day's uniforms, in draw order: name -> column (a slice for "change",
+# one per RESOURCE_INDEX). "weather" is the uniform its weather is picked with.
+_R = len(Resource)
+DRAW_COLUMNS: Dict[str, Union[int, slice]] = {
+    "weather": 0, "rent_hike": 1, "rent_pick": 2, "change": slice(3, 3 + _R),
+    "footfall": 3 + _R, "crop_failure": 4 + _R, "shortage_ragi": 5 + _R, "shortage_rice": 6 + _R,
+    "code_shock": 7 + _R, "code_direction": 8 + _R,
+}
+N_DRAWS = 9 + _R
+
+
+def draw_generator(streams: RandomStreams, day: int = 1) -> np.random.Generator:
+    """The environment stream of `streams`, positioned at the row of `day`."""
+    rng = streams.generator("environment")
+    # random() takes one 64-bit output per double
+    rng.bit_generator.advance((day - 1) * N_DRAWS)
+    return rng
+
+
+def season_codes(start: datetime, first_day: int, n_days: int) -> np.ndarray:
+    """SEASONS index of days first_day ... first_day + n_days - 1 (day d is start + d days)."""
+    dates = np.datetime64(start.date()) + first_day + np.arange(n_days)
+    months = dates.astype("datetime64[M]").astype(np.int64) % 12
+    return _MONTH_SEASON[months]
+
+
+def weather_codes(season, u: np.ndarray) -> np.ndarray:
+    """WEATHERS index picked by uniforms `u` under `season` codes (broadcast to u)."""
+    if np.ndim(season) == 0:
+        cumulative, outcomes = _WEATHER_TABLES[int(season)]
+        return outcomes[np.searchsorted(cumulative, u, side="right")]
+    season = np.broadcast_to(season, u.shape)
+    weather = np.empty(u.shape, dtype=np.int8)
+    for code, (cumulative, outcomes) in _WEATHER_TABLES.items():
+        today = season == code
+        weather[today] = outcomes[np.searchsorted(cumulative, u[today], side="right")]
+    return weather
+
+
+class EnvironmentDay(NamedTuple):
+    """One day's environment; the uniforms are in [0, 1)."""
+    season: Season
+    weather: str
+    rent_hike: float                 # hike if below params.rent_hike_prob
+    rent_pick: float                 # which of params.rent_hikes
+    change: Tuple[float, ...]        # per RESOURCE_INDEX, mapped to 1 +/- volatility
+    footfall: float                  # headline rolls
+    crop_failure: float
+    shortage_ragi: float
+    shortage_rice: float
+    code_shock: float                # shock if below params.code_shock_prob
+    code_direction: float            # down if below 0.5
+
+
+# Columns of a block, all shaped (days,) except "change" (days, len(Resource))
+BLOCK_COLUMNS = ("season", "weather") + EnvironmentDay._fields[2:]
+
+# Which uniforms a caller wants each day, in its own order: (column, Resource
+# index for "change", None otherwise)
+DrawLayout = Tuple[Tuple[str, Optional[int]], ...]
+
+
+class EnvironmentSchedule:
+    """Lazily generated environment path, read by day number (1 = first step)."""
+
+    def __init__(self, seed: Optional[int] = None, start: datetime = DEFAULT_START,
+                 block_days: int = DEFAULT_BLOCK_DAYS, streams: Optional[RandomStreams] = None):
+        # Draws come from the "environment" stream of `streams` (RandomStreams(seed) if not given)
+        self.streams = streams or RandomStreams(seed)
+        self.start = start
+        self.block_days = block_days
+        self._arrays: Dict[int, Dict[str, np.ndarray]] = {}
+        self._days: Dict[int, List[EnvironmentDay]] = {}
+        self._draws: Dict[Tuple[DrawLayout, int], List[List[float]]] = {}
+
+    @property
+    def seed(self) -> Optional[int]:
+        return self.streams.seed
+
+    def block(self, index: int) -> Dict[str, np.ndarray]:
+        """Arrays for days index * block_days + 1 ... (index + 1) * block_days."""
+        arrays = self._arrays.get(index)
+        if arrays is None:
+            arrays = self._arrays[index] = self._generate(index)
+            self._evict()
+        return arrays
+
+    def day(self, day: int) -> EnvironmentDay:
+        if day < 1:
+            raise ValueError(f"Schedule days start at 1, got {day}")
+        index, row = divmod(day - 1, self.block_days)
+        days = self._days.get(index)
+        if days is None:
+            days = self._days[index] = self._rows(self.block(index))
+        return days[row]
+
+    def draws(self, layout: DrawLayout, day: int) -> List[float]:
+        """The uniforms `layout` asks for on `day`, gathered a block at a time."""
+        index, row = divmod(day - 1, self.block_days)
+        rows = self._draws.get((layout, index))
+        if rows is None:
+            arrays = self.block(index)
+            columns = [arrays[name][:, res] if res is not None else arrays[name] for name, res in layout]
+            rows = self._draws[layout, index] = np.column_stack(columns).tolist()
+        return rows[row]
+
+    def window(self, first_day: int, n_days: int) -> Dict[str, np.ndarray]:
+        """Columns for `n_days` consecutive days, stitched across blocks."""
+        first_block = (first_day - 1) // self.block_days
+        last_block = (first_day + n_days - 2) // self.block_days
+        offset = (first_day - 1) - first_block * self.block_days
+        blocks = [self.block(i) for i in range(first_block, last_block + 1)]
+        return {name: np.concatenate([b[name] for b in blocks])[offset:offset + n_days]
+                for name in BLOCK_COLUMNS}
+
+    def _evict(self):
+        # Blocks go in the order they were generated, with everything derived from them
+        while len(self._arrays) > CACHED_BLOCKS:
+            index = next(iter(self._arrays))
+            del self._arrays[index]
+            self._days.pop(index, None)
+            for key in [key for key in self._draws if key[1] == index]:
+                del self._draws[key]
+
+    def _generate(self, index: int) -> Dict[str, np.ndarray]:
+        n = self.block_days
+        u = draw_generator(self.streams, index * n + 1).random((n, N_DRAWS))
+        season = season_codes(self.start, index * n + 1, n)
+        arrays = {"season": season, "weather": weather_codes(season, u[:, DRAW_COLUMNS["weather"]])}
+        for name in BLOCK_COLUMNS[2:]:
+            arrays[name] = u[:, DRAW_COLUMNS[name]]
+        return arrays
+
+    @staticmethod
+    def _rows(arrays: Dict[str, np.ndarray]) -> List[EnvironmentDay]:
+        # Plain Python values: the engine reads a handful per day, and list
+        # indexing beats NumPy scalar access by an order of magnitude
+        columns = [
+            [SEASONS[code] for code in arrays["season"].tolist()],
+            [WEATHERS[code] for code in arrays["weather"].tolist()],
+        ]
+        for name in EnvironmentDay._fields[2:]:
+            values = arrays[name].tolist()
+            columns.append([tuple(row) for row in values] if name == "change" else values)
+        return [EnvironmentDay(*row) for row in zip(*columns)]
@@ -0,0 +1,124 @@
+from collections import deque
+from enum import IntEnum
+from itertools import chain
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .models import Resource
+
+DEFAULT_CAPACITY = 50
+
+# (day, agent_id, code, payload)
+Event = Tuple[int, int, int, float]
+
+
+class EventCode(IntEnum):
+    HARVESTED = 1      # payload: units harvested
+    COOKED = 2         # payload: idli sets cooked
+    SIPPED_COFFEE = 3  # payload: rent paid
+    SAVING_MODE = 4    # payload: rent paid
+
+
+class EventLog:
+    """Bounded buffer of compact agent events, formatted only when read.
+
+    Events are kept per day: each day's first `capacity`, and older days
+    only until the newer ones hold `capacity` events between them, which is
+    all recent() can ever show.
+
+    `describe` maps an agent id to (name, crop) and is supplied by the engine
+    that owns the agents.
+    """
+
+    def __init__(self, describe: Callable[[int], Tuple[str, Optional[Resource]]],
+                 capacity: int = DEFAULT_CAPACITY):
+        self.describe = describe
+        self.capacity = capacity
+        self.day = 0  # stamped on every event, advanced by the engine
+        self.emitted = 0  # events ever emitted, including those since dropped
+        self._days: Deque[Tuple[int, List[Event]]] = deque()  # (day, events), oldest first
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Event]:
+        return chain.from_iterable(events for _, events in self._days)
+
+    def _today(self) -> List[Event]:
+        if self._days and self._days[-1][0] == self.day:
+            return self._days[-1][1]
+        while self._days and self._size - len(self._days[0][1]) >= self.capacity:
+            self._size -= len(self._days.popleft()[1])
+        self._days.append((self.day, []))
+        return self._days[-1][1]
+
+    def emit(self, agent_id: int, code: EventCode, payload: float):
+        self.emitted += 1
+        today = self._today()
+        if len(today) < self.capacity:
+            today.append((self.day, agent_id, code, payload))
+            self._size += 1
+
+    def emit_many(self, agent_ids: np.ndarray, codes, payloads):
+        """Emit one event per agent; only the day's first `capacity` are kept anyway."""
+        self.emitted += len(agent_ids)
+        today = self._today()
+        n = min(len(agent_ids), self.capacity - len(today))
+        if n <= 0:
+            return
+        agent_ids = agent_ids[:n]
+        codes = np.broadcast_to(codes, (n,)) if np.ndim(codes) == 0 else codes[:n]
+        payloads = np.broadcast_to(payloads, (n,)) if np.ndim(payloads) == 0 else payloads[:n]
+        today.extend(zip(
+            [self.day] * n, agent_ids.tolist(), codes.tolist(), np.asarray(payloads, dtype=float).tolist(),
+        ))
+        self._size += n
+
+    def clear(self):
+        self._days.clear()
+        self._size = 0
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """The kept events as day/agent/code/payload arrays, oldest first (for checkpoints)."""
+        events = list(self)
+        return {
+            "day": np.array([e[0] for e in events], dtype=np.int64),
+            "agent": np.array([e[1] for e in events], dtype=np.int64),
+            "code": np.array([e[2] for e in events], dtype=np.int8),
+            "payload": np.array([e[3] for e in events], dtype=np.float64),
+        }
+
+    def load_columns(self, columns: Dict[str, np.ndarray]):
+        """Inverse of columns(): replaces whatever the log holds."""
+        self.clear()
+        rows = zip(columns["day"].tolist(), columns["agent"].tolist(),
+                   columns["code"].tolist(), columns["payload"].tolist())
+        for day, agent_id, code, payload in rows:
+            if not self._days or self._days[-1][0] != day:
+                self._days.append((day, []))
+            self._days[-1][1].append((day, agent_id, code, payload))
+            self._size += 1
+
+    def format(self, event: Event) -> str:
+        _, agent_id, code, payload = event
+        name, crop = self.describe(agent_id)
+        if code == EventCode.HARVESTED:
+            return f"{name} harvested {payload:g} {crop.value}."
+        if code == EventCode.COOKED:
+            return f"{name} cooked {payload:g} Idli Sets."
+        if code == EventCode.SIPPED_COFFEE:
+            return f"{name}: Paid Rent ₹{payload:.0f}. Ate Idli. Sipped Artisan Coffee ☕."
+        if code == EventCode.SAVING_MODE:
+            return f"{name}: Paid Rent ₹{payload:.0f}. Ate Idli. SAVING MODE (No Coffee)."
+        return f"{name}: event {code} ({payload:g})"
+
+    def recent(self, n: int = DEFAULT_CAPACITY) -> List[str]:
+        """The newest `n` events as text: newest day first, each day in the order its agents acted."""
+        lines: List[str] = []
+        for _, events in reversed(self._days):
+            lines.extend(self.format(event) for event in events[:n - len(lines)])
+            if len(lines) >= n:
+                break
+        return lines
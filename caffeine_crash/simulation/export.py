@@ -0,0 +1,179 @@
+"""Streaming columnar traces of a simulation run.
+
+A trace is a directory with one raw little-endian file per column and a
+`manifest.json` describing dtypes, row count and the code tables for
+categorical columns:
+
+    trace/
+      manifest.json
+      day.bin  date.bin  prices.bin  rent.bin  weather.bin
+      season.bin  mood.bin  avg_techie_cash.bin
+
+TraceWriter buffers up to one chunk of rows and appends each full chunk to
+the column files, so memory stays flat however long the run is.
+TraceReader memory-maps the columns, so a 50-year trace opens instantly.
+"""
+import json
+import os
+from datetime import date
+from operator import itemgetter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .models import Resource, Season, WEATHERS, MOODS
+
+TRACE_VERSION = 1
+DEFAULT_CHUNK_ROWS = 4096
+
+PRICED_RESOURCES = [res for res in Resource if res != Resource.INR]
+SEASONS = list(Season)
+_EPOCH = date(1970, 1, 1).toordinal()
+
+# name -> (dtype, trailing shape)
+COLUMNS = {
+    "day": ("<i4", ()),
+    "date": ("<M8[D]", ()),
+    "prices": ("<f8", (len(PRICED_RESOURCES),)),
+    "rent": ("<f8", ()),
+    "weather": ("i1", ()),
+    "season": ("i1", ()),
+    "mood": ("i1", ()),
+    "avg_techie_cash": ("<f8", ()),
+}
+
+
+class TraceWriter:
+    """Engine recorder that streams one row per simulated day to `path`.
+
+    Attach with `engine.recorders.append(TraceWriter(path))` and call
+    close() when the run ends (or use it as a context manager).
+    """
+
+    def __init__(self, path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.rows = 0  # rows already on disk
+        self._weather_codes = {w: i for i, w in enumerate(WEATHERS)}
+        self._season_codes = {s: i for i, s in enumerate(SEASONS)}
+        self._mood_codes = {m: i for i, m in enumerate(MOODS)}
+        self._prices = itemgetter(*PRICED_RESOURCES)
+        # One plain tuple per day; converted to columns only when a chunk is flushed
+        self._pending: List[tuple] = []
+        os.makedirs(path, exist_ok=True)
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name in COLUMNS}
+        self._write_manifest()
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, engine):
+        state = engine.state
+        self._pending.append(
+            (engine.day, state.date.toordinal() - _EPOCH)
+            + self._prices(state.prices)
+            + (state.rent, self._weather_codes[state.weather], self._season_codes[state.season],
+               self._mood_codes[state.market_mood], state.avg_techie_cash)
+        )
+        if len(self._pending) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered rows to the column files and update the manifest."""
+        if not self._pending:
+            return
+        # Every field is exactly representable as float64 (days, codes, prices)
+        table = np.array(self._pending, dtype=np.float64)
+        n_prices = len(PRICED_RESOURCES)
+        columns = {
+            "day": table[:, 0],
+            "date": table[:, 1].astype(np.int64).view("<M8[D]"),
+            "prices": table[:, 2:2 + n_prices],
+        }
+        for i, name in enumerate(("rent", "weather", "season", "mood", "avg_techie_cash")):
+            columns[name] = table[:, 2 + n_prices + i]
+
+        for name, f in self._files.items():
+            dtype, _ = COLUMNS[name]
+            f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+            f.flush()
+        self.rows += len(self._pending)
+        self._pending = []
+        self._write_manifest()
+
+    def close(self):
+        if self._files:
+            self.flush()
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+
+    def _write_manifest(self):
+        manifest = {
+            "version": TRACE_VERSION,
+            "rows": self.rows,
+            "columns": {
+                name: {"dtype": dtype, "shape": list(shape), "file": f"{name}.bin"}
+                for name, (dtype, shape) in COLUMNS.items()
+            },
+            "resources": [res.value for res in PRICED_RESOURCES],
+            "weathers": list(WEATHERS),
+            "seasons": [s.value for s in SEASONS],
+            "moods": list(MOODS),
+        }
+        # Replace atomically so a reader never sees a half-written manifest
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+
+class TraceReader:
+    """Memory-mapped view of a trace written by TraceWriter (finished or still running)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.rows: int = self.manifest["rows"]
+        self.resources: List[str] = self.manifest["resources"]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> np.ndarray:
+        spec = self.manifest["columns"][name]
+        shape = (self.rows,) + tuple(spec["shape"])
+        if self.rows == 0:
+            return np.zeros(shape, dtype=spec["dtype"])
+        return np.memmap(os.path.join(self.path, spec["file"]), dtype=spec["dtype"], mode="r", shape=shape)
+
+    def labels(self, name: str) -> np.ndarray:
+        """A categorical column (weather, season, mood) decoded to strings."""
+        table = np.array(self.manifest[f"{name}s"])
+        return table[self.column(name)]
+
+    def to_dict(self, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Flat columns: prices are split into one column per resource."""
+        out = {}
+        for name in columns or list(self.manifest["columns"]):
+            data = self.column(name)
+            if name == "prices":
+                for j, res in enumerate(self.resources):
+                    out[res] = data[:, j]
+            elif name in ("weather", "season", "mood"):
+                out[name] = self.labels(name)
+            else:
+                out[name] = data
+        return out
+
+    def to_pandas(self, columns: Optional[List[str]] = None):
+        import pandas as pd
+        frame = pd.DataFrame(self.to_dict(columns))
+        for name in ("weather", "season", "mood"):
+            if name in frame:
+                frame[name] = frame[name].astype("category")
+        return frame
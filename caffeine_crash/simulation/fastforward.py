@@ -0,0 +1,123 @@
+"""Fast-forward an engine N days, or until a condition first holds.
+
+    result = run_until(engine, mood_is("Panic"), max_days=3650)
+    result.hit_day      # first day the market panicked, None if it never did
+    result.snapshot     # how the market looked when it stopped
+
+While fast-forwarding, events, price history and recorders are suspended;
+only what the next day (and the condition) needs is kept up to date. A
+condition that only reads prices or rent declares `needs_agents=False`, and
+then, on engines whose prices do not depend on agent behaviour, the agents
+are not stepped at all.
+"""
+import itertools
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from .engine import MarketEngine
+from .models import MarketState, Resource, MOODS
+from .runner import Snapshot
+
+# Phases of MarketEngine.step() (see STEP_PHASES) that only follow the agents
+AGENT_PHASES = ("agents", "mood")
+
+
+@dataclass(frozen=True)
+class Condition:
+    """A predicate on MarketState, plus whether it reads agent-driven state."""
+    test: Callable[[MarketState], bool]
+    description: str
+    needs_agents: bool = True   # False if it only reads weather, prices or rent
+
+    def __call__(self, state: MarketState) -> bool:
+        return self.test(state)
+
+    def __str__(self) -> str:
+        return self.description
+
+
+def mood_is(mood: str) -> Condition:
+    if mood not in MOODS:
+        raise ValueError(f"Unknown mood {mood!r}, expected one of {', '.join(MOODS)}")
+    return Condition(lambda state: state.market_mood == mood, f"mood={mood}")
+
+
+def rent_above(threshold: float) -> Condition:
+    return Condition(lambda state: state.rent > threshold, f"rent>{threshold:g}", needs_agents=False)
+
+
+def price_above(res: Resource, threshold: float) -> Condition:
+    return Condition(lambda state: state.prices[res] > threshold, f"{res.name}>{threshold:g}", needs_agents=False)
+
+
+def price_below(res: Resource, threshold: float) -> Condition:
+    return Condition(lambda state: state.prices[res] < threshold, f"{res.name}<{threshold:g}", needs_agents=False)
+
+
+def parse_condition(text: str) -> Condition:
+    """'mood=Panic', 'rent>3000', or a resource price like 'ARTISAN_COFFEE>450'."""
+    match = re.fullmatch(r"\s*(\w+)\s*([=<>])\s*(\S+)\s*", text)
+    if not match:
+        raise ValueError(f"Cannot parse condition {text!r}")
+    name, op, value = match.groups()
+    if name == "mood" and op == "=":
+        return mood_is(value)
+    if name == "rent" and op == ">":
+        return rent_above(float(value))
+    if name.upper() in Resource.__members__ and op in "<>":
+        res = Resource[name.upper()]
+        return (price_above if op == ">" else price_below)(res, float(value))
+    raise ValueError(f"Cannot parse condition {text!r}")
+
+
+@dataclass
+class FastForwardResult:
+    hit_day: Optional[int]      # engine day the condition first held, None if it never did
+    days_run: int
+    agents_skipped: bool        # agents (and mood) were left where they started
+    snapshot: Snapshot          # the engine when it stopped
+
+
+def run_until(engine: MarketEngine, until: Optional[Callable[[MarketState], bool]] = None,
+              max_days: Optional[int] = None) -> FastForwardResult:
+    """Step `engine` until `until(engine.state)` holds or `max_days` have passed.
+
+    `until` is any callable on MarketState (a Condition or a plain function,
+    which is assumed to need agents). Without it this just advances
+    `max_days` days. The engine can keep stepping normally afterwards, except
+    when agents were skipped: they are then behind the market.
+    """
+    if until is None and max_days is None:
+        raise ValueError("Give a condition, a number of days, or both")
+    skip_agents = (until is not None and not getattr(until, "needs_agents", True)
+                   and not engine.prices_follow_agents)
+
+    # step()'s own phases; recorders only follow real steps, and skipped agents leave mood alone too
+    skipped = {"recorders", *(AGENT_PHASES if skip_agents else ())}
+    phases = [fn for name, fn in engine.step_phases if name not in skipped]
+
+    events, engine.events = engine.events, None
+    record_history, engine.record_history = engine.record_history, False
+    first_day = engine.day
+    hit_day = None
+    try:
+        for _ in range(max_days) if max_days is not None else itertools.count():
+            engine.advance_date()
+            for phase in phases:
+                phase()
+            if until is not None and until(engine.state):
+                hit_day = engine.day
+                break
+    finally:
+        engine.events = events
+        engine.record_history = record_history
+        if events is not None:
+            events.day = engine.day
+
+    return FastForwardResult(hit_day, engine.day - first_day, skip_agents, Snapshot.capture(engine))
+
+
+def advance(engine: MarketEngine, days: int) -> FastForwardResult:
+    """Step `engine` `days` days with logs and history suspended."""
+    return run_until(engine, max_days=days)
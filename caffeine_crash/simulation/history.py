@@ -0,0 +1,129 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Days per bucket for each resolution. Months and years are fixed-length
+# buckets of simulated days, not calendar months.
+RESOLUTIONS: Dict[str, int] = {
+    "daily": 1,
+    "weekly": 7,
+    "monthly": 30,
+    "yearly": 365,
+}
+STATS = ("min", "mean", "max")
+
+DAILY_WINDOW = 3650            # 10 years of daily points
+ROLLUP_CAPACITY = {
+    "weekly": 52 * 50,         # 50 years of weeks
+    "monthly": 12 * 200,       # 200 years of months
+    "yearly": 1000,
+}
+
+
+class RingBuffer:
+    """Preallocated circular buffer of float rows; the oldest row is overwritten."""
+
+    def __init__(self, capacity: int, width: int = 1):
+        shape = (capacity,) if width == 1 else (capacity, width)
+        self.data = np.zeros(shape, dtype=np.float64)
+        self.capacity = capacity
+        self.head = 0   # next slot to write
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, row):
+        self.data[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def last(self, n: Optional[int] = None) -> np.ndarray:
+        """Copy of the newest `n` rows (all by default), oldest first."""
+        n = self.size if n is None else max(0, min(n, self.size))
+        start = self.head - n
+        if start >= 0:
+            return self.data[start:self.head].copy()
+        return np.concatenate((self.data[start:], self.data[:self.head]))
+
+
+class _Rollup:
+    """Accumulates daily values into fixed-length min/mean/max buckets."""
+    __slots__ = ("period", "buckets", "count", "low", "total", "high")
+
+    def __init__(self, period: int, capacity: int):
+        self.period = period
+        self.buckets = RingBuffer(capacity, width=3)
+        self.count = 0
+        self.low = self.total = self.high = 0.0
+
+    def add(self, value: float):
+        if self.count == 0:
+            self.low = self.high = self.total = value
+        else:
+            if value < self.low: self.low = value
+            if value > self.high: self.high = value
+            self.total += value
+        self.count += 1
+        if self.count == self.period:
+            self.buckets.append((self.low, self.total / self.period, self.high))
+            self.count = 0
+
+    def partial(self) -> Optional[Tuple[float, float, float]]:
+        """The bucket still being filled, if any."""
+        if self.count == 0:
+            return None
+        return (self.low, self.total / self.count, self.high)
+
+
+class SeriesHistory:
+    """Bounded-memory history of one daily series.
+
+    The most recent `window` days are kept verbatim in a ring buffer. Every
+    value is also rolled up into weekly, monthly and yearly min/mean/max
+    buckets, so long horizons stay visible at coarser resolution while memory
+    stays constant.
+    """
+
+    def __init__(self, window: int = DAILY_WINDOW):
+        self.daily = RingBuffer(window)
+        self.rollups = {
+            name: _Rollup(RESOLUTIONS[name], capacity)
+            for name, capacity in ROLLUP_CAPACITY.items()
+        }
+        self.version = 0  # total values ever appended; changes on every append
+
+    def __len__(self) -> int:
+        return len(self.daily)
+
+    @property
+    def latest(self) -> float:
+        return float(self.daily.data[self.daily.head - 1])
+
+    def append(self, value: float):
+        self.daily.append(value)
+        for rollup in self.rollups.values():
+            rollup.add(value)
+        self.version += 1
+
+    def last(self, n: Optional[int] = None, resolution: str = "daily", stat: str = "mean") -> np.ndarray:
+        """The newest `n` points at `resolution`, oldest first.
+
+        For coarse resolutions `stat` picks "min", "mean" or "max" of each
+        bucket (or "all" for an (n, 3) array); the bucket still being filled
+        counts as the newest point.
+        """
+        if resolution == "daily":
+            return self.daily.last(n)
+
+        rollup = self.rollups[resolution]
+        partial = rollup.partial()
+        if partial is None:
+            rows = rollup.buckets.last(n)
+        else:
+            full = rollup.buckets.last(None if n is None else n - 1)
+            rows = np.vstack((full, partial)) if n != 0 else full[:0]
+        if stat == "all":
+            return rows
+        return rows[:, STATS.index(stat)]
@@ -1,7 +1,8 @@
 from enum import Enum, auto
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 from datetime import datetime, timedelta
+from .history import SeriesHistory, DAILY_WINDOW
 
 class Region(Enum):
     BENGALURU = "Bengaluru"
@@ -18,12 +19,72 @@ class Resource(Enum):
     IDLI_SET = "Idli Set"
     INR = "INR"
 
+# Dense ordinals for column-oriented storage (inventory matrices, price vectors)
+RESOURCE_INDEX: Dict[Resource, int] = {res: i for i, res in enumerate(Resource)}
+
+# Every value MarketState.weather can take
+WEATHERS = ("Sunny", "Cloudy", "Rainy", "Drought")
+
+# Every value MarketState.market_mood can take, "Stable" only before the first step
+MOODS = ("Stable", "Optimistic", "Anxious", "Panic")
+
 class Season(Enum):
     SUMMER = "Summer"         # Mar-May
     MONSOON = "Monsoon"       # Jun-Sep
     POST_MONSOON = "Post-Monsoon" # Oct-Dec (Dasara/Deepavali time)
     WINTER = "Winter"         # Jan-Feb
 
+def season_for_month(month: int) -> Season:
+    if 3 <= month <= 5:
+        return Season.SUMMER
+    if 6 <= month <= 9:
+        return Season.MONSOON
+    if 10 <= month <= 12:
+        return Season.POST_MONSOON
+    return Season.WINTER
+
+# Chance of each weather per season, in percent (order matters: it is the draw order)
+WEATHER_ODDS = {
+    Season.MONSOON: (("Rainy", 70), ("Cloudy", 20), ("Sunny", 10)),
+    Season.SUMMER: (("Sunny", 80), ("Drought", 15), ("Rainy", 5)),
+    Season.WINTER: (("Sunny", 60), ("Cloudy", 30), ("Rainy", 10)),
+    Season.POST_MONSOON: (("Cloudy", 40), ("Sunny", 40), ("Rainy", 20)),
+}
+
+@dataclass
+class Population:
+    """How many agents of each kind the engine spawns."""
+    farmers: int = 5       # Mandya ragi farmers
+    planters: int = 3      # Coorg coffee planters
+    techies: int = 5       # Bengaluru techies
+    darshinis: int = 3     # Bengaluru darshinis
+    rice_farmers: int = 0  # Mandya paddy growers
+
+    @property
+    def total(self) -> int:
+        return self.farmers + self.rice_farmers + self.planters + self.techies + self.darshinis
+
+    def kind_slices(self) -> Dict[str, slice]:
+        """Agent id range of each kind, in engine order."""
+        slices, start = {}, 0
+        for kind, n in (("farmer", self.farmers), ("paddy", self.rice_farmers), ("planter", self.planters),
+                        ("techie", self.techies), ("darshini", self.darshinis)):
+            slices[kind] = slice(start, start + n)
+            start += n
+        return slices
+
+    def scaled(self, factor: float) -> "Population":
+        """Same mix of agents, `factor` times as many of each (kinds with none stay at none)."""
+        def scale(n: int) -> int:
+            return max(1, round(n * factor)) if n else 0
+        return Population(
+            farmers=scale(self.farmers),
+            planters=scale(self.planters),
+            techies=scale(self.techies),
+            darshinis=scale(self.darshinis),
+            rice_farmers=scale(self.rice_farmers),
+        )
+
 @dataclass
 class MarketState:
     date: datetime = field(default_factory=lambda: datetime(2025, 1, 1))
@@ -41,11 +102,15 @@ class MarketState:
         Resource.CODE: 1000.0,
         Resource.IDLI_SET: 40.0,
     })
-    history: Dict[Resource, List[float]] = field(default_factory=dict)
-    rent_history: List[float] = field(default_factory=list)
+    history_window: int = DAILY_WINDOW # Days kept at full resolution
+    history: Dict[Resource, SeriesHistory] = field(default_factory=dict)
+    rent_history: Optional[SeriesHistory] = None
 
     def __post_init__(self):
-        self.rent_history.append(self.rent)
+        if self.rent_history is None:
+            self.rent_history = SeriesHistory(self.history_window)
+            self.rent_history.append(self.rent)
         for res in Resource:
-            if res != Resource.INR:
-                self.history[res] = [self.prices.get(res, 0.0)]
+            if res != Resource.INR and res not in self.history:
+                self.history[res] = SeriesHistory(self.history_window)
+                self.history[res].append(self.prices.get(res, 0.0))
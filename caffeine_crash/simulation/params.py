@@ -0,0 +1,95 @@
+"""Economic constants of the model, gathered in one frozen parameter object.
+
+Every engine takes `params=MarketParams(...)`; leaving it out gives the
+defaults, which reproduce the original hand-tuned model exactly.
+
+    params = MarketParams().replace(salary=3500, rent_hike_prob=0.03)
+    engine = MarketEngine(seed=0, params=params)
+"""
+import hashlib
+import json
+from dataclasses import dataclass, asdict, fields, replace
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class MarketParams:
+    # --- Rent ---
+    initial_rent: float = 2000.0
+    rent_hike_prob: float = 0.02                  # daily chance of a landlord hike
+    rent_hikes: Tuple[int, ...] = (100, 200, 500)
+
+    # --- Prices ---
+    volatility: float = 0.02                      # daily random move, +/-
+    price_floor: float = 5.0
+    idli_rice_weight: float = 1.5                 # idli cost = 1.5 rice + 0.1 beans + 10
+    idli_coffee_weight: float = 0.1
+    idli_base_cost: float = 10.0
+    idli_markup: float = 1.2
+    idli_adjust: float = 0.2                      # share of the gap to the target closed per day
+    bean_push_threshold: float = 260.0            # cafes raise prices above this bean price
+    bean_push: float = 0.01
+    rent_squeeze_high: float = 3000.0             # recessionary drag on cafes above this rent
+    rent_squeeze_high_drag: float = 0.015
+    rent_squeeze_low: float = 2500.0              # mild slowing above this rent
+    rent_squeeze_low_drag: float = 0.005
+    cafe_growth: float = 0.005                    # healthy growth below it
+    artisan_ceiling: float = 500.0
+    artisan_ceiling_drag: float = 0.02
+    drought_bean_push: float = 0.04
+    drought_grain_push: float = 0.05
+    code_drift: float = 0.001
+    code_shock_prob: float = 0.05
+    code_shock: float = 0.05
+
+    # --- Agents ---
+    salary: int = 3000
+    savings_target: float = 50000.0               # techies only buy artisan coffee above this
+    techie_cash: float = 40000.0
+    farmer_cash: float = 500.0
+    darshini_cash: float = 2000.0
+    yield_sunny: int = 10
+    yield_normal: int = 5
+    yield_drought: int = 1
+    farmer_keep: int = 2                          # units of crop a farmer holds back
+    rice_restock_below: int = 5
+    rice_lot: int = 10
+    beans_restock_below: int = 2
+    beans_lot: int = 5
+    idli_per_batch: int = 5
+
+    # --- Mood (avg techie cash / rent) ---
+    panic_ratio: float = 5.0
+    anxious_ratio: float = 15.0
+
+    def replace(self, **changes) -> "MarketParams":
+        return replace(self, **changes)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> "MarketParams":
+        known = {f.name for f in fields(cls)}
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        values = dict(values)
+        if "rent_hikes" in values:
+            values["rent_hikes"] = tuple(values["rent_hikes"])
+        return cls(**values)
+
+    def diff(self, other: Optional["MarketParams"] = None) -> Dict:
+        """Fields that differ from `other` (the defaults if not given)."""
+        base = (other or DEFAULT_PARAMS).to_dict()
+        return {k: v for k, v in self.to_dict().items() if base[k] != v}
+
+    def hash(self) -> str:
+        """Stable across processes and sessions (unlike hash())."""
+        # 3000 and 3000.0 are the same parameter value
+        values = {k: float(v) if isinstance(v, int) else v for k, v in self.to_dict().items()}
+        blob = json.dumps(values, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+DEFAULT_PARAMS = MarketParams()
@@ -0,0 +1,458 @@
+"""Daily price moves as a table of rules, compiled into array operations.
+
+    rules = compile_rules(default_rules(params))   # once per MarketParams
+    gates = rules.gates(prices, rent, drought)     # which chance rolls happen today
+    headline = rules.apply(prices, rent, drought, draws, pick)
+    headline = rules.apply_one(...)                # the same, for a single engine
+
+The table says what moves prices; nothing in it is code:
+
+    CostPush   a price that tracks a markup over weighted input prices (idli)
+    Walk       a daily random move of 1 +/- volatility, then a floor
+    Push       an amount added to a Walk's daily change while conditions hold
+    Roll       a chance draw taken on a Walk's turn, for Push or Headline to test
+    Headline   news shown when its conditions hold; the first one listed wins
+
+Conditions (When) test a feature: yesterday's price of a resource, a price
+already moved today, the rent, drought, or one of today's rolls. Every
+array has a leading K axis, one row per engine, so one compiled table
+moves a whole batch of engines in the same few NumPy operations. For a
+single engine those operations cost more than the arithmetic they do, so
+apply_one() walks the same compiled plan with plain floats instead.
+
+Rolls are laid out in the order the original per-resource loop made them
+(each Walk's move, then its Rolls, resource by resource); `slots` names
+the EnvironmentSchedule column each one is read from.
+"""
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .models import Resource, RESOURCE_INDEX
+from .params import MarketParams
+
+N_RESOURCES = len(Resource)
+RENT = "rent"
+DROUGHT = "drought"
+
+
+def price(res: Resource) -> str:
+    """Feature: yesterday's price of `res`."""
+    return f"price:{res.name}"
+
+
+def moved(res: Resource) -> str:
+    """Feature: the price of `res` after today's move (it must move first)."""
+    return f"moved:{res.name}"
+
+
+def roll(key: str) -> str:
+    """Feature: today's draw for Roll `key`, NaN when it was not taken."""
+    return f"roll:{key}"
+
+
+@dataclass(frozen=True)
+class When:
+    """Holds when low < feature <= high (never for a NaN feature)."""
+    feature: str
+    low: float = -math.inf
+    high: float = math.inf
+
+
+def above(feature: str, x: float) -> When:
+    return When(feature, x, math.inf)
+
+
+def at_most(feature: str, x: float) -> When:
+    return When(feature, -math.inf, x)
+
+
+def below(feature: str, x: float) -> When:
+    return When(feature, -math.inf, math.nextafter(x, -math.inf))
+
+
+@dataclass(frozen=True)
+class CostPush:
+    """`target` moves `adjust` of the way to markup * (sum of weight * price + base)."""
+    target: Resource
+    inputs: Tuple[Tuple[Resource, float], ...]
+    base: float
+    markup: float
+    adjust: float
+
+
+@dataclass(frozen=True)
+class Walk:
+    resource: Resource
+    volatility: float
+    floor: float
+
+
+@dataclass(frozen=True)
+class Push:
+    """Adds `amount` to `resource`'s change while all of `when` hold.
+
+    With `signed`, each time it applies the sign is picked at random (under
+    that key) from (-amount, +amount).
+    """
+    resource: Resource
+    amount: float
+    when: Tuple[When, ...] = ()
+    signed: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Roll:
+    """A uniform draw `key`, taken on `resource`'s turn when all of `gate` hold."""
+    resource: Resource
+    key: str
+    gate: Tuple[When, ...] = ()
+
+
+@dataclass(frozen=True)
+class Headline:
+    text: str
+    when: Tuple[When, ...]
+
+
+Rule = Union[CostPush, Walk, Push, Roll, Headline]
+
+
+def default_rules(params: MarketParams) -> List[Rule]:
+    """The model's price rules, in the order they roll and report."""
+    p = params
+    drought = above(DROUGHT, 0.5)
+    rules: List[Rule] = [
+        CostPush(Resource.IDLI_SET,
+                 ((Resource.RICE, p.idli_rice_weight), (Resource.COMMERCIAL_COFFEE, p.idli_coffee_weight)),
+                 p.idli_base_cost, p.idli_markup, p.idli_adjust),
+    ]
+    for res in (Resource.RAGI, Resource.RICE):
+        key = f"shortage_{res.name.lower()}"
+        rules += [
+            Walk(res, p.volatility, p.price_floor),
+            Push(res, p.drought_grain_push, (drought,)),
+            Roll(res, key, (drought,)),
+            Headline(f"{res.value} shortage due to drought.", (below(roll(key), 0.2),)),
+        ]
+    rules += [
+        # Raw beans
+        Walk(Resource.COMMERCIAL_COFFEE, p.volatility, p.price_floor),
+        Push(Resource.COMMERCIAL_COFFEE, p.drought_bean_push, (drought,)),
+        Roll(Resource.COMMERCIAL_COFFEE, "crop_failure", (drought,)),
+        Headline("Coffee crop failure in Coorg!", (below(roll("crop_failure"), 0.2),)),
+
+        # Artisan coffee, the luxury index: cost-push from today's bean price,
+        # demand softening with rent, and a ceiling correction
+        Walk(Resource.ARTISAN_COFFEE, p.volatility, p.price_floor),
+        Push(Resource.ARTISAN_COFFEE, p.bean_push, (above(moved(Resource.COMMERCIAL_COFFEE), p.bean_push_threshold),)),
+        Push(Resource.ARTISAN_COFFEE, -p.rent_squeeze_high_drag, (above(RENT, p.rent_squeeze_high),)),
+        Push(Resource.ARTISAN_COFFEE, -p.rent_squeeze_low_drag,
+             (When(RENT, p.rent_squeeze_low, p.rent_squeeze_high),)),
+        Push(Resource.ARTISAN_COFFEE, p.cafe_growth, (at_most(RENT, p.rent_squeeze_low),)),
+        Push(Resource.ARTISAN_COFFEE, -p.artisan_ceiling_drag, (above(price(Resource.ARTISAN_COFFEE), p.artisan_ceiling),)),
+        Roll(Resource.ARTISAN_COFFEE, "footfall", (above(RENT, p.rent_squeeze_high),)),
+        Headline("Cafes reporting lower footfall.", (below(roll("footfall"), 0.1),)),
+
+        # Code: industry drift plus the odd shock either way
+        Walk(Resource.CODE, p.volatility, p.price_floor),
+        Push(Resource.CODE, p.code_drift),
+        Roll(Resource.CODE, "code_shock"),
+        Push(Resource.CODE, p.code_shock, (below(roll("code_shock"), p.code_shock_prob),), signed="code_direction"),
+    ]
+    # Headlines report in loop order: grains, then beans, then cafes
+    headlines = [rule for rule in rules if isinstance(rule, Headline)]
+    return [rule for rule in rules if not isinstance(rule, Headline)] + headlines
+
+
+Condition = Tuple[int, float, float]   # (feature index, low, high)
+
+
+def _holds(f: List[float], conditions: Sequence[Condition]) -> bool:
+    for i, low, high in conditions:
+        if not low < f[i] <= high:
+            return False
+    return True
+
+
+class _Walk:
+    """One compiled Walk: its column, move draw, bounds and pushes in table order."""
+
+    def __init__(self, col: int, move: int, walk: Walk):
+        self.col = col
+        self.move = move                      # feature index of its move draw
+        self.low = 1 - walk.volatility
+        self.span = (1 + walk.volatility) - (1 - walk.volatility)
+        self.floor = walk.floor
+        self.pushes: List[Tuple[Tuple[Condition, ...], float, Optional[str]]] = []
+
+
+class _Level:
+    """Walks that move together: none of them tests another's moved price."""
+
+    def __init__(self, walks: List[_Walk], width: int, never: Condition):
+        self.walks = walks
+        n = len(walks)
+        self.cols = np.array([w.col for w in walks], dtype=np.intp)
+        self.moves = np.array([w.move for w in walks], dtype=np.intp)
+        self.low = np.array([w.low for w in walks])[:, None]
+        self.span = np.array([w.span for w in walks])[:, None]
+        self.floor = np.array([w.floor for w in walks])[:, None]
+        # Push j of every walk is added in one step; a walk without one adds 0.0
+        J = max((len(w.pushes) for w in walks), default=0)
+        self.push_features = np.full((J, n, width), never[0], dtype=np.intp)
+        self.push_low = np.full((J, n, width), never[1])
+        self.push_high = np.full((J, n, width), never[2])
+        self.amounts = np.zeros((J, n, 1))
+        self.signed: List[Tuple[int, int, str]] = []   # (walk, push, pick key)
+        for i, walk in enumerate(walks):
+            for j, (conditions, amount, signed) in enumerate(walk.pushes):
+                padded = list(conditions) + [conditions[0]] * (width - len(conditions))
+                self.push_features[j, i] = [c[0] for c in padded]
+                self.push_low[j, i] = [c[1] for c in padded]
+                self.push_high[j, i] = [c[2] for c in padded]
+                self.amounts[j, i] = amount
+                if signed:
+                    self.signed.append((i, j, signed))
+
+
+class PriceRules:
+    """A rule table compiled once, for batches (apply) or one engine (apply_one).
+
+    Both walk the same compiled plan in the same order and agree bit for bit.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+        walks = [rule for rule in rules if isinstance(rule, Walk)]
+        pushes = [rule for rule in rules if isinstance(rule, Push)]
+        rolls = [rule for rule in rules if isinstance(rule, Roll)]
+        cost_pushes = [rule for rule in rules if isinstance(rule, CostPush)]
+        headlines = [rule for rule in rules if isinstance(rule, Headline)]
+        walked = [walk.resource for walk in walks]
+        if len(set(walked)) != len(walked):
+            raise ValueError("A resource can only have one Walk")
+        for rule in pushes + rolls:
+            if rule.resource not in walked:
+                raise ValueError(f"{type(rule).__name__} on {rule.resource.name}, which has no Walk")
+        for rule in cost_pushes:
+            if rule.target in walked:
+                raise ValueError(f"{rule.target.name} has both a Walk and a CostPush")
+
+        # Draw slots in roll order: each walk's move, then its rolls
+        self.slots: List[Tuple[str, Optional[Resource]]] = []
+        move_slot: Dict[Resource, int] = {}
+        roll_slot: Dict[str, int] = {}
+        for walk in walks:
+            move_slot[walk.resource] = len(self.slots)
+            self.slots.append(("change", walk.resource))
+            for r in rolls:
+                if r.resource == walk.resource:
+                    roll_slot[r.key] = len(self.slots)
+                    self.slots.append((r.key, None))
+        self.headlines = [rule.text for rule in headlines]
+        self.moves = walked + [rule.target for rule in cost_pushes]
+        self._move_cols = np.array([RESOURCE_INDEX[res] for res in self.moves], dtype=np.intp)
+
+        # Features: yesterday's prices, moved prices, rent, drought, draws
+        R = N_RESOURCES
+        self._slot0 = 2 * R + 2
+        self._n_features = self._slot0 + len(self.slots)
+
+        def feature(name: str) -> int:
+            kind, _, arg = name.partition(":")
+            if name == RENT:
+                return 2 * R
+            if name == DROUGHT:
+                return 2 * R + 1
+            if kind == "price":
+                return RESOURCE_INDEX[Resource[arg]]
+            if kind == "moved":
+                if Resource[arg] not in walked:
+                    raise ValueError(f"{name}: {arg} has no Walk")
+                return R + RESOURCE_INDEX[Resource[arg]]
+            if kind == "roll":
+                if arg not in roll_slot:
+                    raise ValueError(f"{name}: no Roll named {arg!r}")
+                return self._slot0 + roll_slot[arg]
+            raise ValueError(f"Unknown feature {name!r}")
+
+        def compiled(when: Tuple[When, ...]) -> Tuple[Condition, ...]:
+            return tuple((feature(w.feature), w.low, w.high) for w in when)
+
+        always: Condition = (2 * R, -math.inf, math.inf)    # rent is always a number
+        never: Condition = (2 * R, math.inf, math.inf)
+        width = max([len(rule.when) for rule in pushes + headlines] + [len(r.gate) for r in rolls] + [1])
+
+        # A roll's gate is settled before anything moves or rolls
+        self._gates: List[Tuple[Condition, ...]] = [()] * len(self.slots)
+        for r in rolls:
+            if any(not (w.feature in (RENT, DROUGHT) or w.feature.startswith("price:")) for w in r.gate):
+                raise ValueError(f"Roll {r.key!r} can only be gated on rent, drought or yesterday's prices")
+            self._gates[roll_slot[r.key]] = compiled(r.gate)
+        self._gate_arrays = self._condition_arrays(self._gates, width, always)
+
+        # Walks that test a moved price go in a later level than the walk they test
+        level_of: Dict[Resource, int] = {}
+        compiled_walks: Dict[Resource, _Walk] = {}
+        for walk in walks:
+            deps = [Resource[w.feature.partition(":")[2]] for push in pushes if push.resource == walk.resource
+                    for w in push.when if w.feature.startswith("moved:")]
+            if any(dep not in level_of for dep in deps):
+                raise ValueError(f"{walk.resource.name} tests a price that has not moved yet; list its Walk later")
+            level_of[walk.resource] = max((level_of[dep] + 1 for dep in deps), default=0)
+            cw = compiled_walks[walk.resource] = _Walk(
+                RESOURCE_INDEX[walk.resource], self._slot0 + move_slot[walk.resource], walk)
+            cw.pushes = [(compiled(push.when) or (always,), push.amount, push.signed)
+                         for push in pushes if push.resource == walk.resource]
+        self._levels = [
+            _Level([compiled_walks[walk.resource] for walk in walks if level_of[walk.resource] == number],
+                   width, never)
+            for number in range(max(level_of.values(), default=-1) + 1)
+        ]
+
+        # Cost pushes: (column, ((feature, weight), ...), base, markup, adjust)
+        self._cost = [(RESOURCE_INDEX[rule.target], tuple((RESOURCE_INDEX[res], w) for res, w in rule.inputs),
+                       rule.base, rule.markup, rule.adjust) for rule in cost_pushes]
+
+        self._headlines = [compiled(rule.when) or (always,) for rule in headlines]
+        self._headline_arrays = self._condition_arrays(self._headlines, width, always)
+        # The batch feature matrix, kept between calls of the same size: at
+        # ensemble sizes it is megabytes, and a fresh one is fresh pages
+        self._f: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _condition_arrays(conditions: List[Tuple[Condition, ...]], width: int, pad: Condition):
+        """(features, low, high), each (n, width), for n AND-ed condition lists."""
+        rows = [list(c) + [pad] * (width - len(c)) for c in conditions]
+        arrays = [np.array([[c[k] for c in row] for row in rows]).reshape(len(rows), width) for k in range(3)]
+        arrays[0] = arrays[0].astype(np.intp)
+        return arrays
+
+    # --- One engine, with plain floats ---
+
+    def gates_one(self, prices: List[float], rent: float, drought: bool) -> List[bool]:
+        """Which draws an engine takes today, per slot."""
+        f = prices + prices + [rent, 1.0 if drought else 0.0]
+        return [_holds(f, gate) for gate in self._gates]
+
+    def apply_one(self, prices: List[float], rent: float, drought: bool, draws: List[float],
+                  pick: Optional[Callable[[str, Tuple[float, float]], float]] = None) -> int:
+        """apply() for a single engine: moves `prices` (one per Resource) in place."""
+        R = N_RESOURCES
+        f = prices + prices + [rent, 1.0 if drought else 0.0] + draws
+
+        # Cost pushes read yesterday's prices
+        for col, inputs, base, markup, adjust in self._cost:
+            basis = f[inputs[0][0]] * inputs[0][1]
+            for i, weight in inputs[1:]:
+                basis += f[i] * weight
+            current = f[col]
+            prices[col] = f[R + col] = current + ((basis + base) * markup - current) * adjust
+
+        for level in self._levels:
+            for walk in level.walks:
+                change = walk.low + walk.span * f[walk.move]
+                for conditions, amount, signed in walk.pushes:
+                    if _holds(f, conditions):
+                        change += self._pick(pick, signed, amount) if signed else amount
+                moved = f[walk.col] * change
+                prices[walk.col] = f[R + walk.col] = moved if moved >= walk.floor else walk.floor
+
+        for index, conditions in enumerate(self._headlines):
+            if _holds(f, conditions):
+                return index
+        return -1
+
+    # --- A batch of engines, one row each ---
+
+    def _features(self, prices: np.ndarray, rent: np.ndarray, drought: np.ndarray,
+                  draws: Optional[np.ndarray]) -> np.ndarray:
+        # Feature-major, so every lookup below is a contiguous row
+        R = N_RESOURCES
+        f = self._f
+        if f is None or f.shape[1] != len(prices):
+            f = self._f = np.empty((self._n_features, len(prices)))
+        f[:R] = prices.T
+        f[R:2 * R] = f[:R]
+        f[2 * R] = rent
+        f[2 * R + 1] = drought
+        f[self._slot0:] = np.nan if draws is None else draws.T
+        return f
+
+    @staticmethod
+    def _all_hold(f: np.ndarray, features: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        values = f[features]
+        return ((values > low[..., None]) & (values <= high[..., None])).all(axis=-2)
+
+    def gates(self, prices: np.ndarray, rent: np.ndarray, drought: np.ndarray) -> np.ndarray:
+        """(K, len(slots)) bool: which draws each engine takes today."""
+        return self._all_hold(self._features(prices, rent, drought, None), *self._gate_arrays).T
+
+    def apply(self, prices: np.ndarray, rent: np.ndarray, drought: np.ndarray, draws: np.ndarray,
+              pick: Optional[Callable[[str, Tuple[float, float], np.ndarray], np.ndarray]] = None,
+              gated: bool = True) -> np.ndarray:
+        """Move (K, N_RESOURCES) `prices` in place for one day.
+
+        `draws` is (K, len(slots)) uniforms in [0, 1), NaN where gates()
+        said no; with gated=False it has every slot's uniform and the gates
+        are applied here instead, without a separate gates() pass.
+        `pick(key, (-a, a), rows)` chooses a signed Push's amount for each
+        of the engines `rows` it applies to, as an array. Returns each
+        engine's headline index, -1 for none.
+        """
+        R = N_RESOURCES
+        f = self._features(prices, rent, drought, draws)
+        if not gated:
+            # Gates only read yesterday's prices, rent and drought, all set already
+            np.copyto(f[self._slot0:], np.nan, where=~self._all_hold(f, *self._gate_arrays))
+
+        for col, inputs, base, markup, adjust in self._cost:
+            basis = f[inputs[0][0]] * inputs[0][1]
+            for i, weight in inputs[1:]:
+                basis += f[i] * weight
+            current = f[col]
+            f[R + col] = current + ((basis + base) * markup - current) * adjust
+
+        for level in self._levels:
+            change = level.low + level.span * f[level.moves]
+            holds = self._all_hold(f, level.push_features, level.push_low, level.push_high)
+            # amount or (+/-) 0.0; np.where is several times slower at this shape
+            added = holds * level.amounts
+            for i, j, key in level.signed:
+                rows = np.flatnonzero(holds[j, i])
+                if len(rows):
+                    added[j, i, rows] = self._pick(pick, key, float(level.amounts[j, i, 0]), rows)
+            # In table order, as apply_one adds them
+            for j in range(len(added)):
+                change += added[j]
+            f[R + level.cols] = np.maximum(f[level.cols] * change, level.floor)
+
+        prices[:, self._move_cols] = f[R + self._move_cols].T
+        if not self.headlines:
+            return np.full(len(prices), -1)
+        shown = self._all_hold(f, *self._headline_arrays)
+        # The first headline that holds: later ones are overwritten by earlier
+        first = np.full(len(prices), -1)
+        for index in range(len(shown) - 1, -1, -1):
+            first[shown[index]] = index
+        return first
+
+    @staticmethod
+    def _pick(pick, key: str, amount: float, *rows):
+        if pick is None:
+            raise ValueError(f"Signed push {key!r} applies but no pick was given")
+        return pick(key, (-amount, amount), *rows)
+
+
+@lru_cache(maxsize=32)
+def rules_for(params: MarketParams) -> PriceRules:
+    """default_rules(params), compiled once per distinct params."""
+    return compile_rules(default_rules(params))
+
+
+def compile_rules(rules: Sequence[Rule]) -> PriceRules:
+    return PriceRules(rules)
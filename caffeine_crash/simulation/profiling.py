@@ -0,0 +1,121 @@
+import json
+import sys
+import tracemalloc
+from collections import defaultdict
+from time import perf_counter_ns
+from typing import Callable, Dict, Optional
+
+from .engine import STEP_PHASES
+
+PHASES = tuple(name for name, _ in STEP_PHASES)
+
+
+class StepProfiler:
+    """Per-phase timings and allocation counts for MarketEngine.step.
+
+    Attach with `engine.profiler = StepProfiler()`; set it back to None to
+    turn profiling off (the engine then skips all of this with a single
+    check per step).
+
+    Allocations are counted as the net change in live memory blocks per
+    phase (sys.getallocatedblocks, nearly free). With `track_memory=True`
+    tracemalloc also records each phase's peak traced bytes, which is much
+    slower and meant for one-off investigations.
+    """
+
+    def __init__(self, track_memory: bool = False):
+        self.track_memory = track_memory
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.reset()
+
+    def reset(self):
+        self.steps = 0
+        self._block_bias = 0
+        self.phase_ns: Dict[str, int] = defaultdict(int)
+        self.phase_blocks: Dict[str, int] = defaultdict(int)
+        self.phase_peak_bytes: Dict[str, int] = defaultdict(int)
+        self.agent_ns: Dict[str, int] = defaultdict(int)
+        self.agent_calls: Dict[str, int] = defaultdict(int)
+        self._block_bias = self._calibrate()
+
+    def _calibrate(self) -> int:
+        """Blocks the measurement itself allocates, subtracted from every phase."""
+        for _ in range(3):
+            self._time("_noop", lambda: None)
+        bias = self.phase_blocks.pop("_noop") // 3
+        self.phase_ns.pop("_noop")
+        self.phase_peak_bytes.pop("_noop", None)
+        return bias
+
+    def profile_step(self, engine):
+        """Run one engine step, timing each phase."""
+        engine.advance_date()
+        for phase, fn in engine.step_phases:
+            self._time(phase, fn)
+        self.steps += 1
+
+    def _time(self, phase: str, fn: Callable[[], None]):
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            before_bytes = tracemalloc.get_traced_memory()[0]
+        blocks = sys.getallocatedblocks()
+        start = perf_counter_ns()
+        fn()
+        self.phase_ns[phase] += perf_counter_ns() - start
+        self.phase_blocks[phase] += sys.getallocatedblocks() - blocks - self._block_bias
+        if self.track_memory:
+            peak = tracemalloc.get_traced_memory()[1] - before_bytes
+            self.phase_peak_bytes[phase] = max(self.phase_peak_bytes[phase], peak)
+
+    def time_agents(self, agents, market_state, events, prices=None):
+        """Object engine: act() every agent, timing each call by agent class."""
+        agent_ns, agent_calls = self.agent_ns, self.agent_calls
+        for agent in agents:
+            start = perf_counter_ns()
+            agent.act(market_state, events, prices)
+            kind = type(agent).__name__
+            agent_ns[kind] += perf_counter_ns() - start
+            agent_calls[kind] += 1
+
+    def time_agent_kind(self, kind: str, n_agents: int, fn: Callable, *args):
+        """Vectorized engine: one batched call that acts for `n_agents` agents."""
+        start = perf_counter_ns()
+        fn(*args)
+        self.agent_ns[kind] += perf_counter_ns() - start
+        self.agent_calls[kind] += n_agents
+
+    def report(self) -> dict:
+        steps = max(self.steps, 1)
+        total_ns = sum(self.phase_ns.values()) or 1
+        phases = {}
+        for phase in PHASES:
+            entry = {
+                "mean_us": self.phase_ns[phase] / steps / 1e3,
+                "share": self.phase_ns[phase] / total_ns,
+                "net_blocks_per_step": self.phase_blocks[phase] / steps,
+            }
+            if self.track_memory:
+                entry["peak_bytes"] = self.phase_peak_bytes[phase]
+            phases[phase] = entry
+        agents = {
+            kind: {
+                "calls": self.agent_calls[kind],
+                "mean_us_per_agent": self.agent_ns[kind] / max(self.agent_calls[kind], 1) / 1e3,
+                "mean_us_per_step": self.agent_ns[kind] / steps / 1e3,
+            }
+            for kind in self.agent_ns
+        }
+        return {
+            "steps": self.steps,
+            "step_mean_us": total_ns / steps / 1e3 if self.steps else 0.0,
+            "phases": phases,
+            "agents": agents,
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.report(), indent=indent)
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.to_json())
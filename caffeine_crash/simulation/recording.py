@@ -0,0 +1,325 @@
+"""Record a run once, then replay and scrub through it at any speed.
+
+A recording is a directory:
+
+    recording/
+      manifest.json   first day and date, days recorded, keyframe interval
+      start.ckpt      checkpoint of the engine when recording began
+      days.bin        STREAM_MAGIC + one frame per day (simulation/delta.py):
+                      a keyframe every `keyframe_interval` days, deltas between
+      index.bin       uint64 byte offset of each day's frame in days.bin
+
+Seeking to any day jumps through the index to the keyframe at or before it
+and applies at most keyframe_interval - 1 deltas, so it costs the same on
+day 10 as on day 20,000. Decoded segments are cached, so playing and
+scrubbing nearby stays cheap. The per-day stream has no agents and no
+history; `engine_at()` rebuilds a full engine from start.ckpt when needed.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .checkpoint import load_checkpoint, save_checkpoint
+from .delta import STREAM_MAGIC, MarketView, encode_frame
+from .engine import MarketEngine
+from .export import PRICED_RESOURCES
+from .models import Resource
+from .runner import Snapshot, REALTIME
+
+RECORDING_VERSION = 1
+KEYFRAME_INTERVAL = 30      # days; a seek decodes at most this many frames
+FLUSH_DAYS = 1024           # days buffered in memory between writes
+SEGMENT_CACHE = 256         # decoded keyframe segments kept by a Recording
+MAX_REPLAY_SPEED = 3650.0   # days per second when replaying at "max"
+
+
+class Recorder:
+    """Engine recorder that writes a recording of the run to `path`.
+
+    Attach with `engine.recorders.append(Recorder(path, engine))` (the
+    starting checkpoint and the first keyframe are written right away) and
+    call close() when the run ends.
+    """
+
+    def __init__(self, path: str, engine: MarketEngine, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.first_day = engine.day
+        self.first_date = engine.state.date
+        self.days = 0            # days on disk
+        self.offset = len(STREAM_MAGIC)
+        self._previous: Optional[Snapshot] = None
+        self._frames: List[bytes] = []
+        os.makedirs(path, exist_ok=True)
+        save_checkpoint(engine, os.path.join(path, "start.ckpt"))
+        self._stream = open(os.path.join(path, "days.bin"), "wb")
+        self._stream.write(STREAM_MAGIC)
+        self._index = open(os.path.join(path, "index.bin"), "wb")
+        self.record(engine)
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, engine: MarketEngine):
+        state = engine.state
+        snapshot = Snapshot(
+            day=engine.day, date=state.date, season=state.season, weather=state.weather,
+            market_mood=state.market_mood, headline=state.headline, rent=state.rent,
+            avg_techie_cash=state.avg_techie_cash, prices=dict(state.prices),
+            logs=[], profile=None, days_per_second=0.0,
+        )
+        n = self.days + len(self._frames)
+        key = n % self.keyframe_interval == 0
+        self._frames.append(encode_frame(snapshot, None if key else self._previous))
+        self._previous = snapshot
+        if len(self._frames) >= FLUSH_DAYS:
+            self.flush()
+
+    def flush(self):
+        """Append buffered frames and their offsets, then update the manifest."""
+        if not self._frames:
+            return
+        sizes = np.fromiter((len(frame) for frame in self._frames), dtype=np.uint64, count=len(self._frames))
+        offsets = self.offset + np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.uint64)
+        self._stream.write(b"".join(self._frames))
+        self._index.write(offsets.astype("<u8").tobytes())
+        self._stream.flush()
+        self._index.flush()
+        self.offset += int(sizes.sum())
+        self.days += len(self._frames)
+        self._frames = []
+        self._write_manifest()
+
+    def close(self):
+        if self._stream is not None:
+            self.flush()
+            self._stream.close()
+            self._index.close()
+            self._stream = self._index = None
+
+    def _write_manifest(self):
+        manifest = {
+            "version": RECORDING_VERSION,
+            "first_day": self.first_day,
+            "first_date": self.first_date.isoformat(),
+            "days": self.days,
+            "keyframe_interval": self.keyframe_interval,
+        }
+        # Replace atomically so a reader never sees a half-written manifest
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+
+class _Segment:
+    """One keyframe and the deltas after it, decoded."""
+
+    def __init__(self, views: List[MarketView]):
+        self.views = views
+        self.rent = np.array([view.rent for view in views])
+        self.prices = np.array([[view.prices[res] for res in PRICED_RESOURCES] for view in views])
+
+
+class Recording:
+    """Read side of a recording (finished, or still being written)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] != RECORDING_VERSION:
+            raise ValueError(f"{path} has recording version {self.manifest['version']}, "
+                             f"expected {RECORDING_VERSION}")
+        self.first_day: int = self.manifest["first_day"]
+        self.first_date = datetime.fromisoformat(self.manifest["first_date"])
+        self.days: int = self.manifest["days"]
+        self.keyframe_interval: int = self.manifest["keyframe_interval"]
+        self._stream = np.memmap(os.path.join(path, "days.bin"), dtype=np.uint8, mode="r")
+        if bytes(self._stream[:len(STREAM_MAGIC)]) != STREAM_MAGIC:
+            raise ValueError(f"{path} is not a Caffeine Crash recording")
+        self._index = np.fromfile(os.path.join(path, "index.bin"), dtype="<u8", count=self.days)
+        self._segments: "OrderedDict[int, _Segment]" = OrderedDict()
+
+    @property
+    def last_day(self) -> int:
+        return self.first_day + self.days - 1
+
+    def clamp(self, day: int) -> int:
+        return min(max(day, self.first_day), self.last_day)
+
+    def day_of(self, date: datetime) -> int:
+        """The recorded day falling on `date` (clamped to the recording)."""
+        return self.clamp(self.first_day + (date - self.first_date).days)
+
+    def _frame(self, row: int) -> bytes:
+        start = int(self._index[row])
+        end = int(self._index[row + 1]) if row + 1 < self.days else len(self._stream)
+        # Skip the frame's uint32 length prefix
+        return bytes(self._stream[start + 4:end])
+
+    def _segment(self, number: int) -> _Segment:
+        segment = self._segments.get(number)
+        if segment is not None:
+            self._segments.move_to_end(number)
+            return segment
+        view = MarketView()
+        views = []
+        first = number * self.keyframe_interval
+        for row in range(first, min(first + self.keyframe_interval, self.days)):
+            view.apply(self._frame(row))
+            views.append(MarketView(**{**vars(view), "prices": dict(view.prices)}))
+        segment = self._segments[number] = _Segment(views)
+        if len(self._segments) > SEGMENT_CACHE:
+            self._segments.popitem(last=False)
+        return segment
+
+    def view(self, day: int) -> MarketView:
+        """The market as it was at the end of `day`."""
+        row = self.clamp(day) - self.first_day
+        return self._segment(row // self.keyframe_interval).views[row % self.keyframe_interval]
+
+    def series(self, name: str, last_day: int, n: int) -> np.ndarray:
+        """Up to `n` daily values of "rent" or a Resource name ending at `last_day`."""
+        last_row = self.clamp(last_day) - self.first_day
+        first_row = max(0, last_row - n + 1)
+        k = self.keyframe_interval
+        parts = []
+        for number in range(first_row // k, last_row // k + 1):
+            segment = self._segment(number)
+            column = segment.rent if name == "rent" else segment.prices[:, PRICED_RESOURCES.index(Resource[name])]
+            start = max(first_row - number * k, 0)
+            parts.append(column[start:last_row - number * k + 1])
+        return np.concatenate(parts)
+
+    def engine_at(self, day: int) -> MarketEngine:
+        """A full engine at the end of `day`, re-simulated from start.ckpt (takes O(days))."""
+        engine = load_checkpoint(os.path.join(self.path, "start.ckpt"))
+        while engine.day < self.clamp(day):
+            engine.step()
+        return engine
+
+
+class ReplaySeries:
+    """Chart-facing stand-in for a SeriesHistory, ending at the replay cursor."""
+
+    def __init__(self, runner: "ReplayRunner", name: str, window: int):
+        self.runner = runner
+        self.name = name
+        self.window = window
+
+    @property
+    def version(self) -> int:
+        return self.runner.day
+
+    def __len__(self) -> int:
+        return min(self.runner.day - self.runner.recording.first_day + 1, self.window)
+
+    def last(self, n: Optional[int] = None) -> np.ndarray:
+        return self.runner.recording.series(self.name, self.runner.day, n or self.window)
+
+
+class ReplayRunner:
+    """Plays a Recording back, with SimulationRunner's interface.
+
+    The cursor is a function of the wall clock (day = anchor + elapsed *
+    speed), so there is no thread: any speed and any seek cost the same.
+    Playback pauses on its own at the end of the recording.
+    """
+
+    def __init__(self, recording: Recording, days_per_second: Optional[float] = REALTIME,
+                 chart_window: int = 3650):
+        self.recording = recording
+        self.lock = threading.Lock()   # nothing to guard; kept for interface parity
+        self._speed = days_per_second
+        self._paused = True
+        self._anchor_day = float(recording.first_day)
+        self._anchor_time = time.perf_counter()
+        self._snapshot: Optional[Snapshot] = None
+        self.series: Dict[str, ReplaySeries] = {
+            name: ReplaySeries(self, name, chart_window)
+            for name in ["rent"] + [res.name for res in PRICED_RESOURCES]
+        }
+
+    def _rate(self) -> float:
+        return MAX_REPLAY_SPEED if self._speed is None else self._speed
+
+    def _cursor(self) -> float:
+        if self._paused:
+            return self._anchor_day
+        cursor = self._anchor_day + (time.perf_counter() - self._anchor_time) * self._rate()
+        if cursor >= self.recording.last_day:
+            self._anchor_day, self._paused = float(self.recording.last_day), True
+            return self._anchor_day
+        return cursor
+
+    def _rebase(self, day: Optional[float] = None):
+        self._anchor_day = self._cursor() if day is None else day
+        self._anchor_time = time.perf_counter()
+
+    @property
+    def day(self) -> int:
+        return int(self._cursor())
+
+    @property
+    def speed(self) -> Optional[float]:
+        return self._speed
+
+    @speed.setter
+    def speed(self, days_per_second: Optional[float]):
+        self._rebase()
+        self._speed = days_per_second
+
+    @property
+    def paused(self) -> bool:
+        self._cursor()   # notices the end of the recording
+        return self._paused
+
+    def pause(self):
+        self._rebase()
+        self._paused = True
+
+    def resume(self):
+        if self._anchor_day >= self.recording.last_day:
+            self._anchor_day = float(self.recording.first_day)
+        self._anchor_time = time.perf_counter()
+        self._paused = False
+
+    def start(self):
+        self.resume()
+
+    def stop(self, timeout: Optional[float] = None):
+        self.pause()
+
+    def seek(self, day: int):
+        self._rebase(float(self.recording.clamp(day)))
+
+    def seek_date(self, date: datetime):
+        self.seek(self.recording.day_of(date))
+
+    def skip(self, days: int):
+        self.seek(self.day + days)
+
+    @property
+    def snapshot(self) -> Snapshot:
+        day = self.day
+        rate = 0.0 if self._paused else self._rate()
+        cached = self._snapshot
+        if cached is None or cached.day != day or cached.days_per_second != rate:
+            view = self.recording.view(day)
+            cached = self._snapshot = Snapshot(
+                day=view.day, date=view.date, season=view.season, weather=view.weather,
+                market_mood=view.market_mood, headline=view.headline, rent=view.rent,
+                avg_techie_cash=view.avg_techie_cash, prices=dict(view.prices),
+                logs=[], profile=None, days_per_second=rate,
+            )
+        return cached
@@ -0,0 +1,188 @@
+"""Run a MarketEngine on a background thread at a chosen speed.
+
+The runner steps the engine on its own thread and, after every batch of
+steps, publishes an immutable Snapshot of the headline numbers. Readers
+such as the TUI take the latest snapshot at their own frame rate, so
+however many days passed since the last frame, only the newest is drawn.
+
+Anything that reads the engine's live data directly (history for charts,
+or swapping the profiler) must hold `runner.lock`.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .aggregates import PopulationStats
+from .models import Resource, Season
+
+REALTIME = 2.0            # days per second, the TUI's original pace
+MAX_BATCH_SECONDS = 0.02  # longest the engine lock is held in one go
+RATE_WINDOW = 2.0         # seconds of history behind the measured speed
+
+# Named speeds accepted by parse_speed; None means as fast as possible
+NAMED_SPEEDS: Dict[str, Optional[float]] = {"realtime": REALTIME, "max": None}
+
+
+def parse_speed(text: str) -> Optional[float]:
+    """'realtime', 'max' or a number of days per second."""
+    if text in NAMED_SPEEDS:
+        return NAMED_SPEEDS[text]
+    value = float(text)
+    if value <= 0:
+        raise ValueError(f"Speed must be positive, got {text}")
+    return value
+
+
+def format_speed(days_per_second: Optional[float]) -> str:
+    if days_per_second is None:
+        return "max"
+    if days_per_second == REALTIME:
+        return "realtime"
+    return f"{days_per_second:g} days/s"
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """What the engine looked like at the end of one batch of steps.
+
+    Field names follow MarketState, so UI code written against the state
+    works with a snapshot too.
+    """
+    day: int
+    date: datetime
+    season: Season
+    weather: str
+    market_mood: str
+    headline: str
+    rent: float
+    avg_techie_cash: float
+    prices: Dict[Resource, float]
+    logs: List[str]                # newest first
+    profile: Optional[dict]        # StepProfiler report, if one is attached
+    days_per_second: float         # measured, not requested
+    population: Optional[PopulationStats] = None  # only if asked for, it reads every agent
+    events_emitted: int = 0        # events so far; `logs` are the newest of them
+
+    @classmethod
+    def capture(cls, engine, days_per_second: float = 0.0, n_logs: int = 5,
+                population: bool = False) -> "Snapshot":
+        state = engine.state
+        return cls(
+            day=engine.day,
+            date=state.date,
+            season=state.season,
+            weather=state.weather,
+            market_mood=state.market_mood,
+            headline=state.headline,
+            rent=state.rent,
+            avg_techie_cash=state.avg_techie_cash,
+            prices=dict(state.prices),
+            logs=engine.recent_logs(n_logs),
+            profile=engine.profiler.report() if engine.profiler is not None else None,
+            days_per_second=days_per_second,
+            population=engine.population_stats() if population else None,
+            events_emitted=engine.events.emitted if engine.events is not None else 0,
+        )
+
+
+class SimulationRunner:
+    """Steps an engine on a daemon thread at `days_per_second` (None = max)."""
+
+    def __init__(self, engine, days_per_second: Optional[float] = REALTIME, population: bool = False,
+                 n_logs: int = 5):
+        self.engine = engine
+        self.lock = threading.Lock()
+        # Whether snapshots carry PopulationStats (computed once per batch, not per day)
+        self.population = population
+        self.n_logs = n_logs
+        self.snapshot = Snapshot.capture(engine, n_logs=n_logs, population=population)
+        self._speed = days_per_second
+        self._paused = False
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # interrupts a sleep on pause/resume/speed change
+        self._rate = deque()             # (time, day) after each batch
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    @property
+    def speed(self) -> Optional[float]:
+        return self._speed
+
+    @speed.setter
+    def speed(self, days_per_second: Optional[float]):
+        self._speed = days_per_second
+        self._wake.set()
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def pause(self):
+        self._paused = True
+        self._wake.set()
+
+    def resume(self):
+        self._paused = False
+        self._wake.set()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 1.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _sleep(self, seconds: Optional[float]):
+        self._wake.wait(seconds)
+        self._wake.clear()
+
+    def _run(self):
+        due = time.perf_counter()  # when the next day is due at a fixed speed
+        while not self._stop.is_set():
+            if self._paused:
+                self._sleep(None)
+                due = time.perf_counter()
+                continue
+
+            speed = self._speed
+            now = time.perf_counter()
+            if speed is None:
+                steps = None
+            elif now < due:
+                self._sleep(due - now)
+                continue
+            else:
+                # Every day that fell due since the last batch (fast speeds step in batches)
+                steps = 1 + int((now - due) * speed)
+
+            with self.lock:
+                deadline = time.perf_counter() + MAX_BATCH_SECONDS
+                done = 0
+                while True:
+                    self.engine.step()
+                    done += 1
+                    if done == steps or time.perf_counter() >= deadline:
+                        break
+                snapshot = Snapshot.capture(self.engine, self._measure(), self.n_logs, self.population)
+            self.snapshot = snapshot
+
+            if speed is None:
+                # Give the UI thread a turn at the lock and the GIL
+                time.sleep(0)
+            else:
+                due += done / speed
+                # Too slow to keep up: don't try to make up for lost time later
+                due = max(due, time.perf_counter() - MAX_BATCH_SECONDS)
+
+    def _measure(self) -> float:
+        now, day = time.perf_counter(), self.engine.day
+        rate = self._rate
+        rate.append((now, day))
+        while now - rate[0][0] > RATE_WINDOW:
+            rate.popleft()
+        elapsed = now - rate[0][0]
+        return (day - rate[0][1]) / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,299 @@
+"""Region-sharded simulation: one worker process per Region.
+
+Each shard runs a RegionalEngine, a VectorizedMarketEngine holding only that
+region's agents with its own weather, rent and local prices. Once per
+simulated day every shard publishes what its agents sold and bought and
+what it charged into a TradeChannel (a small shared-memory board), waits at
+a barrier, and then settles trade. Ragi and rice ship out of Mandya, beans
+out of Coorg, and local prices react to the shipments.
+
+    python -m caffeine_crash.simulation.sharded --days 3650 --scale 10000
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .models import Population, Region, Resource, MOODS, RESOURCE_INDEX
+from .streams import RandomStreams
+from .vectorized import VectorizedMarketEngine, N_RESOURCES, REGION_INDEX
+
+# Goods that move between regions
+TRADED = np.array([RESOURCE_INDEX[res] for res in (Resource.RAGI, Resource.RICE, Resource.COMMERCIAL_COFFEE)])
+
+TRANSPORT_COST = 0.05     # importers pay this much over the exporters' price
+ARBITRAGE = 0.2           # share of the gap to the trade partner's price closed per day
+SHORTAGE_PRESSURE = 0.03  # daily price rise when none of a region's demand is met
+
+DEFAULT_REGIONS: Dict[Region, Population] = {
+    Region.BENGALURU: Population(farmers=0, planters=0, techies=5, darshinis=3),
+    Region.MANDYA: Population(farmers=5, planters=0, techies=0, darshinis=0, rice_farmers=3),
+    Region.COORG: Population(farmers=0, planters=3, techies=0, darshinis=0),
+    Region.MYSORE: Population(farmers=0, planters=0, techies=2, darshinis=2),
+}
+REGION_RENT: Dict[Region, float] = {Region.MYSORE: 1200.0}
+
+# Rows of the board for one region
+SOLD, BOUGHT, PRICE = 0, 1, 2
+
+BARRIER_TIMEOUT = 60.0    # seconds a shard waits for the others before giving up on the run
+POLL_INTERVAL = 0.5       # seconds between checks on the workers while collecting results
+
+
+class ShardError(RuntimeError):
+    """A shard process died or gave up before delivering its results."""
+
+
+class TradeChannel:
+    """Shared-memory board of (sold, bought, price) vectors, one row per region.
+
+    The board has two slots used on alternate days, so a fast shard writing
+    tomorrow's numbers never overwrites what a slow shard is still reading.
+    """
+
+    def __init__(self, n_regions: int, name: Optional[str] = None):
+        shape = (2, n_regions, 3, N_RESOURCES)
+        size = int(np.prod(shape)) * 8
+        self.owner = name is None
+        self.shm = SharedMemory(name=name, create=self.owner, size=size)
+        self.board = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+        if self.owner:
+            self.board[:] = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def publish(self, day: int, region: int, sold: np.ndarray, bought: np.ndarray, prices: np.ndarray):
+        row = self.board[day % 2, region]
+        row[SOLD] = sold
+        row[BOUGHT] = bought
+        row[PRICE] = prices
+
+    def read(self, day: int) -> np.ndarray:
+        return self.board[day % 2]
+
+    def close(self):
+        del self.board
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def settle_trade(board: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Ship surplus to deficit regions for every TRADED resource.
+
+    Returns (net shipments, shortage, reference price), each of shape
+    (n_regions, len(TRADED)). Shipments are positive for imports. Shortage
+    is the share of the region's demand that neither local sellers nor
+    imports covered. Surplus nobody imports is sold to the wider market at
+    the local price, so it does not push prices down. The reference price
+    is what trade partners charge, net of transport (NaN where the region
+    did not trade). Every shard computes the same result from the same board.
+    """
+    sold = board[:, SOLD, TRADED]
+    bought = board[:, BOUGHT, TRADED]
+    prices = board[:, PRICE, TRADED]
+
+    net = sold - bought
+    surplus = np.clip(net, 0, None)
+    deficit = np.clip(-net, 0, None)
+    total_surplus = surplus.sum(axis=0)
+    total_deficit = deficit.sum(axis=0)
+    shipped = np.minimum(total_surplus, total_deficit)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sent = np.nan_to_num(surplus / total_surplus) * shipped
+        received = np.nan_to_num(deficit / total_deficit) * shipped
+        export_price = (sent * prices).sum(axis=0) / sent.sum(axis=0)
+        import_price = (received * prices).sum(axis=0) / received.sum(axis=0)
+
+    unmet = np.clip(-(net + received), 0, None)
+    shortage = unmet / np.maximum(bought, 1.0)
+
+    reference = np.full_like(prices, np.nan)
+    reference = np.where(received > 0, export_price * (1 + TRANSPORT_COST), reference)
+    reference = np.where(sent > 0, import_price / (1 + TRANSPORT_COST), reference)
+    return received - sent, shortage, reference
+
+
+class RegionalEngine(VectorizedMarketEngine):
+    """One region's agents, weather, rent and local prices."""
+
+    def __init__(self, region: Region, rent: Optional[float] = None, **kwargs):
+        self.region = region
+        super().__init__(**kwargs)
+        if rent is not None:
+            self.state.rent = rent
+
+    def _init_agents(self):
+        agents = super()._init_agents()
+        for block in self.blocks:
+            block.region[:] = REGION_INDEX[self.region]
+        return agents
+
+    def price_vector(self) -> np.ndarray:
+        prices = np.zeros(N_RESOURCES, dtype=np.float64)
+        for res, price in self.state.prices.items():
+            prices[RESOURCE_INDEX[res]] = price
+        return prices
+
+    def apply_trade(self, shortage: np.ndarray, reference: np.ndarray):
+        """Move local prices of traded goods after today's shipments."""
+        prices = self.state.prices
+        resources = list(Resource)
+        for j, res_index in enumerate(TRADED):
+            res = resources[res_index]
+            price = prices[res] * (1 + SHORTAGE_PRESSURE * shortage[j])
+            if not np.isnan(reference[j]):
+                price += ARBITRAGE * (reference[j] - price)
+            prices[res] = max(5.0, float(price))
+
+
+@dataclass
+class RegionResult:
+    """Daily outputs of one shard."""
+    region: Region
+    agents: int
+    prices: np.ndarray           # (days, N_RESOURCES) local prices after trade
+    net_imports: np.ndarray      # (days, len(TRADED)) units received (+) or shipped (-)
+    rent: np.ndarray             # (days,)
+    avg_techie_cash: np.ndarray  # (days,)
+    mood: np.ndarray             # (days,) int8 index into MOODS
+
+
+def _run_shard(index: int, region: Region, population: Population, streams: RandomStreams, days: int,
+               channel_name: Optional[str], n_regions: int, barrier, results):
+    engine = RegionalEngine(
+        region, rent=REGION_RENT.get(region), streams=streams, population=population,
+        history_window=2, capture_events=False,
+    )
+    channel = TradeChannel(n_regions, name=channel_name) if channel_name else None
+    mood_index = {mood: i for i, mood in enumerate(MOODS)}
+    out = RegionResult(
+        region=region,
+        agents=population.total,
+        prices=np.empty((days, N_RESOURCES)),
+        net_imports=np.zeros((days, len(TRADED))),
+        rent=np.empty(days),
+        avg_techie_cash=np.empty(days),
+        mood=np.empty(days, dtype=np.int8),
+    )
+
+    try:
+        for day in range(days):
+            engine.step()
+            if channel is not None:
+                channel.publish(day, index, engine.sold, engine.bought, engine.price_vector())
+                barrier.wait()
+                shipments, shortage, reference = settle_trade(channel.read(day))
+                engine.apply_trade(shortage[index], reference[index])
+                out.net_imports[day] = shipments[index]
+            out.prices[day] = engine.price_vector()
+            out.rent[day] = engine.state.rent
+            out.avg_techie_cash[day] = engine.state.avg_techie_cash
+            out.mood[day] = mood_index[engine.state.market_mood]
+    except BaseException:
+        # Release the other shards at once instead of leaving them at the barrier
+        barrier.abort()
+        raise
+    finally:
+        if channel is not None:
+            channel.close()
+    results.put((index, out))
+
+
+class ShardedSimulation:
+    """Runs every region in its own process, trading once per simulated day."""
+
+    def __init__(self, regions: Optional[Dict[Region, Population]] = None, seed: int = 0,
+                 trade: bool = True, timeout: float = BARRIER_TIMEOUT):
+        self.regions = dict(regions or DEFAULT_REGIONS)
+        self.seed = seed
+        self.trade = trade
+        self.timeout = timeout  # longest a shard waits at the daily barrier
+
+    def run(self, days: int) -> Dict[Region, RegionResult]:
+        n = len(self.regions)
+        channel = TradeChannel(n) if self.trade else None
+        barrier = mp.Barrier(n, timeout=self.timeout)
+        results = mp.Queue()
+        # One independent set of streams per region, whichever regions are run
+        streams = RandomStreams(self.seed).spawn(len(Region))
+        workers = [
+            mp.Process(
+                target=_run_shard,
+                args=(i, region, population, streams[REGION_INDEX[region]], days,
+                      channel.name if channel else None, n, barrier, results),
+                daemon=True,
+            )
+            for i, (region, population) in enumerate(self.regions.items())
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            # Drain the queue before joining, large results would block the workers otherwise
+            collected = self._collect(workers, barrier, results)
+            for worker in workers:
+                # Results are in; a worker still not gone by now is stuck and gets terminated
+                worker.join(self.timeout)
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+            if channel is not None:
+                channel.close()
+        return {collected[i].region: collected[i] for i in range(n)}
+
+    @staticmethod
+    def _collect(workers, barrier, results) -> Dict[int, RegionResult]:
+        collected: Dict[int, RegionResult] = {}
+        while len(collected) < len(workers):
+            try:
+                index, out = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                failed = [(i, worker.exitcode) for i, worker in enumerate(workers)
+                          if worker.exitcode not in (None, 0) and i not in collected]
+                if failed:
+                    barrier.abort()
+                    details = ", ".join(f"shard {i} exit code {code}" for i, code in failed)
+                    raise ShardError(f"Sharded run failed: {details}")
+                continue
+            collected[index] = out
+        return collected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the region-sharded simulation.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every region's population")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-trade", action="store_true", help="run the regions in isolation")
+    args = parser.parse_args()
+
+    regions = {region: pop.scaled(args.scale) for region, pop in DEFAULT_REGIONS.items()}
+    sim = ShardedSimulation(regions, seed=args.seed, trade=not args.no_trade)
+    start = time.perf_counter()
+    results = sim.run(args.days)
+    elapsed = time.perf_counter() - start
+
+    total_agents = sum(r.agents for r in results.values())
+    print(f"{len(results)} shards, {total_agents:,} agents, {args.days} days in {elapsed:.2f}s "
+          f"({total_agents * args.days / elapsed:,.0f} agent-days/s)")
+    traded = [list(Resource)[i] for i in TRADED]
+    header = "".join(f"{res.value:>14}" for res in traded)
+    print(f"\n{'region':<11}{'agents':>9}{header}   net imports/day")
+    for region, result in results.items():
+        final = result.prices[-1, TRADED]
+        prices = "".join(f"{p:>14.2f}" for p in final)
+        imports = " ".join(f"{v:+.0f}" for v in result.net_imports.mean(axis=0))
+        print(f"{region.value:<11}{result.agents:>9,}{prices}   {imports}")
+
+
+if __name__ == "__main__":
+    main()
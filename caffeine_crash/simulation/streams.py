@@ -0,0 +1,58 @@
+"""Independent NumPy random streams, all spawned from one root seed.
+
+    streams = RandomStreams(seed=7)
+    weather = streams.generator("environment")          # the environment schedule's draws
+    farmer_orders = streams.generator("orders", 0)
+    shards = streams.spawn(4)                            # one RandomStreams per shard
+
+Every stream is a SeedSequence child of the root, addressed by a purpose
+and an index, so it can be rebuilt in any process, in any order, from
+(entropy, spawn_key) alone. Children of different purposes, indices or
+spawned members never share state, which makes thousands of runs side by
+side statistically independent and each one reproducible from its seed.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# First spawn-key word of each purpose; append only, or old seeds change meaning
+PURPOSES = ("environment", "orders", "members")
+
+
+class RandomStreams:
+    """The root of an engine's (or a shard's, or a member's) random streams."""
+
+    def __init__(self, seed: Optional[int] = None, entropy: Optional[int] = None,
+                 spawn_key: Tuple[int, ...] = ()):
+        # `entropy` restores streams whose seed was None (see checkpoint.py)
+        self.seed = seed
+        self.entropy = entropy if entropy is not None else np.random.SeedSequence(seed).entropy
+        self.spawn_key = tuple(spawn_key)
+
+    def sequence(self, purpose: str, *index: int) -> np.random.SeedSequence:
+        return np.random.SeedSequence(self.entropy, spawn_key=self.spawn_key + (PURPOSES.index(purpose), *index))
+
+    def generator(self, purpose: str, *index: int) -> np.random.Generator:
+        return np.random.default_rng(self.sequence(purpose, *index))
+
+    def spawn(self, n: int) -> List["RandomStreams"]:
+        """`n` independent RandomStreams, e.g. one per shard or ensemble member."""
+        key = self.spawn_key + (PURPOSES.index("members"),)
+        return [RandomStreams(self.seed, self.entropy, key + (i,)) for i in range(n)]
+
+    def to_dict(self) -> Dict:
+        return {"seed": self.seed, "entropy": self.entropy, "spawn_key": list(self.spawn_key)}
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> "RandomStreams":
+        return cls(values["seed"], values["entropy"], tuple(values["spawn_key"]))
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, RandomStreams)
+                and (self.entropy, self.spawn_key) == (other.entropy, other.spawn_key))
+
+    def __hash__(self) -> int:
+        return hash((self.entropy, self.spawn_key))
+
+    def __repr__(self) -> str:
+        return f"RandomStreams(seed={self.seed}, spawn_key={self.spawn_key})"
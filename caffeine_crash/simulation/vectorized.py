@@ -0,0 +1,257 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .models import Resource, Region, RESOURCE_INDEX
+from .engine import MarketEngine
+from .events import EventCode
+
+N_RESOURCES = len(Resource)
+REGION_INDEX = {region: i for i, region in enumerate(Region)}
+
+RAGI = RESOURCE_INDEX[Resource.RAGI]
+RICE = RESOURCE_INDEX[Resource.RICE]
+COMMERCIAL_COFFEE = RESOURCE_INDEX[Resource.COMMERCIAL_COFFEE]
+ARTISAN_COFFEE = RESOURCE_INDEX[Resource.ARTISAN_COFFEE]
+IDLI_SET = RESOURCE_INDEX[Resource.IDLI_SET]
+
+# Per-agent columns of an AgentBlock
+AGENT_COLUMNS = ("cash", "inventory", "crop", "region")
+
+
+@dataclass
+class AgentBlock:
+    """All agents of one kind, stored as columns instead of objects."""
+    kind: str
+    first_id: int           # agent id of row 0; ids are contiguous across blocks
+    cash: np.ndarray        # (n,) float64
+    inventory: np.ndarray   # (n, N_RESOURCES) float64, indexed by RESOURCE_INDEX
+    crop: np.ndarray        # (n,) int8 resource ordinal, -1 if the agent grows nothing
+    region: np.ndarray      # (n,) int8 region ordinal
+
+    def __len__(self) -> int:
+        return len(self.cash)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return np.arange(self.first_id, self.first_id + len(self))
+
+    @classmethod
+    def create(cls, kind: str, first_id: int, n: int, region: Region, cash: float,
+               inventory: dict, crop: Optional[Resource] = None) -> "AgentBlock":
+        inv = np.zeros((n, N_RESOURCES), dtype=np.float64)
+        for res, amount in inventory.items():
+            inv[:, RESOURCE_INDEX[res]] = amount
+        return cls(
+            kind=kind,
+            first_id=first_id,
+            cash=np.full(n, cash, dtype=np.float64),
+            inventory=inv,
+            crop=np.full(n, RESOURCE_INDEX[crop] if crop is not None else -1, dtype=np.int8),
+            region=np.full(n, REGION_INDEX[region], dtype=np.int8),
+        )
+
+
+class VectorizedMarketEngine(MarketEngine):
+    """Struct-of-arrays twin of MarketEngine.
+
+    Agents live in one AgentBlock per kind and each kind's daily logic runs as
+    batched NumPy operations. Weather and prices are shared with MarketEngine,
+    so for the same seed and population both engines produce the same cash,
+    inventories, prices and mood.
+    """
+
+    def _init_agents(self) -> List:
+        pop, params = self.population, self.params
+        # Same agent order (and ids) as MarketEngine: farmers, paddy growers, planters,
+        # techies, darshinis.
+        # Planters and Raithas share the same daily logic, only the crop differs
+        self.farmers = AgentBlock.create(
+            "farmer", 0, pop.farmers + pop.rice_farmers + pop.planters, Region.MANDYA, params.farmer_cash,
+            {Resource.RAGI: 10}, crop=Resource.RAGI,
+        )
+        planters_start = pop.farmers + pop.rice_farmers
+        self.farmers.crop[pop.farmers:planters_start] = RICE
+        self.farmers.crop[planters_start:] = COMMERCIAL_COFFEE
+        self.farmers.region[planters_start:] = REGION_INDEX[Region.COORG]
+        self.techies = AgentBlock.create(
+            "techie", len(self.farmers), pop.techies, Region.BENGALURU, params.techie_cash,
+            {Resource.CODE: 0, Resource.IDLI_SET: 0, Resource.ARTISAN_COFFEE: 0},
+        )
+        self.darshinis = AgentBlock.create(
+            "darshini", len(self.farmers) + pop.techies, pop.darshinis, Region.BENGALURU, params.darshini_cash,
+            {Resource.IDLI_SET: 0, Resource.RICE: 10, Resource.COMMERCIAL_COFFEE: 5},
+        )
+        self.sold = np.zeros(N_RESOURCES, dtype=np.float64)
+        self.bought = np.zeros(N_RESOURCES, dtype=np.float64)
+        self.saving = np.zeros(pop.techies, dtype=bool)
+        # No per-agent objects in this engine
+        return []
+
+    @property
+    def blocks(self) -> List[AgentBlock]:
+        return [self.farmers, self.techies, self.darshinis]
+
+    def agent_columns(self) -> Dict[str, np.ndarray]:
+        columns = {}
+        for block in self.blocks:
+            for name in AGENT_COLUMNS:
+                columns[f"{block.kind}.{name}"] = getattr(block, name)
+        # Today's market flows and SAVING MODE flags, read by the stats and shards
+        columns.update({"market.sold": self.sold, "market.bought": self.bought, "techies.saving": self.saving})
+        return columns
+
+    def load_agent_columns(self, columns: Dict[str, np.ndarray]):
+        for block in self.blocks:
+            for name in AGENT_COLUMNS:
+                setattr(block, name, columns[f"{block.kind}.{name}"])
+        self.sold = columns["market.sold"]
+        self.bought = columns["market.bought"]
+        self.saving = columns["techies.saving"]
+
+    def kind_cash(self, kind: str) -> np.ndarray:
+        # A view: every kind lies inside one block (farmers, paddy growers and
+        # planters share the farmer block)
+        ids = self.kind_slices[kind]
+        for block in self.blocks:
+            if block.first_id <= ids.start and ids.stop <= block.first_id + len(block):
+                return block.cash[ids.start - block.first_id:ids.stop - block.first_id]
+        return np.empty(0)
+
+    def techie_saving(self) -> np.ndarray:
+        return self.saving
+
+    def describe_agent(self, agent_id: int) -> Tuple[str, Optional[Resource]]:
+        for block in self.blocks:
+            i = agent_id - block.first_id
+            if 0 <= i < len(block):
+                break
+        if block.kind == "farmer":
+            crop = list(Resource)[block.crop[i]]
+            pop = self.population
+            if i < pop.farmers:
+                return f"Raitha-{i}", crop
+            if i < pop.farmers + pop.rice_farmers:
+                return f"Paddy-{i - pop.farmers}", crop
+            return f"Planter-{i - pop.farmers - pop.rice_farmers}", crop
+        if block.kind == "techie":
+            return f"Dev-{i}", None
+        return f"Darshini-{i}", None
+
+    def run_agents(self):
+        # Units of each resource agents sold to / bought from the market today
+        self.sold = np.zeros(N_RESOURCES, dtype=np.float64)
+        self.bought = np.zeros(N_RESOURCES, dtype=np.float64)
+        prices = np.zeros(N_RESOURCES, dtype=np.float64)
+        for res, price in self.state.prices.items():
+            prices[RESOURCE_INDEX[res]] = price
+
+        profiler = self.profiler
+        for block, act in ((self.farmers, self._farmers_act),
+                           (self.techies, self._techies_act),
+                           (self.darshinis, self._darshinis_act)):
+            if profiler is None:
+                act(prices)
+            else:
+                profiler.time_agent_kind(block.kind, len(block), act, prices)
+
+        techies = self.techies
+        if len(techies) > 0:
+            # cumsum adds left to right like the object engine's loop, so the
+            # average is bit-identical (np.sum uses pairwise summation)
+            self.state.avg_techie_cash = float(np.cumsum(techies.cash)[-1]) / len(techies)
+
+    def _farmers_act(self, prices: np.ndarray):
+        b = self.farmers
+        if len(b) == 0:
+            return
+        cash, inv = b.cash, b.inventory
+        rows = np.arange(len(b))
+        crop = b.crop.astype(np.intp)
+        p = self.params
+
+        # Production Logic
+        weather = self.state.weather
+        yield_amt = p.yield_sunny if weather == "Sunny" else p.yield_normal
+        if weather == "Drought":
+            yield_amt = p.yield_drought
+        inv[rows, crop] += yield_amt
+
+        # Consumption (Eat Ragi), otherwise buy Ragi if hungry
+        has_ragi = inv[:, RAGI] > 0
+        inv[has_ragi, RAGI] -= 1
+        cost = prices[RAGI]
+        buys = ~has_ragi & (cash >= cost)
+        cash[buys] -= cost
+        inv[buys, RAGI] += 1
+        self.bought[RAGI] += np.count_nonzero(buys)
+
+        # Sell excess crop
+        to_sell = np.maximum(0, inv[rows, crop] - p.farmer_keep)
+        sells = to_sell > 0
+        cash[sells] += to_sell[sells] * prices[crop[sells]]
+        inv[rows[sells], crop[sells]] -= to_sell[sells]
+        self.sold += np.bincount(crop[sells], weights=to_sell[sells], minlength=N_RESOURCES)
+
+        if self.events is not None:
+            self.events.emit_many(b.ids, EventCode.HARVESTED, yield_amt)
+
+    def _darshinis_act(self, prices: np.ndarray):
+        b = self.darshinis
+        if len(b) == 0:
+            return
+        cash, inv = b.cash, b.inventory
+        p = self.params
+
+        # Restock: 10 Rice when below 5, 5 Coffee when below 2
+        cost = prices[RICE] * p.rice_lot
+        restock = (inv[:, RICE] < p.rice_restock_below) & (cash >= cost)
+        cash[restock] -= cost
+        inv[restock, RICE] += p.rice_lot
+        self.bought[RICE] += p.rice_lot * np.count_nonzero(restock)
+
+        cost = prices[COMMERCIAL_COFFEE] * p.beans_lot
+        restock = (inv[:, COMMERCIAL_COFFEE] < p.beans_restock_below) & (cash >= cost)
+        cash[restock] -= cost
+        inv[restock, COMMERCIAL_COFFEE] += p.beans_lot
+        self.bought[COMMERCIAL_COFFEE] += p.beans_lot * np.count_nonzero(restock)
+
+        # Production: 1 Rice + 0.2 Coffee -> 5 Idli Sets
+        cooks = (inv[:, RICE] >= 1) & (inv[:, COMMERCIAL_COFFEE] >= 0.2)
+        inv[cooks, RICE] -= 1
+        inv[cooks, COMMERCIAL_COFFEE] -= 0.2
+        inv[cooks, IDLI_SET] += p.idli_per_batch
+
+        if self.events is not None:
+            self.events.emit_many(b.ids, EventCode.COOKED, np.where(cooks, p.idli_per_batch, 0))
+
+    def _techies_act(self, prices: np.ndarray):
+        b = self.techies
+        if len(b) == 0:
+            return
+        cash, inv = b.cash, b.inventory
+        rent = self.state.rent
+
+        # Salary in, rent out (inelastic)
+        cash += self.params.salary
+        cash -= rent
+
+        # SURVIVAL: Idli Set
+        idli_price = prices[IDLI_SET]
+        fed = cash >= idli_price
+        cash[fed] -= idli_price
+        inv[fed, IDLI_SET] += 1
+        self.bought[IDLI_SET] += np.count_nonzero(fed)
+
+        # LUXURY: Artisan Coffee, only above the savings target
+        coffee_price = prices[ARTISAN_COFFEE]
+        sips = fed & (cash > self.params.savings_target) & (cash >= coffee_price)
+        self.saving = ~sips
+        cash[sips] -= coffee_price
+        inv[sips, ARTISAN_COFFEE] += 1
+        self.bought[ARTISAN_COFFEE] += np.count_nonzero(sips)
+
+        if self.events is not None:
+            codes = np.where(sips, EventCode.SIPPED_COFFEE, EventCode.SAVING_MODE)
+            self.events.emit_many(b.ids, codes, rent)
@@ -0,0 +1,244 @@
+"""Parameter sweeps over MarketParams with an on-disk result cache.
+
+    python -m caffeine_crash.sweep --grid salary=2500,3000,3500 --grid rent_hike_prob=0.01,0.02 --seeds 16
+    python -m caffeine_crash.sweep --lhs 40 --range savings_target=30000:70000 --range volatility=0.01:0.04
+    python -m caffeine_crash.sweep ... --out sweep.csv
+
+Every (parameters, seed, days) run is cached under --cache, keyed by the
+parameter hash, seed, horizon and a hash of the simulation code, so re-running
+a sweep only simulates points it has not seen, and editing the model
+invalidates old results automatically. Both engines give identical results,
+so they share the cache.
+
+Every point run with a given seed sees the same environment (weather, rent
+hikes, price noise; see simulation/environment.py), so differences between
+points come from the parameters alone rather than from luck.
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch import ENGINES, RunSummary, run_simulation
+from .simulation.models import MOODS
+from .simulation.params import MarketParams, DEFAULT_PARAMS
+
+DEFAULT_CACHE = ".sweep_cache"
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_FIELD_TYPES = {f.name: type(getattr(DEFAULT_PARAMS, f.name)) for f in fields(MarketParams)}
+
+
+def code_version() -> str:
+    """Hash of the simulation source; changes whenever the model code does."""
+    digest = hashlib.sha256()
+    sim_dir = os.path.join(_PACKAGE_DIR, "simulation")
+    paths = [os.path.join(sim_dir, name) for name in sorted(os.listdir(sim_dir)) if name.endswith(".py")]
+    paths.append(os.path.join(_PACKAGE_DIR, "batch.py"))
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _coerce(name: str, value) -> float:
+    if name not in _FIELD_TYPES or _FIELD_TYPES[name] not in (int, float):
+        raise ValueError(f"{name} is not a numeric MarketParams field")
+    if _FIELD_TYPES[name] is int:
+        return int(round(float(value)))
+    return float(value)
+
+
+def grid(axes: Dict[str, Sequence]) -> List[Dict[str, float]]:
+    """Every combination of the values on each axis."""
+    names = list(axes)
+    values = [[_coerce(name, v) for v in axes[name]] for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def latin_hypercube(n: int, ranges: Dict[str, Tuple[float, float]], seed: int = 0) -> List[Dict[str, float]]:
+    """`n` points with exactly one sample in each of n equal slices of every range."""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, (low, high) in ranges.items():
+        strata = (rng.permutation(n) + rng.random(n)) / n
+        columns[name] = low + strata * (high - low)
+    return [{name: _coerce(name, columns[name][i]) for name in ranges} for i in range(n)]
+
+
+class ResultCache:
+    """RunSummaries stored as one small .npz per (params, seed, days, code version)."""
+
+    def __init__(self, root: str = DEFAULT_CACHE, version: Optional[str] = None):
+        self.root = root
+        self.version = version or code_version()
+
+    def key(self, params: MarketParams, seed: int, days: int) -> str:
+        raw = f"{params.hash()}:{seed}:{days}:{self.version}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.npz")
+
+    def get(self, key: str) -> Optional[RunSummary]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return RunSummary(
+                seed=int(data["seed"]),
+                rent_history=data["rent_history"],
+                price_history=data["price_history"],
+                mood_counts=data["mood_counts"],
+                first_panic_day=int(data["first_panic_day"]),
+            )
+
+    def put(self, key: str, summary: RunSummary):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so an interrupted sweep never leaves a torn entry
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, seed=summary.seed, rent_history=summary.rent_history,
+                     price_history=summary.price_history, mood_counts=summary.mood_counts,
+                     first_panic_day=summary.first_panic_day)
+        os.replace(tmp, path)
+
+
+@dataclass
+class SweepResult:
+    point: Dict[str, float]   # the swept parameters of this run
+    seed: int
+    summary: RunSummary
+    cached: bool
+
+
+def _run_tasks(tasks: List[Tuple[int, MarketParams, int]], days: int, engine: str) -> List[Tuple[int, RunSummary]]:
+    return [(i, run_simulation(seed, days, engine, params=params)) for i, params, seed in tasks]
+
+
+def run_sweep(points: List[Dict[str, float]], seeds: Sequence[int], days: int,
+              engine: str = "object", workers: Optional[int] = None,
+              cache: Optional[ResultCache] = None, base: MarketParams = DEFAULT_PARAMS) -> List[SweepResult]:
+    """Run every point with every seed, reusing cached runs."""
+    runs = [(point, base.replace(**point), seed) for point in points for seed in seeds]
+    results: List[Optional[SweepResult]] = [None] * len(runs)
+
+    todo = []
+    for i, (point, params, seed) in enumerate(runs):
+        summary = cache.get(cache.key(params, seed, days)) if cache else None
+        if summary is not None:
+            results[i] = SweepResult(point, seed, summary, cached=True)
+        else:
+            todo.append((i, params, seed))
+
+    if todo:
+        workers = workers or os.cpu_count() or 1
+        chunk = max(1, len(todo) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_tasks, todo[j:j + chunk], days, engine)
+                       for j in range(0, len(todo), chunk)]
+            # Cache each chunk as it lands, so an interrupted sweep keeps its progress
+            for future in as_completed(futures):
+                for i, summary in future.result():
+                    point, params, seed = runs[i]
+                    if cache:
+                        cache.put(cache.key(params, seed, days), summary)
+                    results[i] = SweepResult(point, seed, summary, cached=False)
+    return results
+
+
+def summarize(results: List[SweepResult]) -> List[Dict[str, float]]:
+    """One row of outcome statistics per point, aggregated over its seeds."""
+    by_point: Dict[tuple, List[SweepResult]] = {}
+    for r in results:
+        by_point.setdefault(tuple(sorted(r.point.items())), []).append(r)
+
+    rows = []
+    for key, runs in by_point.items():
+        first_panic = np.array([r.summary.first_panic_day for r in runs])
+        panicked = first_panic >= 0
+        mood_days = np.sum([r.summary.mood_counts for r in runs], axis=0)
+        row = dict(key)
+        row.update({
+            "seeds": len(runs),
+            "panic_rate": float(panicked.mean()),
+            "first_panic_median": float(np.median(first_panic[panicked])) if panicked.any() else float("nan"),
+            "final_rent_mean": float(np.mean([r.summary.rent_history[-1] for r in runs])),
+        })
+        for mood, count in zip(MOODS, mood_days):
+            row[f"{mood.lower()}_share"] = float(count / max(mood_days.sum(), 1))
+        rows.append(row)
+    return rows
+
+
+def _parse_axis(text: str) -> Tuple[str, List[str]]:
+    name, _, values = text.partition("=")
+    return name, values.split(",")
+
+
+def _parse_range(text: str) -> Tuple[str, Tuple[float, float]]:
+    name, _, bounds = text.partition("=")
+    low, _, high = bounds.partition(":")
+    return name, (float(low), float(high))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep MarketParams with cached, parallel runs.")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="grid axis, repeat for more axes")
+    parser.add_argument("--lhs", type=int, metavar="N", help="Latin-hypercube design of N points over the --range axes")
+    parser.add_argument("--range", action="append", default=[], metavar="NAME=LOW:HIGH")
+    parser.add_argument("--seeds", type=int, default=8, help="seeds per point")
+    parser.add_argument("--seed", type=int, default=0, help="first seed (also seeds the LHS design)")
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="object")
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help=f"cache directory (default {DEFAULT_CACHE})")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--out", help="write one row per point to this CSV")
+    args = parser.parse_args()
+
+    if args.lhs:
+        if not args.range:
+            parser.error("--lhs needs at least one --range")
+        points = latin_hypercube(args.lhs, dict(map(_parse_range, args.range)), seed=args.seed)
+    elif args.grid:
+        points = grid(dict(map(_parse_axis, args.grid)))
+    else:
+        parser.error("give --grid axes or --lhs N with --range axes")
+
+    cache = None if args.no_cache else ResultCache(args.cache)
+    seeds = range(args.seed, args.seed + args.seeds)
+    start = time.perf_counter()
+    results = run_sweep(points, seeds, args.days, args.engine, args.workers, cache)
+    elapsed = time.perf_counter() - start
+
+    cached = sum(r.cached for r in results)
+    print(f"{len(points)} points x {len(seeds)} seeds x {args.days} days in {elapsed:.2f}s "
+          f"({cached} of {len(results)} runs from cache)")
+    rows = summarize(results)
+    names = list(points[0])
+    print()
+    print("".join(f"{n:>16}" for n in names) + f"{'panic':>8}{'1st panic':>11}{'final rent':>12}")
+    for row in rows:
+        print("".join(f"{row[n]:>16g}" for n in names)
+              + f"{row['panic_rate']:>8.0%}{row['first_panic_median']:>11.0f}{row['final_rent_mean']:>12.0f}")
+
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nSaved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
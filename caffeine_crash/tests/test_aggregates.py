@@ -0,0 +1,58 @@
+"""Population statistics agree with the agents they summarise, on every engine."""
+import numpy as np
+import pytest
+
+from caffeine_crash.simulation.aggregates import KindStats
+from caffeine_crash.simulation.clearing import ClearingMarketEngine
+from caffeine_crash.simulation.engine import MarketEngine
+from caffeine_crash.simulation.events import EventCode
+from caffeine_crash.simulation.models import Population
+from caffeine_crash.simulation.vectorized import VectorizedMarketEngine
+
+ENGINES = [MarketEngine, VectorizedMarketEngine, ClearingMarketEngine]
+
+
+@pytest.mark.parametrize("engine_cls", ENGINES, ids=lambda cls: cls.__name__)
+def test_saving_share_follows_todays_saving_mode_events(engine_cls):
+    engine = engine_cls(seed=0)
+    techies = engine.kind_slices["techie"]
+    shares = set()
+    for _ in range(250):
+        engine.step()
+        # What each techie did today, as told by its own event
+        saving = np.zeros(techies.stop - techies.start, dtype=bool)
+        for day, agent_id, code, _ in engine.events:
+            if day == engine.day and techies.start <= agent_id < techies.stop:
+                saving[agent_id - techies.start] = code == EventCode.SAVING_MODE
+        assert np.array_equal(engine.techie_saving(), saving)
+        share = engine.population_stats()["techie"].saving_share
+        assert share == np.count_nonzero(saving) / len(saving)
+        shares.add(share)
+    assert len(shares) > 1
+
+
+@pytest.mark.parametrize("engine_cls", ENGINES, ids=lambda cls: cls.__name__)
+def test_cash_quantiles_are_within_one_percent(engine_cls):
+    engine = engine_cls(seed=3, population=Population().scaled(40))
+    for _ in range(120):
+        engine.step()
+    stats = engine.population_stats()
+    for kind in engine.kind_slices:
+        cash = engine.kind_cash(kind)
+        if len(cash) == 0:
+            continue
+        assert stats[kind].count == len(cash)
+        assert stats[kind].mean == pytest.approx(cash.mean())
+        for q, value in ((0.1, stats[kind].p10), (0.5, stats[kind].p50), (0.9, stats[kind].p90)):
+            assert value == pytest.approx(np.quantile(cash, q, method="inverted_cdf"), rel=0.01), (kind, q)
+        assert stats[kind].p50 == pytest.approx(np.median(cash), rel=0.01)
+
+
+def test_sketch_quantiles_on_a_spread_of_cash():
+    # Agents of one kind move in step in these engines, so check the sketch on real spread too
+    cash = np.random.default_rng(0).lognormal(mean=10, sigma=1.5, size=100_001)
+    cash[:1000] *= -1  # a few agents in debt
+    stats = KindStats.from_cash("techie", cash)
+    assert stats.p50 == pytest.approx(np.median(cash), rel=0.01)
+    assert stats.p10 == pytest.approx(np.quantile(cash, 0.1), rel=0.01)
+    assert stats.p90 == pytest.approx(np.quantile(cash, 0.9), rel=0.01)
@@ -0,0 +1,13 @@
+"""The batch command line refuses runs it cannot report on."""
+import pytest
+
+from caffeine_crash.batch import main
+
+
+@pytest.mark.parametrize("runs", ["0", "-3"])
+def test_rejects_fewer_than_one_run(runs, monkeypatch, capsys):
+    monkeypatch.setattr("sys.argv", ["batch", "--runs", runs, "--days", "5"])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 2
+    assert "--runs must be at least 1" in capsys.readouterr().err
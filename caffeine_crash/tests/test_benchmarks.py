@@ -0,0 +1,17 @@
+"""Every benchmark case sets up and runs; a case that raises breaks the whole suite run."""
+import pytest
+
+from caffeine_crash.benchmarks.suite import all_cases
+from caffeine_crash.simulation.engine import MarketEngine
+
+
+def test_update_prices_before_the_first_step():
+    engine = MarketEngine(seed=0)
+    before = dict(engine.state.prices)
+    engine.update_prices()
+    assert engine.state.prices != before
+
+
+@pytest.mark.parametrize("case", all_cases(), ids=lambda case: case.name)
+def test_case_runs(case):
+    case.setup()()
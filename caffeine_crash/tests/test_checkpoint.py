@@ -0,0 +1,42 @@
+"""A restored engine reports and continues exactly like the one saved."""
+import numpy as np
+import pytest
+
+from caffeine_crash.simulation.checkpoint import load_checkpoint, save_checkpoint
+from caffeine_crash.simulation.engine import MarketEngine
+from caffeine_crash.simulation.vectorized import VectorizedMarketEngine
+
+
+@pytest.mark.parametrize("engine_cls", [MarketEngine, VectorizedMarketEngine])
+def test_restore_keeps_todays_stats_and_continues(engine_cls, tmp_path):
+    engine = engine_cls(seed=5)
+    for _ in range(150):
+        engine.step()
+    assert engine.techie_saving().any()  # a day the default flags would get wrong
+    path = tmp_path / "run.ckpt"
+    save_checkpoint(engine, str(path))
+    restored = load_checkpoint(str(path))
+
+    assert restored.population_stats() == engine.population_stats()
+    assert np.array_equal(restored.techie_saving(), engine.techie_saving())
+    assert restored.logs == engine.logs
+    assert restored.events.emitted == engine.events.emitted
+    if engine_cls is VectorizedMarketEngine:
+        assert np.array_equal(restored.sold, engine.sold)
+        assert np.array_equal(restored.bought, engine.bought)
+
+    for _ in range(50):
+        engine.step()
+        restored.step()
+        assert restored.logs == engine.logs
+    assert restored.state.prices == engine.state.prices
+    assert restored.population_stats() == engine.population_stats()
+
+
+def test_restore_without_events(tmp_path):
+    engine = VectorizedMarketEngine(seed=2, capture_events=False)
+    engine.step()
+    path = tmp_path / "quiet.ckpt"
+    save_checkpoint(engine, str(path))
+    restored = load_checkpoint(str(path))
+    assert restored.events is None and restored.logs == []
@@ -0,0 +1,28 @@
+"""Order-book engine: agents never bid for more than they can pay."""
+import numpy as np
+
+from caffeine_crash.simulation.clearing import CLEARED, ClearingMarketEngine, OrderBook
+from caffeine_crash.simulation.models import Population, Resource
+from caffeine_crash.simulation.vectorized import COMMERCIAL_COFFEE, RICE
+
+
+def test_darshini_restock_bids_fit_their_cash_together():
+    engine = ClearingMarketEngine(seed=0, population=Population(darshinis=400))
+    engine.step()
+    b = engine.darshinis
+    # Out of rice and beans, with anything from nothing to plenty of cash
+    b.inventory[:, RICE] = 0
+    b.inventory[:, COMMERCIAL_COFFEE] = 0
+    b.cash[:] = np.linspace(0, 4000, len(b))
+    books = {res: OrderBook(res) for res in CLEARED}
+    engine._darshinis_orders(books)
+
+    committed = np.zeros(len(b))
+    for res in (Resource.RICE, Resource.COMMERCIAL_COFFEE):
+        prices, quantities, ids = books[res]._join(books[res]._bids)
+        np.add.at(committed, ids - b.first_id, prices * quantities)
+    assert np.all(committed <= b.cash)
+    # Some could afford one lot but not both, and bid for rice only
+    bids = {res: set(books[res]._join(books[res]._bids)[2].tolist())
+            for res in (Resource.RICE, Resource.COMMERCIAL_COFFEE)}
+    assert bids[Resource.RICE] - bids[Resource.COMMERCIAL_COFFEE]
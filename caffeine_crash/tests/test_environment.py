@@ -0,0 +1,31 @@
+"""EnvironmentSchedule keeps a bounded cache and regenerates identical blocks."""
+from caffeine_crash.simulation.environment import CACHED_BLOCKS, EnvironmentSchedule
+
+
+def test_cache_holds_at_most_the_current_and_next_block():
+    env = EnvironmentSchedule(seed=3, block_days=30)
+    first = env.day(1)
+    for day in range(1, 30 * 20):
+        env.day(day)
+    assert len(env._arrays) <= CACHED_BLOCKS
+    assert len(env._days) <= CACHED_BLOCKS
+    assert env.day(1) == first
+
+
+def test_draw_rows_are_evicted_with_their_block():
+    env = EnvironmentSchedule(seed=3, block_days=30)
+    layout = (("weather", None), ("change", 0), ("code_shock", None))
+    first = env.draws(layout, 1)
+    for day in range(1, 30 * 20):
+        env.draws(layout, day)
+    assert {index for _, index in env._draws} <= set(env._arrays)
+    assert env.draws(layout, 1) == first
+
+
+def test_evicted_blocks_regenerate_the_same_window():
+    env = EnvironmentSchedule(seed=3, block_days=30)
+    window = env.window(20, 100)
+    for day in range(1, 30 * 10):
+        env.day(day)
+    again = env.window(20, 100)
+    assert all((window[name] == again[name]).all() for name in window)
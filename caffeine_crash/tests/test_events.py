@@ -0,0 +1,30 @@
+"""EventLog keeps and shows events the way the baseline engine's logs did."""
+import numpy as np
+
+from caffeine_crash.simulation.events import EventCode, EventLog
+
+
+def make_log(capacity: int = 5) -> EventLog:
+    return EventLog(lambda agent_id: (f"Darshini-{agent_id}", None), capacity=capacity)
+
+
+def test_recent_is_newest_day_first_in_agent_order():
+    log = make_log()
+    for day in (1, 2):
+        log.day = day
+        for agent_id in range(3):
+            log.emit(agent_id, EventCode.COOKED, day)
+    assert log.recent(5) == [
+        "Darshini-0 cooked 2 Idli Sets.", "Darshini-1 cooked 2 Idli Sets.", "Darshini-2 cooked 2 Idli Sets.",
+        "Darshini-0 cooked 1 Idli Sets.", "Darshini-1 cooked 1 Idli Sets.",
+    ]
+
+
+def test_keeps_each_days_first_events_and_drops_covered_days():
+    log = make_log(capacity=3)
+    for day in (1, 2, 3):
+        log.day = day
+        log.emit_many(np.arange(10), EventCode.COOKED, day)
+    assert log.emitted == 30
+    assert [event[:2] for event in log] == [(2, 0), (2, 1), (2, 2), (3, 0), (3, 1), (3, 2)]
+    assert log.recent(2) == ["Darshini-0 cooked 3 Idli Sets.", "Darshini-1 cooked 3 Idli Sets."]
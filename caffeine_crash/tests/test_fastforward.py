@@ -0,0 +1,33 @@
+"""Fast-forwarding suspends logs and history, then puts them back as they were."""
+import pytest
+
+from caffeine_crash.simulation.engine import MarketEngine
+from caffeine_crash.simulation.fastforward import advance, rent_above, run_until
+
+
+@pytest.mark.parametrize("record_history", [True, False])
+def test_advance_restores_history_recording(record_history):
+    engine = MarketEngine(seed=0)
+    engine.record_history = record_history
+    advance(engine, 30)
+    assert engine.record_history is record_history
+    assert engine.events is not None and engine.events.day == engine.day
+
+
+def test_advance_lands_where_stepping_does():
+    stepped, advanced = MarketEngine(seed=6), MarketEngine(seed=6)
+    for _ in range(90):
+        stepped.step()
+    advance(advanced, 90)
+    assert advanced.day == stepped.day
+    assert advanced.state.prices == stepped.state.prices
+    assert advanced.state.market_mood == stepped.state.market_mood
+    assert advanced.state.avg_techie_cash == stepped.state.avg_techie_cash
+
+
+def test_price_only_conditions_skip_the_agent_phases():
+    engine = MarketEngine(seed=6)
+    cash = engine.state.avg_techie_cash
+    result = run_until(engine, rent_above(10 ** 9), max_days=60)
+    assert result.agents_skipped and result.hit_day is None
+    assert engine.state.avg_techie_cash == cash
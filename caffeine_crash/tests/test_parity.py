@@ -0,0 +1,200 @@
+"""Seeded runs are pinned, and every engine produces the same runs.
+
+The object MarketEngine is the reference: its price, rent, mood, techie
+cash and log histories over DAYS days are pinned by digest for a few seeds
+and populations, and VectorizedMarketEngine must reproduce every one of
+them exactly. So must every EnsembleEngine member, params mixed so that
+some share a price-rule table and some do not. If a change moves the
+pinned histories on purpose, rerun
+
+    python -m caffeine_crash.tests.test_parity
+
+and paste the printed PINNED table over the one below.
+"""
+import hashlib
+from functools import lru_cache
+from typing import Dict
+
+import numpy as np
+import pytest
+
+from caffeine_crash.simulation.engine import MarketEngine
+from caffeine_crash.simulation.ensemble import EnsembleEngine
+from caffeine_crash.simulation.models import MOODS, RESOURCE_INDEX, WEATHERS, Population
+from caffeine_crash.simulation.params import DEFAULT_PARAMS
+from caffeine_crash.simulation.vectorized import VectorizedMarketEngine
+
+DAYS = 1000
+SEEDS = (0, 1, 7)
+POPULATIONS = {
+    "default": Population(),
+    "paddy": Population(rice_farmers=4),
+    "crowded": Population(farmers=50, planters=7, techies=200, darshinis=10, rice_farmers=3),
+}
+SERIES = ("prices", "rent", "mood", "avg_techie_cash", "logs")
+
+PINNED: Dict[str, Dict[str, str]] = {
+    "default-0": {
+        "prices": "f432245fdebc4137",
+        "rent": "c65fe06fc6922e1a",
+        "mood": "cfa48d070a306119",
+        "avg_techie_cash": "0c34cae1506be62d",
+        "logs": "f5ec2bdd34039184",
+    },
+    "default-1": {
+        "prices": "ec1bd4558a3bfe9a",
+        "rent": "bd42f4f96528ba6b",
+        "mood": "fbc5fc34d811d84e",
+        "avg_techie_cash": "077f58b24fbc5203",
+        "logs": "e2b405ae91cb0800",
+    },
+    "default-7": {
+        "prices": "c9c80a034a07c286",
+        "rent": "f6e64ade639a8481",
+        "mood": "a695bab04b797c37",
+        "avg_techie_cash": "13e2726aa8f82a1d",
+        "logs": "674ddf9fe1b278a3",
+    },
+    "paddy-0": {
+        "prices": "f432245fdebc4137",
+        "rent": "c65fe06fc6922e1a",
+        "mood": "cfa48d070a306119",
+        "avg_techie_cash": "0c34cae1506be62d",
+        "logs": "0d06aa54e2bc1d92",
+    },
+    "paddy-1": {
+        "prices": "ec1bd4558a3bfe9a",
+        "rent": "bd42f4f96528ba6b",
+        "mood": "fbc5fc34d811d84e",
+        "avg_techie_cash": "077f58b24fbc5203",
+        "logs": "3985330ada74753d",
+    },
+    "paddy-7": {
+        "prices": "c9c80a034a07c286",
+        "rent": "f6e64ade639a8481",
+        "mood": "a695bab04b797c37",
+        "avg_techie_cash": "13e2726aa8f82a1d",
+        "logs": "3f3bede5cfa1ada9",
+    },
+    "crowded-0": {
+        "prices": "f432245fdebc4137",
+        "rent": "c65fe06fc6922e1a",
+        "mood": "cfa48d070a306119",
+        "avg_techie_cash": "f9633f9cc9da62c3",
+        "logs": "01c37f752c734e2a",
+    },
+    "crowded-1": {
+        "prices": "ec1bd4558a3bfe9a",
+        "rent": "bd42f4f96528ba6b",
+        "mood": "fbc5fc34d811d84e",
+        "avg_techie_cash": "e6a16e45f7736417",
+        "logs": "0f4ce1ebc8f3679f",
+    },
+    "crowded-7": {
+        "prices": "c9c80a034a07c286",
+        "rent": "f6e64ade639a8481",
+        "mood": "a695bab04b797c37",
+        "avg_techie_cash": "4af4036e5e5db3e0",
+        "logs": "47ab3c740892ab06",
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def run(engine_cls, seed: int, population: str) -> Dict[str, np.ndarray]:
+    """Daily histories of a seeded run, logs as one row of text per day."""
+    engine = engine_cls(seed=seed, population=POPULATIONS[population])
+    resources = list(engine.state.prices)
+    prices = np.empty((DAYS, len(resources)))
+    rent, cash = np.empty(DAYS), np.empty(DAYS)
+    mood = np.empty(DAYS, dtype=np.int8)
+    logs = []
+    for day in range(DAYS):
+        engine.step()
+        state = engine.state
+        prices[day] = [state.prices[res] for res in resources]
+        rent[day] = state.rent
+        cash[day] = state.avg_techie_cash
+        mood[day] = MOODS.index(state.market_mood)
+        logs.append("\n".join(engine.logs))
+    return {"prices": prices, "rent": rent, "mood": mood, "avg_techie_cash": cash, "logs": np.array(logs)}
+
+
+def digest(values: np.ndarray) -> str:
+    data = "\0".join(values.tolist()).encode() if values.dtype.kind == "U" else values.tobytes()
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+CASES = [(seed, population) for population in POPULATIONS for seed in SEEDS]
+
+
+@pytest.mark.parametrize("seed,population", CASES)
+def test_object_engine_histories_are_pinned(seed, population):
+    histories = run(MarketEngine, seed, population)
+    assert {name: digest(histories[name]) for name in SERIES} == PINNED[f"{population}-{seed}"]
+
+
+@pytest.mark.parametrize("seed,population", CASES)
+def test_vectorized_engine_matches_object_engine(seed, population):
+    expected = run(MarketEngine, seed, population)
+    actual = run(VectorizedMarketEngine, seed, population)
+    for name in SERIES:
+        assert np.array_equal(actual[name], expected[name]), name
+
+
+# Members whose price-rule tables differ (volatility) each take their own
+# pass; the rest (rent hikes, yields, salary) share the default table's
+ENSEMBLE_PARAMS = [
+    DEFAULT_PARAMS,
+    DEFAULT_PARAMS.replace(volatility=0.05),
+    DEFAULT_PARAMS.replace(rent_hikes=(50, 1000)),
+    DEFAULT_PARAMS.replace(yield_sunny=14, yield_normal=3, yield_drought=0),
+    DEFAULT_PARAMS.replace(volatility=0.01, rent_hike_prob=0.05, salary=DEFAULT_PARAMS.salary * 2),
+    DEFAULT_PARAMS,
+]
+
+
+@pytest.mark.parametrize("population", ["default", "paddy"])
+def test_ensemble_members_match_object_engines(population):
+    ensemble = EnsembleEngine.spawn(len(ENSEMBLE_PARAMS), seed=11, params=ENSEMBLE_PARAMS,
+                                    population=POPULATIONS[population])
+    engines = [MarketEngine(streams=streams, params=params, population=POPULATIONS[population])
+               for streams, params in zip(ensemble.streams, ENSEMBLE_PARAMS)]
+    columns = [RESOURCE_INDEX[res] for res in engines[0].state.prices]
+    shape = (DAYS, len(engines))
+    expected = {name: np.empty(shape) for name in ("rent", "avg_techie_cash", "mood", "weather")}
+    actual = {name: np.empty(shape) for name in expected}
+    expected_prices, actual_prices = np.empty(shape + (len(columns),)), np.empty(shape + (len(columns),))
+    for day in range(DAYS):
+        ensemble.step()
+        actual_prices[day] = ensemble.prices[:, columns]
+        actual["rent"][day] = ensemble.rent
+        actual["avg_techie_cash"][day] = ensemble.avg_techie_cash
+        actual["mood"][day] = ensemble.mood
+        actual["weather"][day] = ensemble.weather
+        for k, engine in enumerate(engines):
+            engine.step()
+            state = engine.state
+            expected_prices[day, k] = list(state.prices.values())
+            expected["rent"][day, k] = state.rent
+            expected["avg_techie_cash"][day, k] = state.avg_techie_cash
+            expected["mood"][day, k] = MOODS.index(state.market_mood)
+            expected["weather"][day, k] = WEATHERS.index(state.weather)
+    assert np.array_equal(actual_prices, expected_prices)
+    for name in expected:
+        assert np.array_equal(actual[name], expected[name]), name
+    for k, engine in enumerate(engines):
+        assert ensemble.headline_of(k) == engine.state.headline
+    # Both paths ran: several rule tables, and a table shared by several members
+    assert 1 < len(ensemble._groups) < len(engines)
+
+
+if __name__ == "__main__":
+    print("PINNED: Dict[str, Dict[str, str]] = {")
+    for seed, population in CASES:
+        histories = run(MarketEngine, seed, population)
+        print(f'    "{population}-{seed}": {{')
+        for name in SERIES:
+            print(f'        "{name}": "{digest(histories[name])}",')
+        print("    },")
+    print("}")
@@ -0,0 +1,16 @@
+"""A profiled run is the same run, timed phase by phase."""
+from caffeine_crash.simulation.engine import STEP_PHASES, MarketEngine
+from caffeine_crash.simulation.profiling import PHASES, StepProfiler
+
+
+def test_profiled_steps_run_every_phase_of_step():
+    plain, profiled = MarketEngine(seed=4), MarketEngine(seed=4)
+    profiled.profiler = StepProfiler()
+    for _ in range(60):
+        plain.step()
+        profiled.step()
+    assert profiled.state.prices == plain.state.prices
+    assert profiled.logs == plain.logs
+    assert PHASES == tuple(name for name, _ in STEP_PHASES)
+    assert set(profiled.profiler.phase_ns) == set(PHASES)
+    assert profiled.profiler.steps == 60
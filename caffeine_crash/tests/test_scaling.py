@@ -0,0 +1,16 @@
+"""The scaling benchmark's own parity check, at the size it runs it."""
+import pytest
+
+from caffeine_crash.benchmarks.scaling import check_parity, main, population_for
+
+
+def test_check_parity_at_1k_agents():
+    assert check_parity(population_for(1_000), days=365)
+
+
+def test_main_exits_non_zero_on_mismatch(monkeypatch):
+    monkeypatch.setattr("caffeine_crash.benchmarks.scaling.check_parity", lambda *a, **k: False)
+    monkeypatch.setattr("sys.argv", ["scaling", "--sizes", "16", "--days", "1"])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code != 0
@@ -0,0 +1,50 @@
+"""StateStreamServer shuts down cleanly and encodes frames per snapshot."""
+import asyncio
+import dataclasses
+from types import SimpleNamespace
+
+from caffeine_crash.server import StateStreamServer
+from caffeine_crash.simulation.delta import STREAM_MAGIC, MarketView, encode_frame, read_frame
+from caffeine_crash.simulation.engine import MarketEngine
+from caffeine_crash.simulation.runner import Snapshot
+
+
+def snapshot(days: int = 3) -> Snapshot:
+    engine = MarketEngine(seed=1)
+    for _ in range(days):
+        engine.step()
+    return Snapshot.capture(engine)
+
+
+def test_stop_cancels_connected_viewers_quietly():
+    errors = []
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        server = StateStreamServer(SimpleNamespace(snapshot=snapshot()), port=0)
+        await server.start()
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        assert await reader.readexactly(len(STREAM_MAGIC)) == STREAM_MAGIC
+        view = MarketView()
+        view.apply(await read_frame(reader))
+        assert server.viewers == 1
+
+        await server.stop()
+        assert server.viewers == 0 and not server._handlers
+        assert await reader.read() == b""
+        writer.close()
+
+    asyncio.run(scenario())
+    assert errors == []
+
+
+def test_frames_are_cached_per_snapshot_not_per_day():
+    first = snapshot()
+    # Same day, different market: what a replay seek or pause can produce
+    other = dataclasses.replace(first, rent=first.rent + 100, market_mood="Panic")
+    server = StateStreamServer(SimpleNamespace(snapshot=first))
+    server.latest = dataclasses.replace(first, rent=first.rent + 50)
+
+    assert server._frame(first) == encode_frame(server.latest, first)
+    assert server._frame(other) == encode_frame(server.latest, other)
+    assert server._frame(first) != server._frame(other)
@@ -0,0 +1,29 @@
+"""A shard that dies takes the run down with it instead of hanging it."""
+import multiprocessing as mp
+
+import pytest
+
+from caffeine_crash.simulation.models import Region
+from caffeine_crash.simulation.sharded import RegionalEngine, ShardError, ShardedSimulation
+
+
+def test_short_run_returns_every_region():
+    results = ShardedSimulation(seed=1).run(30)
+    assert set(results) == set(Region)
+    assert all(len(result.rent) == 30 for result in results.values())
+
+
+@pytest.mark.skipif(mp.get_start_method() != "fork", reason="patches the engine inherited by forked shards")
+def test_failing_shard_raises_instead_of_hanging(monkeypatch):
+    apply_trade = RegionalEngine.apply_trade
+
+    def flaky(self, shortage, reference):
+        if self.region is Region.COORG and self.day == 10:
+            raise RuntimeError("shard crashed")
+        apply_trade(self, shortage, reference)
+
+    monkeypatch.setattr(RegionalEngine, "apply_trade", flaky)
+    # The shard's barrier.abort() releases the others at once; the barrier
+    # timeout only bounds the run if that ever broke
+    with pytest.raises(ShardError, match="exit code 1"):
+        ShardedSimulation(seed=1, timeout=5).run(100)
@@ -1,16 +1,45 @@
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
 from textual.app import App, ComposeResult
 from textual.containers import Container
-from textual.widgets import Footer, Static, Log, Label
+from textual.widgets import Footer, Static, Log, Label, Input
 from textual.reactive import reactive
 from textual.binding import Binding
 
-import plotext as plt
 from rich.text import Text
 from rich.panel import Panel
 from rich.align import Align
+from rich.table import Table
 
 from ..simulation.engine import MarketEngine
+from ..simulation.export import TraceWriter
+from ..simulation.profiling import StepProfiler, PHASES
 from ..simulation.models import Resource
+from ..simulation.recording import Recorder, Recording, ReplayRunner
+from ..simulation.runner import SimulationRunner, REALTIME, format_speed
+from ..server import StateStreamServer
+from .plotting import build_chart
+
+FRAME_INTERVAL = 0.1   # stats, news and log redraw at 10 fps
+CHART_INTERVAL = 0.25  # chart rebuilds are heavier, 4 fps is plenty
+LOG_LINES_PER_FRAME = 20  # newest events drawn per frame, about a day's worth
+LOG_MAX_LINES = 500    # older activity scrolls out of the log
+
+# Price label colours per resource
+PRICE_COLORS = {
+    Resource.COMMERCIAL_COFFEE: "sandybrown",
+    Resource.ARTISAN_COFFEE: "magenta",
+    Resource.RAGI: "wheat",
+    Resource.RICE: "white",
+    Resource.IDLI_SET: "white",
+    Resource.CODE: "springgreen"
+}
+MOOD_COLORS = {"Optimistic": "green", "Anxious": "yellow"}
+
+# Speeds the +/- keys step through (days per second, None = as fast as possible)
+SPEED_STEPS = (REALTIME, 10.0, 30.0, 100.0, 365.0, None)
 
 class TitleBanner(Static):
     """A stylish title banner."""
@@ -18,14 +47,23 @@ class TitleBanner(Static):
         return Align.center(Text("CAFFEINE CRASH: BENGALURU EDITION 📉", style="bold gold1"), vertical="middle")
 
 class PriceChart(Static):
-    """A widget to display a single price chart using plotext."""
+    """A widget to display a single price chart using plotext.
+
+    Builds are cached on (history, history version, widget size), long
+    series are downsampled to the chart's width with LTTB, and plotext runs
+    in a worker thread so the event loop never waits on it. `lock` guards
+    the history while it is copied (the simulation runs on another thread).
+    """
     
-    def __init__(self, label: str, color: str, get_data_func, **kwargs):
+    def __init__(self, label: str, color: str, get_history_func, lock=None, **kwargs):
         super().__init__(**kwargs)
         self.label = label
         self.color = color
-        self.get_data_func = get_data_func
+        self.get_history_func = get_history_func
+        self.lock = lock if lock is not None else nullcontext()
         self.interval_handle = None
+        self._rendered_key = None
+        self._building = False
 
     def on_mount(self):
         # Don't start interval immediately - wait for app to signal it's ready
@@ -34,7 +72,7 @@ class PriceChart(Static):
     def start_updates(self):
         """Start the chart update interval."""
         if self.interval_handle is None:
-            self.interval_handle = self.app.set_interval(0.5, self.update_chart)
+            self.interval_handle = self.app.set_interval(CHART_INTERVAL, self.update_chart)
 
     def on_resize(self, event):
         self.update_chart()
@@ -43,32 +81,35 @@ class PriceChart(Static):
         # Prevent updates if app is paused (e.g. disclaimer is open)
         if getattr(self.app, "paused", False):
             return
-
-        # 1. Clear State (Crucial for Plotext in loops)
-        plt.clf()
-        plt.clear_data()
-        plt.clear_figure()
-        
-        # 2. Get Data
-        data = self.get_data_func()
-        if not data:
+        # A build is still running; the next tick picks up whatever is newest
+        if self._building:
             return
-            
-        # 3. Size Check
+
+        # 1. Size Check
         width, height = self.content_size
         if width <= 0 or height <= 0:
             return
-            
-        # 4. Plot
-        plt.plotsize(width, height)
-        plt.theme("pro") 
-        plt.title(self.label)
-        plt.plot(data, color=self.color, marker=None)
-        plt.frame(True)
-        plt.grid(True, True)
 
-        # 5. Render
-        self.update(Text.from_ansi(plt.build()))
+        # 2. Cache Check: nothing to do if neither data nor size changed
+        with self.lock:
+            history = self.get_history_func()
+            key = (id(history), history.version, width, height)
+            if key == self._rendered_key or len(history) == 0:
+                return
+            # 3. Snapshot the data here, build in a thread
+            data = history.last()
+        self._building = True
+        self.run_worker(lambda: self._build(key, data, width, height), thread=True, group="chart")
+
+    def _build(self, key, data, width: int, height: int):
+        canvas = build_chart(self.label, self.color, data, width, height)
+        self.app.call_from_thread(self._finish, key, Text.from_ansi(canvas))
+
+    def _finish(self, key, rendered):
+        # 4. Render (back on the event loop)
+        self._building = False
+        self._rendered_key = key
+        self.update(rendered)
 
 class NewsTicker(Static):
     """Displays the latest market news."""
@@ -84,7 +125,11 @@ class NewsTicker(Static):
         )
 
 class MarketStats(Static):
-    """Displays current market stats."""
+    """Displays current market stats.
+
+    Labels are kept by reference and only updated when their text changes,
+    so a frame where little moved costs little to draw.
+    """
     
     current_weather = reactive("Sunny")
     current_date = reactive("Jan 01")
@@ -92,20 +137,36 @@ class MarketStats(Static):
     market_mood = reactive("Stable")
     
     def compose(self) -> ComposeResult:
+        self.labels: Dict[str, Label] = {}
+        self._shown: Dict[str, str] = {}
         yield Label("ECONOMIC INDICATORS", id="stats-header")
-        yield Label(f"Date: {self.current_date}", id="date-label")
-        yield Label(f"Season: {self.current_season}", id="season-label")
-        yield Label(f"Weather: {self.current_weather}", id="weather-label")
+        yield self._label("date", f"Date: {self.current_date}")
+        yield self._label("season", f"Season: {self.current_season}")
+        yield self._label("weather", f"Weather: {self.current_weather}")
         yield Label(" ", id="spacer-1")
-        yield Label(f"Mood: {self.market_mood}", id="mood-label") 
+        yield self._label("mood", f"Mood: {self.market_mood}")
         yield Label(" ", id="spacer-2")
         yield Label("COMMODITY PRICES", id="prices-header")
         self.price_labels = {}
         for res in Resource:
             if res != Resource.INR:
                 lbl = Label(f"{res.value}: ₹0.00", classes="price-label")
-                self.price_labels[res] = lbl
+                self.price_labels[res] = self.labels[res.name] = lbl
                 yield lbl
+        yield Label(" ", id="spacer-3")
+        yield Label("TECHIE SAVINGS", id="population-header")
+        yield self._label("savings", "")
+        yield self._label("saving-mode", "")
+
+    def _label(self, name: str, text: str) -> Label:
+        label = self.labels[name] = Label(text, id=f"{name}-label")
+        return label
+
+    def _show(self, name: str, text: str):
+        # Label.update re-renders, so skip it when the text is unchanged
+        if self._shown.get(name) != text:
+            self._shown[name] = text
+            self.labels[name].update(text)
 
     def update_stats(self, state):
         self.current_date = state.date.strftime("%d %b %Y")
@@ -113,30 +174,48 @@ class MarketStats(Static):
         self.current_weather = state.weather
         self.market_mood = state.market_mood
         
-        self.query_one("#date-label", Label).update(f"DATE:    {self.current_date}")
-        self.query_one("#season-label", Label).update(f"SEASON:  {self.current_season}")
-        self.query_one("#weather-label", Label).update(f"WEATHER: {self.current_weather}")
-        
-        mood_color = "green" if self.market_mood == "Optimistic" else "yellow" if self.market_mood == "Anxious" else "red"
-        self.query_one("#mood-label", Label).update(f"MOOD:    [{mood_color}]{self.market_mood}[/]")
+        self._show("date", f"DATE:    {self.current_date}")
+        self._show("season", f"SEASON:  {self.current_season}")
+        self._show("weather", f"WEATHER: {self.current_weather}")
         
-        # Color Map for Resource Names
-        res_colors = {
-            Resource.COMMERCIAL_COFFEE: "sandybrown",
-            Resource.ARTISAN_COFFEE: "magenta",
-            Resource.RAGI: "wheat",
-            Resource.RICE: "white",
-            Resource.IDLI_SET: "white",
-            Resource.CODE: "springgreen"
-        }
+        mood_color = MOOD_COLORS.get(self.market_mood, "red")
+        self._show("mood", f"MOOD:    [{mood_color}]{self.market_mood}[/]")
 
         for res, price in state.prices.items():
             if res in self.price_labels:
-                name_color = res_colors.get(res, "white")
-                self.price_labels[res].update(f"[{name_color}]{res.value:<15}[/] ₹{price:7.2f}")
+                name_color = PRICE_COLORS.get(res, "white")
+                self._show(res.name, f"[{name_color}]{res.value:<15}[/] ₹{price:7.2f}")
 
+        # Distribution of techie cash, when the snapshot carries PopulationStats
+        population = getattr(state, "population", None)
+        if population is not None and "techie" in population:
+            techies = population["techie"]
+            self._show("savings", f"p10 ₹{techies.p10:,.0f}  p50 ₹{techies.p50:,.0f}  p90 ₹{techies.p90:,.0f}")
+            self._show("saving-mode", f"SAVING MODE: {techies.saving_share:.0%} of {techies.count:,}")
 
 
+class ProfilerPanel(Static):
+    """Overlay with live per-phase timings from the engine's StepProfiler."""
+
+    def show_report(self, report: dict):
+        table = Table(box=None, padding=(0, 1), expand=True)
+        table.add_column("Phase", style="bold")
+        table.add_column("µs/step", justify="right")
+        table.add_column("share", justify="right")
+        table.add_column("blocks", justify="right")
+        for phase in PHASES:
+            entry = report["phases"][phase]
+            table.add_row(phase, f"{entry['mean_us']:.1f}", f"{entry['share']:.0%}",
+                          f"{entry['net_blocks_per_step']:+.1f}")
+        for kind, entry in report["agents"].items():
+            table.add_row(f"  {kind}", f"{entry['mean_us_per_step']:.1f}",
+                          f"{entry['mean_us_per_agent']:.2f}/agent", "")
+        self.update(Panel(
+            table,
+            title=f"⏱ PROFILER · {report['steps']} steps · {report['step_mean_us']:.0f} µs/step",
+            border_style="cyan",
+        ))
+
 class NammaMarketApp(App):
     CSS = """
     Screen {
@@ -145,6 +224,7 @@ class NammaMarketApp(App):
         grid-columns: 2fr 2fr 1.2fr;
         grid-rows: 3 6fr 3fr;
         background: #1e1e1e;
+        layers: base overlay;
     }
 
     TitleBanner {
@@ -203,7 +283,7 @@ class NammaMarketApp(App):
         color: #f8f8f2;
     }
     
-    #stats-header, #prices-header {
+    #stats-header, #prices-header, #population-header {
         text-style: bold;
         color: #50fa7b;
         margin-bottom: 1;
@@ -219,58 +299,238 @@ class NammaMarketApp(App):
     .price-label {
         color: #f8f8f2;
     }
+
+    ProfilerPanel {
+        layer: overlay;
+        dock: right;
+        width: 56;
+        height: auto;
+        display: none;
+        background: #282a36;
+    }
+
+    #goto {
+        layer: overlay;
+        dock: bottom;
+    }
     """
     
     BINDINGS = [
         Binding("q", "quit", "Quit"),
         Binding("space", "toggle_pause", "Pause/Resume"),
+        Binding("p", "toggle_profiler", "Profiler"),
+        Binding("plus,equals_sign", "faster", "Faster"),
+        Binding("minus", "slower", "Slower"),
+        # Replay only (priority: the activity log would scroll on these keys)
+        Binding("left", "skip(-30)", "-1 month", priority=True),
+        Binding("right", "skip(30)", "+1 month", priority=True),
+        Binding("pageup", "skip(-365)", "-1 year", priority=True),
+        Binding("pagedown", "skip(365)", "+1 year", priority=True),
+        Binding("g", "goto", "Go to date"),
     ]
+    REPLAY_ACTIONS = ("skip", "goto")
 
-    def __init__(self):
+    def __init__(self, trace_path: Optional[str] = None, speed: Optional[float] = REALTIME,
+                 serve_port: Optional[int] = None, record_path: Optional[str] = None,
+                 replay_path: Optional[str] = None):
         super().__init__()
-        self.engine = MarketEngine()
         self.paused = False
+        self.trace = None
+        self.recorder = None
+        self.replaying = replay_path is not None
+        if self.replaying:
+            # No engine: snapshots and chart data come from the recording
+            self.engine = None
+            self.runner = ReplayRunner(Recording(replay_path), speed)
+        else:
+            self.engine = MarketEngine()
+            if trace_path:
+                self.trace = TraceWriter(trace_path)
+                self.engine.recorders.append(self.trace)
+            if record_path:
+                self.recorder = Recorder(record_path, self.engine)
+                self.engine.recorders.append(self.recorder)
+            # The engine steps on its own thread; the UI only draws its snapshots
+            self.runner = SimulationRunner(self.engine, speed, population=True, n_logs=LOG_LINES_PER_FRAME)
+        self._drawn_day = -1
+        self._drawn_headline = None
+        self._drawn_events = 0
+        # Optionally stream the same run to ui/viewer.py clients
+        self.stream_server = StateStreamServer(self.runner, port=serve_port) if serve_port is not None else None
 
     def compose(self) -> ComposeResult:
         yield TitleBanner()
         
         with Container(id="chart-grid"):
-            yield PriceChart("AVG RENT (₹)", "red", lambda: self.engine.state.rent_history)
-            yield PriceChart("Artisan Coffee", "magenta", lambda: self.engine.state.history.get(Resource.ARTISAN_COFFEE, []))
-            yield PriceChart("Idli Set", "white", lambda: self.engine.state.history.get(Resource.IDLI_SET, []))
-            yield PriceChart("Code Value", "springgreen", lambda: self.engine.state.history.get(Resource.CODE, []))
+            lock = self.runner.lock
+            yield PriceChart("AVG RENT (₹)", "red", self._history("rent"), lock)
+            yield PriceChart("Artisan Coffee", "magenta", self._history(Resource.ARTISAN_COFFEE), lock)
+            yield PriceChart("Idli Set", "white", self._history(Resource.IDLI_SET), lock)
+            yield PriceChart("Code Value", "springgreen", self._history(Resource.CODE), lock)
             
         with Container(id="stats-container"):
             yield MarketStats(id="market-stats")
             
         with Container(id="log-container"):
-            yield Log(id="activity-log")
+            yield Log(id="activity-log", max_lines=LOG_MAX_LINES)
             
         with Container(id="news-container"):
             yield NewsTicker(id="news-ticker")
             
+        yield ProfilerPanel(id="profiler")
         yield Footer()
 
-    def on_mount(self):
-        self.query_one("#chart-grid").border_title = "Market Trends"
+    def _history(self, series):
+        """Chart data source: the engine's history, or the recording when replaying."""
+        if self.replaying:
+            replay = self.runner.series["rent" if series == "rent" else series.name]
+            return lambda: replay
+        if series == "rent":
+            return lambda: self.engine.state.rent_history
+        return lambda: self.engine.state.history[series]
+
+    async def on_mount(self):
+        # Looked up once; draw_frame runs ten times a second
+        self.chart_grid = self.query_one("#chart-grid")
+        self.stats = self.query_one(MarketStats)
+        self.ticker = self.query_one(NewsTicker)
+        self.activity_log = self.query_one("#activity-log", Log)
+        self.profiler_panel = self.query_one(ProfilerPanel)
+        self.chart_grid.border_title = "Market Trends"
         self.paused = False
-        self.set_interval(0.5, self.run_simulation_step)
+        self.runner.start()
+        if self.stream_server is not None:
+            await self.stream_server.start()
+        self.set_interval(FRAME_INTERVAL, self.draw_frame)
         # Start chart updates 
         for chart in self.query(PriceChart).results():
             chart.start_updates()
 
-    def run_simulation_step(self):
-        if self.paused:
+    async def on_unmount(self):
+        if self.stream_server is not None:
+            await self.stream_server.stop()
+        self.runner.stop()
+        if self.trace is not None:
+            self.trace.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def draw_frame(self):
+        """Draw the newest snapshot; days simulated in between are skipped.
+
+        Widgets whose values did not change are left alone, and everything
+        that did change goes out in one batched refresh.
+        """
+        snapshot = self.runner.snapshot
+        if snapshot.day == self._drawn_day or not self.is_running:
             return
-            
-        self.engine.step()
-        
-        self.query_one(MarketStats).update_stats(self.engine.state)
-        self.query_one(NewsTicker).news = self.engine.state.headline
-        
-        log_widget = self.query_one("#activity-log", Log)
-        for entry in self.engine.logs[:5]: 
-            log_widget.write_line(entry)
+        self._drawn_day = snapshot.day
+        with self.batch_update():
+            self.stats.update_stats(snapshot)
+            self.ticker.news = snapshot.headline
+
+            lines = self._new_log_lines(snapshot)
+            if self.replaying and snapshot.headline != self._drawn_headline:
+                # Recordings have no agent activity; list the headlines instead
+                lines.append(f"{snapshot.date:%d %b %Y}  {snapshot.headline}")
+            self._drawn_headline = snapshot.headline
+            if lines:
+                self.activity_log.write_lines(lines)
+
+            if snapshot.profile is not None:
+                self.profiler_panel.show_report(snapshot.profile)
+            self._show_speed(snapshot.days_per_second)
+
+    def _new_log_lines(self, snapshot) -> List[str]:
+        """Events since the last frame, oldest first.
+
+        A snapshot carries only the newest few events; when more happened
+        than that (fast speeds), the rest are summed up in one line.
+        """
+        new = snapshot.events_emitted - self._drawn_events
+        self._drawn_events = snapshot.events_emitted
+        shown = snapshot.logs[:max(0, min(new, len(snapshot.logs)))]
+        lines = [f"  ... {new - len(shown):,} more events"] if new > len(shown) else []
+        lines.extend(reversed(shown))
+        return lines
+
+    def _show_speed(self, measured: float):
+        label = "paused" if self.runner.paused else format_speed(self.runner.speed)
+        if self.replaying:
+            label = f"REPLAY {self.runner.recording.first_day:,}-{self.runner.recording.last_day:,} · {label}"
+        self.chart_grid.border_subtitle = f"Day {self._drawn_day:,} · {label} · {measured:,.0f} days/s"
 
     def action_toggle_pause(self):
-        self.paused = not self.paused
+        if self.replaying:
+            # Charts keep redrawing while paused, so seeking shows up
+            pausing = not self.runner.paused
+        else:
+            self.paused = pausing = not self.paused
+        if pausing:
+            self.runner.pause()
+        else:
+            self.runner.resume()
+        self._show_speed(self.runner.snapshot.days_per_second)
+
+    def check_action(self, action: str, parameters) -> Optional[bool]:
+        # Seeking only makes sense in a replay, profiling only in a live run
+        if action in self.REPLAY_ACTIONS:
+            # Arrow keys belong to the date box while it is open
+            return self.replaying and not self.query("#goto")
+        if action == "toggle_profiler":
+            return not self.replaying
+        return True
+
+    def action_skip(self, days: int):
+        self.runner.skip(days)
+
+    def action_goto(self):
+        if not self.query("#goto"):
+            goto = Input(placeholder="Go to date (YYYY-MM-DD), Esc to cancel", id="goto")
+            self.mount(goto)
+            goto.focus()
+
+    def on_input_submitted(self, event: Input.Submitted):
+        text = event.value.strip()
+        for fmt in ("%Y-%m-%d", "%Y-%m", "%Y"):
+            try:
+                date = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            self.notify(f"Not a date: {text!r}", severity="warning")
+            return
+        self.runner.seek_date(date)
+        self._close_goto()
+
+    def on_key(self, event):
+        if event.key == "escape":
+            self._close_goto()
+
+    def _close_goto(self):
+        self.query("#goto").remove()
+
+    def action_faster(self):
+        self._change_speed(+1)
+
+    def action_slower(self):
+        self._change_speed(-1)
+
+    def _change_speed(self, direction: int):
+        current = SPEED_STEPS.index(self.runner.speed) if self.runner.speed in SPEED_STEPS else 0
+        index = min(max(current + direction, 0), len(SPEED_STEPS) - 1)
+        self.runner.speed = SPEED_STEPS[index]
+        self._show_speed(self.runner.snapshot.days_per_second)
+
+    def action_toggle_profiler(self):
+        # Profiling only runs while the panel is visible
+        panel = self.profiler_panel
+        with self.runner.lock:
+            if self.engine.profiler is None:
+                self.engine.profiler = StepProfiler()
+                panel.update("Collecting...")
+                panel.display = True
+            else:
+                self.engine.profiler = None
+                panel.display = False
@@ -0,0 +1,36 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def lttb(y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    Picks `threshold` points of `y` that keep its visual shape (peaks and
+    troughs survive, unlike plain striding). Returns (x indices, y values).
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n), y
+
+    picked = np.empty(threshold, dtype=np.intp)
+    picked[0], picked[-1] = 0, n - 1
+    every = (n - 2) / (threshold - 2)
+    a = 0  # last picked point
+
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = y[next_start:next_end].mean()
+
+        # Point in this bucket with the largest triangle area wins
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        xs = np.arange(start, end)
+        area = np.abs((a - avg_x) * (y[start:end] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+
+    return picked, y[picked]
@@ -0,0 +1,33 @@
+import threading
+
+import numpy as np
+import plotext as plt
+
+from .downsample import lttb
+
+# plotext keeps one global figure, so only one chart may build at a time
+_PLOT_LOCK = threading.Lock()
+
+
+def build_chart(label: str, color: str, data: np.ndarray, width: int, height: int) -> str:
+    """Render one line chart to an ANSI string of the given size.
+
+    Safe to call from any thread. The series is first downsampled with LTTB
+    to what the chart can show (plotext "hd" markers draw two points per
+    character column).
+    """
+    xs, ys = lttb(data, max(3, width * 2))
+    with _PLOT_LOCK:
+        # 1. Clear State (Crucial for Plotext in loops)
+        plt.clf()
+        plt.clear_data()
+        plt.clear_figure()
+
+        # 2. Plot
+        plt.plotsize(width, height)
+        plt.theme("pro") 
+        plt.title(label)
+        plt.plot(xs.tolist(), ys.tolist(), color=color, marker=None)
+        plt.frame(True)
+        plt.grid(True, True)
+        return plt.build()
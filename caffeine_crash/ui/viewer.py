@@ -0,0 +1,142 @@
+"""Thin TUI that watches a simulation streamed by caffeine_crash.server.
+
+    python -m caffeine_crash.ui.viewer --port 8765
+
+It holds no engine and no history: just a MarketView kept current by the
+server's deltas, redrawn at the TUI's frame rate. Reconnects on its own if
+the server goes away.
+"""
+import argparse
+import asyncio
+
+from textual.app import App, ComposeResult
+from textual.containers import Container
+from textual.widgets import Footer, Static
+from textual.binding import Binding
+
+from ..server import DEFAULT_HOST, DEFAULT_PORT
+from ..simulation.delta import STREAM_MAGIC, MarketView, read_frame
+from .app import FRAME_INTERVAL, MarketStats, NewsTicker, TitleBanner
+
+RECONNECT_INTERVAL = 1.0
+
+
+class MarketViewer(App):
+    CSS = """
+    Screen {
+        layout: grid;
+        grid-size: 2 3;
+        grid-columns: 1fr 1fr;
+        grid-rows: 3 1fr 9;
+        background: #1e1e1e;
+    }
+
+    TitleBanner {
+        column-span: 2;
+        height: 3;
+        content-align: center middle;
+        background: #2b2b2b;
+        border-bottom: solid #f1c40f;
+    }
+
+    #stats-container {
+        border: round #f1c40f;
+        padding: 1;
+        background: #2b2b2b;
+    }
+
+    #status {
+        border: round #3498db;
+        padding: 1;
+        background: #2b2b2b;
+    }
+
+    #news-container {
+        column-span: 2;
+        border: heavy #e74c3c;
+        background: #2c0b0e;
+    }
+    """
+
+    BINDINGS = [Binding("q", "quit", "Quit")]
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.view = MarketView()
+        self.connected = False
+        self._drawn = (-1, None)
+
+    def compose(self) -> ComposeResult:
+        yield TitleBanner()
+        with Container(id="stats-container"):
+            yield MarketStats(id="market-stats")
+        yield Static(id="status")
+        with Container(id="news-container"):
+            yield NewsTicker(id="news-ticker")
+        yield Footer()
+
+    def on_mount(self):
+        self.status = self.query_one("#status", Static)
+        self.stats = self.query_one(MarketStats)
+        self.ticker = self.query_one(NewsTicker)
+        self.query_one("#stats-container").border_title = f"Watching {self.host}:{self.port}"
+        self.run_worker(self.follow(), exclusive=True)
+        self.set_interval(FRAME_INTERVAL, self.draw_frame)
+
+    async def follow(self):
+        """Keep self.view current, reconnecting whenever the stream drops."""
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(RECONNECT_INTERVAL)
+                continue
+            try:
+                if await reader.readexactly(len(STREAM_MAGIC)) != STREAM_MAGIC:
+                    self.notify("Not a Caffeine Crash stream", severity="error")
+                    return
+                # Every connection starts with a keyframe
+                self.view = MarketView()
+                self.connected = True
+                while True:
+                    self.view.apply(await read_frame(reader))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            finally:
+                self.connected = False
+                writer.close()
+            await asyncio.sleep(RECONNECT_INTERVAL)
+
+    def draw_frame(self):
+        view = self.view
+        if (view.day, self.connected) == self._drawn:
+            return
+        self._drawn = (view.day, self.connected)
+        if view.day < 0:
+            self.status.update("[yellow]Waiting for the server...[/]")
+            return
+        with self.batch_update():
+            self.stats.update_stats(view)
+            self.ticker.news = view.headline
+            link = "[green]live[/]" if self.connected else "[red]reconnecting[/]"
+            self.status.update(
+                f"DAY      {view.day}\n"
+                f"RENT     ₹{view.rent:,.0f}/day\n"
+                f"SAVINGS  ₹{view.avg_techie_cash:,.0f} (avg techie)\n"
+                f"SPEED    {view.days_per_second:.1f} days/s\n"
+                f"STREAM   {link}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a streamed Caffeine Crash simulation.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    MarketViewer(args.host, args.port).run()
+
+
+if __name__ == "__main__":
+    main()